@@ -1,50 +1,91 @@
 import numpy as np
 import os
-import random
 from simulator.simulator import CloudEdgeSimulator
+from simulator.noise import make_noise
+from profiling.action_catalog import get_action_catalog
+from model.checkpoint import write_checkpoint, append_segment, read_checkpoint_with_deltas, is_checkpoint
 
 class A2CAgent:
-    def __init__(self, profiling_data, alpha_v=0.1, alpha_p=0.1, gamma=0.9, epsilon=0.1):
+    def __init__(self, profiling_data, alpha_v=0.1, alpha_p=0.1, gamma=0.9, epsilon=0.1,
+                 action_mode="auto", exact_max_nodes=10, seed=None):
         self.profiling = profiling_data
         self.alpha_v = alpha_v
         self.alpha_p = alpha_p
         self.gamma = gamma
         self.epsilon = epsilon
-        self.simulator = CloudEdgeSimulator(profiling_data)
+        # One random stream for exploration and transitions, seed=None → global random state
+        self.noise = make_noise(seed)
+        self.simulator = CloudEdgeSimulator(profiling_data, noise=self.noise)
+        self.actions = get_action_catalog(profiling_data)
+
+        # "exact": π(s, ·) is a distribution over all base ** nodes placements.
+        # "factored": π(s, ·) is a product of per-node distributions over the
+        #   locations (edge devices, cloud), stored as a (nodes, base) array, for
+        #   layers too wide to enumerate.
+        # "auto" picks exact up to 2 ** exact_max_nodes placements per layer.
+        if action_mode == "auto":
+            action_mode = "exact" if self.actions.fits(exact_max_nodes) else "factored"
+        if action_mode not in ("exact", "factored"):
+            raise ValueError(f"Unknown action mode: {action_mode}")
+        self.action_mode = action_mode
+        self.factored = action_mode == "factored"
+        self._base = self.actions.base
+        self._policy_width = self._base * self.actions.max_nodes if self.factored else self.actions.max_actions
 
         self.value_table = {}   # V(s)
         self.policy_table = {}  # π(s,a)
+        # Size of the last critic update and the value it produced (convergence tracking)
+        self.last_update = 0.0
+        self.last_value = 0.0
+        self.filename = "a2c_tables.ckpt"
+        # Legacy pickled tables, imported when no checkpoint exists yet
         self.filename_value = "value_table.npy"
         self.filename_policy = "policy_table.npy"
 
+        self.compact_after = 8        # delta segments appended before the checkpoint is rewritten
+        self._checkpoint_file = None  # checkpoint the tables were loaded from / last saved to
+        self._delta_segments = 0
+        self._dirty = set()           # states updated since the last save
+
     # ---------- STATE / ACTION HANDLING ----------
     def state_to_key(self, state):
         bw, ct, layer, _, surplus, negative_surplus_count = state
         return (round(bw, 1), round(ct, -1), int(layer), round(surplus, 1), int(negative_surplus_count))
 
     def get_possible_actions(self, layer):
-        nodes = self.profiling.get_num_nodes(layer)
-        actions = []
-        for pattern in range(2 ** nodes):
-            a = np.zeros((nodes, 2), dtype=int)
-            a[:, 0] = layer
-            for i in range(nodes):
-                a[i, 1] = (pattern >> i) & 1
-            actions.append(a)
-        return actions
+        """All placements of a layer, indexed by action id."""
+        return self.actions.stacked(layer)
 
-    def get_action(self, state):
+    def get_action_id(self, state):
         state_key = self.state_to_key(state)
         layer = int(state[2])
-        actions = self.get_possible_actions(layer)
+        n_actions = self.actions.num_actions(layer, edge_only_ends=False)
 
-        if random.random() < self.epsilon or state_key not in self.policy_table:
-            return random.choice(actions)
+        if self.noise.random() < self.epsilon or state_key not in self.policy_table:
+            return self.noise.randrange(n_actions)
 
         probs = self.policy_table[state_key]
+        if self.factored:
+            # one independent draw per node, counting down from the cloud
+            nodes = len(probs)
+            u = self.noise.random_array(nodes) * probs.sum(axis=1)
+            below = (np.cumsum(probs[:, ::-1], axis=1)[:, :-1] <= u[:, None]).sum(axis=1)
+            return int((self.actions.cloud_digit - below) @ self.actions.place[:nodes])
         probs /= np.sum(probs)
-        idx = np.random.choice(len(actions), p=probs)
-        return actions[idx]
+        return self.noise.choice(n_actions, probs)
+
+    def get_action(self, state):
+        return self.actions.get(int(state[2]), self.get_action_id(state))
+
+    def greedy_actions(self):
+        """{state key: most probable action id} of every state with a policy."""
+        greedy = {}
+        for key, probs in self.policy_table.items():
+            if self.factored:
+                greedy[key] = int(probs.argmax(axis=1) @ self.actions.place[:len(probs)])
+            else:
+                greedy[key] = int(np.argmax(probs))
+        return greedy
 
     # ---------- CORE TRAIN FUNCTION ----------
     def train(self, current_state):
@@ -53,44 +94,165 @@ class A2CAgent:
         surplus = current_state[4]
 
         # select action
-        action = self.get_action(current_state)
+        action_idx = self.get_action_id(current_state)
+        action = self.actions.get(layer, action_idx)
 
         # simulate
-        total_energy, completion_time_s = self.simulator.compute_energy_and_time(current_state, action, current_state[1])
+        total_energy, completion_time_s = self.simulator.compute_energy_and_time(current_state, action_idx, current_state[1])
         reward, new_surplus, negative_surplus_count = self.simulator.calculate_reward(layer, total_energy, completion_time_s, surplus, current_state[5])
-        next_state, terminal, _ = self.simulator.get_next_state(current_state, action, new_surplus, negative_surplus_count)
+        next_state, terminal, _ = self.simulator.get_next_state(current_state, action_idx, new_surplus, negative_surplus_count)
 
         # critic update
         next_key = self.state_to_key(next_state)
         v_s = self.value_table.get(state_key, 0.0)
         v_next = self.value_table.get(next_key, 0.0)
         delta = reward + (0 if terminal else self.gamma * v_next) - v_s
-        self.value_table[state_key] = v_s + self.alpha_v * delta
+        self.last_update = self.alpha_v * delta
+        self.last_value = self.value_table[state_key] = v_s + self.last_update
 
         # actor update
-        actions = self.get_possible_actions(layer)
+        if self.factored:
+            self._update_factored_policy(state_key, layer, action_idx, delta)
+            self._dirty.add(state_key)
+            return action, reward, next_state, terminal, total_energy, completion_time_s
+
+        n_actions = self.actions.num_actions(layer, edge_only_ends=False)
         if state_key not in self.policy_table:
-            self.policy_table[state_key] = np.ones(len(actions)) / len(actions)
+            self.policy_table[state_key] = np.ones(n_actions) / n_actions
 
-        action_idx = next(i for i, a in enumerate(actions) if np.array_equal(a, action))
         probs = self.policy_table[state_key]
         probs[action_idx] += self.alpha_p * delta
         probs = np.maximum(probs, 1e-6)
         probs /= np.sum(probs)
         self.policy_table[state_key] = probs
+        self._dirty.add(state_key)
 
         return action, reward, next_state, terminal, total_energy, completion_time_s
 
+    def _update_factored_policy(self, state_key, layer, action_idx, delta):
+        """Move every node's taken location by the shared TD error and renormalize per node."""
+        nodes = self.actions.num_nodes[layer]
+        if state_key not in self.policy_table:
+            self.policy_table[state_key] = np.full((nodes, self._base), 1.0 / self._base)
+
+        probs = self.policy_table[state_key]
+        decisions = (action_idx // self.actions.place[:nodes]) % self._base
+        probs[np.arange(nodes), decisions] += self.alpha_p * delta
+        probs = np.maximum(probs, 1e-6)
+        probs /= probs.sum(axis=1, keepdims=True)
+        self.policy_table[state_key] = probs
+
     # ---------- SAVE / LOAD ----------
-    def save_tables(self):
-        np.save(self.filename_value, self.value_table, allow_pickle=True)
-        np.save(self.filename_policy, self.policy_table, allow_pickle=True)
-        print("Tables saved successfully.")
+    # Keys are stored as integer columns (bw*10, ct/10, layer, surplus*10, negative count),
+    # which round-trip exactly through the rounding done in state_to_key.
+    def _keys_to_array(self, keys):
+        arr = np.zeros((len(keys), 5), dtype=np.int64)
+        for row, (bw, ct, layer, surplus, negative_surplus_count) in enumerate(keys):
+            arr[row] = (round(bw * 10), round(ct / 10), layer, round(surplus * 10), negative_surplus_count)
+        return arr
+
+    def _array_to_keys(self, arr):
+        return [(bw / 10, ct * 10.0, layer, surplus / 10, count) for bw, ct, layer, surplus, count in arr.tolist()]
+
+    def _checkpoint_meta(self):
+        return {
+            "table": "a2c",
+            "actions": {"num_nodes": list(self.actions.num_nodes), "max_actions": self.actions.max_actions,
+                        "mode": self.action_mode},
+            "profiling_hash": self.profiling.fingerprint(),
+        }
+
+    def _table_arrays(self, value_keys, policy_keys):
+        policy = np.zeros((len(policy_keys), self._policy_width))
+        for row, key in enumerate(policy_keys):
+            probs = self.policy_table[key].ravel()
+            policy[row, :len(probs)] = probs
+        return {
+            "value_keys": self._keys_to_array(value_keys),
+            "values": np.array([self.value_table[k] for k in value_keys], dtype=float),
+            "policy_keys": self._keys_to_array(policy_keys),
+            "policy": policy,
+        }
+
+    def _apply_table_arrays(self, arrays):
+        self.value_table.update(zip(self._array_to_keys(arrays["value_keys"]), arrays["values"].tolist()))
+        for key, probs in zip(self._array_to_keys(arrays["policy_keys"]), arrays["policy"]):
+            if self.factored:
+                nodes = self.actions.num_nodes[int(key[2])]
+                self.policy_table[key] = np.array(probs[:self._base * nodes]).reshape(nodes, self._base)
+                continue
+            n_actions = self.actions.num_actions(int(key[2]), edge_only_ends=False)
+            self.policy_table[key] = np.array(probs[:n_actions])
+
+    def _legacy_policy(self, layer, probs):
+        """Policy over a layer's action ids from a legacy one over edge/cloud bitmasks (edge = edge device 0)."""
+        n_actions = self.actions.num_actions(layer, edge_only_ends=False)
+        if len(probs) == n_actions:
+            return np.asarray(probs, dtype=float)
+        policy = np.zeros(n_actions)
+        policy[[self.actions.id_of_mask(mask) for mask in range(len(probs))]] = probs
+        return policy
+
+    def save_tables(self, incremental=False, verbose=True):
+        """
+        incremental: append only the states updated since the last save as a delta
+        segment when self.filename is the checkpoint these tables came from;
+        every compact_after deltas the file is rewritten in full.
+        """
+        if (incremental and self.filename == self._checkpoint_file
+                and self._delta_segments < self.compact_after and is_checkpoint(self.filename)):
+            keys = list(self._dirty)
+            if keys:
+                arrays = self._table_arrays(
+                    [k for k in keys if k in self.value_table], [k for k in keys if k in self.policy_table]
+                )
+                append_segment(self.filename, arrays, {"table": "a2c", "rows": len(keys)})
+                self._delta_segments += 1
+            self._dirty = set()
+            if verbose:
+                print(f"A2C table delta of {len(keys)} states saved.")
+            return
+
+        arrays = self._table_arrays(list(self.value_table.keys()), list(self.policy_table.keys()))
+        write_checkpoint(self.filename, arrays, self._checkpoint_meta())
+        self._dirty = set()
+        self._checkpoint_file = self.filename
+        self._delta_segments = 0
+        if verbose:
+            print("Tables saved successfully.")
+
+    def _has_legacy_tables(self):
+        return all(f is not None and os.path.exists(f) for f in (self.filename_value, self.filename_policy))
 
     def load_tables(self):
-        if os.path.exists(self.filename_value) and os.path.exists(self.filename_policy):
-            self.value_table = np.load(self.filename_value, allow_pickle=True).item()
-            self.policy_table = np.load(self.filename_policy, allow_pickle=True).item()
+        """
+        Load the checkpoint at self.filename, or import the legacy pickled
+        value/policy .npy pair if only those exist.
+        """
+        if is_checkpoint(self.filename):
+            meta, arrays, deltas = read_checkpoint_with_deltas(self.filename)
+            actions = {"mode": "exact", **meta.get("actions", {})}  # checkpoints predating modes are exact
+            if meta.get("table") != "a2c" or actions != self._checkpoint_meta()["actions"]:
+                print("A2C table layout does not match this profile. Starting fresh.")
+                return
+            self.value_table = {}
+            self.policy_table = {}
+            for segment in [arrays] + deltas:
+                self._apply_table_arrays(segment)
+            self._checkpoint_file = self.filename
+            self._delta_segments = len(deltas)
             print("Loaded existing A2C tables.")
+        elif self._has_legacy_tables():
+            if self.factored:
+                print("Legacy A2C tables hold exact-action policies. Starting fresh.")
+                return
+            policy_table = np.load(self.filename_policy, allow_pickle=True).item()
+            if any(len(probs) != 2 ** self.actions.num_nodes[int(key[2])] for key, probs in policy_table.items()):
+                print("Legacy A2C tables do not match this profile. Starting fresh.")
+                return
+            self.value_table = np.load(self.filename_value, allow_pickle=True).item()
+            self.policy_table = {key: self._legacy_policy(int(key[2]), probs) for key, probs in policy_table.items()}
+            self._checkpoint_file = None
+            print("Imported legacy A2C tables.")
         else:
             print("No A2C tables found. Starting fresh.")
@@ -0,0 +1,259 @@
+import numpy as np
+from profiling.action_catalog import get_action_catalog
+from simulator.batch_simulator import BatchCloudEdgeSimulator, BatchState
+from model.checkpoint import write_checkpoint, read_checkpoint, is_checkpoint
+
+# Radix of the packed state id digits (key fields are clipped into range)
+_BW_RADIX = 1 << 10          # bandwidth * 10, bandwidth is kept in [1, 30]
+_CT_RADIX = 1 << 16          # cloud time / 10, offset by half the radix
+_SURPLUS_RADIX = 1 << 20     # surplus * 10, offset by half the radix
+
+
+class StateRows:
+    """
+    Maps packed state ids to rows of contiguous per-state arrays.
+    Known ids are kept sorted for np.searchsorted, so a whole batch is looked
+    up at once; the sorted view is only rebuilt when new states show up.
+    """
+
+    def __init__(self, capacity=1024):
+        self.state_ids = np.zeros(capacity, dtype=np.int64)  # row -> state id
+        self.size = 0
+        self._sorted_ids = np.zeros(0, dtype=np.int64)
+        self._sorted_rows = np.zeros(0, dtype=np.int64)
+
+    def __len__(self):
+        return self.size
+
+    def lookup(self, ids):
+        """Rows of the given ids, -1 where never seen."""
+        pos = np.searchsorted(self._sorted_ids, ids)
+        pos = np.minimum(pos, max(0, self.size - 1))
+        found = self._sorted_ids[pos] == ids if self.size else np.zeros(len(ids), dtype=bool)
+        return np.where(found, self._sorted_rows[pos] if self.size else -1, -1)
+
+    def rows(self, ids):
+        """Rows of the given ids, allocating new rows for unseen ones. Returns (rows, grown)."""
+        rows = self.lookup(ids)
+        missing = rows < 0
+        if not missing.any():
+            return rows, False
+        new_ids = np.unique(ids[missing])
+        if self.size + len(new_ids) > len(self.state_ids):
+            self.state_ids = np.resize(self.state_ids, max(2 * len(self.state_ids), self.size + len(new_ids)))
+        self.state_ids[self.size:self.size + len(new_ids)] = new_ids
+        self.size += len(new_ids)
+        self._sorted_rows = np.argsort(self.state_ids[:self.size], kind="stable")
+        self._sorted_ids = self.state_ids[:self.size][self._sorted_rows]
+        return self.lookup(ids), True
+
+    @classmethod
+    def from_ids(cls, state_ids):
+        """Table whose row i is state_ids[i], e.g. from a checkpoint."""
+        state_ids = np.asarray(state_ids, dtype=np.int64)
+        table = cls(capacity=max(1, len(state_ids)))
+        table.state_ids[:len(state_ids)] = state_ids
+        table.size = len(state_ids)
+        table._sorted_rows = np.argsort(state_ids, kind="stable")
+        table._sorted_ids = state_ids[table._sorted_rows]
+        return table
+
+
+class BatchA2CAgent:
+    """
+    Array-backed A2C stepping n_envs environments of the batch simulator at once.
+
+    States are discretized like A2CAgent.state_to_key and packed into one
+    integer id; the critic V and the actor preferences live in contiguous
+    arrays indexed by the id's row. The policy is a softmax over the
+    preferences of a layer's base ** nodes placements ("exact"), or one
+    softmax over the locations (edge devices, cloud) per node ("factored")
+    for layers too wide to enumerate; location 0 has a fixed preference of
+    zero, so a single edge device is a sigmoid per node. Every step applies
+    the TD updates of all n_envs transitions at once.
+    """
+
+    def __init__(self, profiling_data, n_envs=64, alpha_v=0.1, alpha_p=0.1, gamma=0.9, epsilon=0.1,
+                 action_mode="auto", exact_max_nodes=10, seed=None):
+        self.profiling = profiling_data
+        self.n_envs = n_envs
+        self.alpha_v = alpha_v
+        self.alpha_p = alpha_p
+        self.gamma = gamma
+        self.epsilon = epsilon
+        self.rng = np.random.default_rng(seed)
+        self.simulator = BatchCloudEdgeSimulator(profiling_data, rng=self.rng)
+        self.actions = get_action_catalog(profiling_data)
+
+        if action_mode == "auto":
+            action_mode = "exact" if self.actions.fits(exact_max_nodes) else "factored"
+        if action_mode not in ("exact", "factored"):
+            raise ValueError(f"Unknown action mode: {action_mode}")
+        self.action_mode = action_mode
+        self.factored = action_mode == "factored"
+        num_layers = self.actions.num_layers
+        self._num_nodes = np.array(self.actions.num_nodes, dtype=np.int64)
+        self._base = self.actions.base
+        self._node_place = self.actions.place
+        # factored: column node * (base - 1) + location - 1, the preferences of locations 1..base-1
+        self._width = self.actions.max_nodes * (self._base - 1) if self.factored else self.actions.max_actions
+        self._neg_radix = num_layers + 1
+
+        # Columns past a layer's own placements (exact) or nodes (factored) are masked out
+        if self.factored:
+            self._valid = np.arange(self.actions.max_nodes)[None, :] < self._num_nodes[:, None]
+        else:
+            self._valid = np.arange(self._width)[None, :] < (self._base ** self._num_nodes)[:, None]
+
+        self.rows = StateRows()
+        self.values = np.zeros(len(self.rows.state_ids))
+        self.preferences = np.zeros((len(self.rows.state_ids), self._width))
+        # RMS of the last batch of critic updates and of the values they produced
+        self.last_update = 0.0
+        self.last_value = 0.0
+        self.filename = "a2c_batch_tables.ckpt"
+
+    # ---------- STATE HANDLING ----------
+    def state_ids(self, state: BatchState):
+        """Packed id of every environment's discretized state (bw, cloud time, layer, surplus, negatives)."""
+        bw = np.clip(np.round(state.bandwidth * 10).astype(np.int64), 0, _BW_RADIX - 1)
+        ct = np.clip(np.round(state.cloud_time / 10).astype(np.int64) + _CT_RADIX // 2, 0, _CT_RADIX - 1)
+        surplus = np.clip(np.round(state.surplus * 10).astype(np.int64) + _SURPLUS_RADIX // 2, 0, _SURPLUS_RADIX - 1)
+        neg = np.minimum(state.negative_surplus_count, self._neg_radix - 1)
+        ids = bw * _CT_RADIX + ct
+        ids = ids * self.actions.num_layers + state.layer
+        ids = ids * _SURPLUS_RADIX + surplus
+        return ids * self._neg_radix + neg
+
+    def unpack_ids(self, ids):
+        """(N, 5) integer key columns (bw*10, ct/10, layer, surplus*10, negatives) of packed ids."""
+        ids = np.asarray(ids, dtype=np.int64)
+        ids, neg = np.divmod(ids, self._neg_radix)
+        ids, surplus = np.divmod(ids, _SURPLUS_RADIX)
+        ids, layer = np.divmod(ids, self.actions.num_layers)
+        bw, ct = np.divmod(ids, _CT_RADIX)
+        return np.stack([bw, ct - _CT_RADIX // 2, layer, surplus - _SURPLUS_RADIX // 2, neg], axis=1)
+
+    def _rows(self, ids):
+        rows, grown = self.rows.rows(ids)
+        if grown and len(self.rows.state_ids) > len(self.values):
+            capacity = len(self.rows.state_ids)
+            self.values = np.concatenate([self.values, np.zeros(capacity - len(self.values))])
+            self.preferences = np.vstack(
+                [self.preferences, np.zeros((capacity - len(self.preferences), self._width))]
+            )
+        return rows
+
+    # ---------- POLICY ----------
+    def policy(self, rows, layers):
+        """
+        π of the given rows: (N, width) softmax over each layer's placements, or
+        (N, max_nodes, base) per-node location probabilities in factored mode
+        (all zero for nodes past a layer's own).
+        """
+        prefs = self.preferences[rows]
+        valid = self._valid[layers]
+        if self.factored:
+            logits = np.concatenate([np.zeros((len(rows), self.actions.max_nodes, 1)),
+                                     prefs.reshape(len(rows), self.actions.max_nodes, self._base - 1)], axis=2)
+            logits -= logits.max(axis=2, keepdims=True)
+            probs = np.exp(logits)
+            return np.where(valid[:, :, None], probs / probs.sum(axis=2, keepdims=True), 0.0)
+        logits = np.where(valid, prefs, -np.inf)
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        return probs / probs.sum(axis=1, keepdims=True)
+
+    def choose(self, rows, layers):
+        """ε-greedy draw from π; returns (action ids, π)."""
+        n = len(rows)
+        probs = self.policy(rows, layers)
+        if self.factored:
+            # one draw per node, counting down from the cloud; nodes past the layer's stay at 0
+            u = self.rng.random(probs.shape[:2])
+            below = (np.cumsum(probs[:, :, ::-1], axis=2)[:, :, :-1] <= u[:, :, None]).sum(axis=2)
+            action_ids = (self.actions.cloud_digit - below) @ self._node_place
+        else:
+            action_ids = (probs.cumsum(axis=1) < self.rng.random(n)[:, None]).sum(axis=1)
+        n_actions = self._base ** self._num_nodes[layers]
+        explore = self.rng.random(n) < self.epsilon
+        random_ids = (self.rng.random(n) * n_actions).astype(np.int64)
+        action_ids = np.where(explore, random_ids, np.minimum(action_ids, n_actions - 1))
+        return action_ids, probs
+
+    def greedy_actions(self):
+        """{state id: most probable action id} of every known state."""
+        ids = self.rows.state_ids[:self.rows.size]
+        rows = np.arange(self.rows.size)
+        layers = self.unpack_ids(ids)[:, 2]
+        probs = self.policy(rows, layers)
+        if self.factored:
+            greedy = probs.argmax(axis=2) @ self._node_place
+        else:
+            greedy = probs.argmax(axis=1)
+        return dict(zip(ids.tolist(), greedy.tolist()))
+
+    # ---------- CORE TRAIN FUNCTION ----------
+    def train(self, state: BatchState):
+        """
+        One step of every environment plus the batched critic and actor updates.
+        Returns (action_ids, reward, next_state, terminal, energy, completion_time_s).
+        """
+        rows = self._rows(self.state_ids(state))
+        action_ids, probs = self.choose(rows, state.layer)
+        energy, completion_time_s, reward, next_state, terminal = self.simulator.step(state, action_ids)
+
+        # critic: TD errors from the values before this batch's updates
+        next_rows = self.rows.lookup(self.state_ids(next_state))
+        v_next = np.where(next_rows >= 0, self.values[np.maximum(next_rows, 0)], 0.0)
+        v_s = self.values[rows]
+        delta = reward + np.where(terminal, 0.0, self.gamma * v_next) - v_s
+        update = self.alpha_v * delta
+        np.add.at(self.values, rows, update)
+        self.last_update = float(np.sqrt(np.sum(update * update)))
+        self.last_value = float(np.sqrt(np.sum(self.values[rows] ** 2)))
+
+        # actor: policy gradient of log π(a|s), scaled by the TD error
+        if self.factored:
+            digits = (action_ids[:, None] // self._node_place) % self._base
+            taken = digits[:, :, None] == np.arange(1, self._base)
+            grad = (taken - probs[:, :, 1:]).reshape(len(rows), self._width)
+        else:
+            grad = -probs
+            grad[np.arange(len(rows)), action_ids] += 1.0
+        np.add.at(self.preferences, rows, self.alpha_p * delta[:, None] * grad)
+
+        return action_ids, reward, next_state, terminal, energy, completion_time_s
+
+    # ---------- SAVE / LOAD ----------
+    def _checkpoint_meta(self):
+        return {
+            "table": "a2c_batch",
+            "actions": {"num_nodes": list(self.actions.num_nodes), "max_actions": self.actions.max_actions,
+                        "mode": self.action_mode},
+            "profiling_hash": self.profiling.fingerprint(),
+        }
+
+    def save_tables(self, verbose=True):
+        size = self.rows.size
+        arrays = {
+            "state_ids": self.rows.state_ids[:size],
+            "values": self.values[:size],
+            "preferences": self.preferences[:size],
+        }
+        write_checkpoint(self.filename, arrays, self._checkpoint_meta())
+        if verbose:
+            print("Batch A2C tables saved successfully.")
+
+    def load_tables(self):
+        if not is_checkpoint(self.filename):
+            print("No batch A2C tables found. Starting fresh.")
+            return
+        meta, arrays = read_checkpoint(self.filename)
+        if meta.get("table") != "a2c_batch" or meta.get("actions") != self._checkpoint_meta()["actions"]:
+            print("Batch A2C table layout does not match this profile. Starting fresh.")
+            return
+        self.rows = StateRows.from_ids(arrays["state_ids"])
+        self.values = np.array(arrays["values"], dtype=float)
+        self.preferences = np.array(arrays["preferences"], dtype=float)
+        print("Loaded existing batch A2C tables.")
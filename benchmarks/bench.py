@@ -0,0 +1,256 @@
+"""
+Throughput benchmarks for the simulator, the agents and the baselines.
+
+    python -m benchmarks.bench --out bench_results.json
+    python -m benchmarks.bench --baseline benchmarks/baseline.json   # compare, exit 1 on regression
+    python -m benchmarks.bench --save-baseline benchmarks/baseline.json
+
+Every case runs in a fresh (spawned) process so its peak RSS is its own.
+Reported per case: steps/sec, net allocated blocks per step (memory retained
+by the workload, e.g. table growth) and the tracemalloc peak above the start.
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import random
+import resource
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# (num_layers, nodes_per_layer) of the synthetic profiles, growing in width and depth;
+# the widest runs the agents in factored action mode
+SIZES = ((5, 2), (5, 4), (5, 8), (10, 4), (20, 4), (5, 24))
+CASES = (
+    "compute_energy_and_time",
+    "get_next_state",
+    "calculate_reward",
+    "double_q_train",
+    "double_q_replay_train",
+    "a2c_train",
+    "a2c_batch_train",
+    "greedy_decide",
+    "random_scheduler",
+)
+
+
+def _random_transitions(profiling_data, n, seed=0):
+    """Random (SimState, action id) pairs for the scalar simulator."""
+    from profiling.action_catalog import get_action_catalog
+    from simulator.simulator import SimState
+
+    actions = get_action_catalog(profiling_data)
+    rng = random.Random(seed)
+    transitions = []
+    for _ in range(n):
+        layer = rng.randrange(actions.num_layers)
+        prev = -1 if layer == 0 else rng.randrange(actions.num_actions(layer - 1, edge_only_ends=False))
+        state = SimState(rng.uniform(1, 30), rng.uniform(0, 300), layer, prev, rng.uniform(-0.2, 0.2), rng.randrange(3))
+        transitions.append((state, rng.randrange(actions.num_actions(layer, edge_only_ends=False))))
+    return transitions
+
+
+def _make_workload(case, profiling_data):
+    """Return run(n_steps), the workload of a case."""
+    from simulator.simulator import CloudEdgeSimulator, SimState
+
+    simulator = CloudEdgeSimulator(profiling_data)
+    transitions = _random_transitions(profiling_data, 1024)
+
+    if case == "compute_energy_and_time":
+        def run(n):
+            for i in range(n):
+                state, action = transitions[i % len(transitions)]
+                simulator.compute_energy_and_time(state, action, state[1])
+        return run
+
+    if case == "get_next_state":
+        def run(n):
+            for i in range(n):
+                state, action = transitions[i % len(transitions)]
+                simulator.get_next_state(state, action, state[4], state[5])
+        return run
+
+    if case == "calculate_reward":
+        def run(n):
+            for i in range(n):
+                state, _ = transitions[i % len(transitions)]
+                simulator.calculate_reward(state[2], 1.0, 0.05, state[4], state[5])
+        return run
+
+    if case in ("double_q_train", "double_q_replay_train", "a2c_train"):
+        if case == "double_q_train":
+            from model.doubleQ import DoubleQLearningAgent
+            agent = DoubleQLearningAgent(profiling_data)
+        elif case == "double_q_replay_train":
+            from model.doubleQ import DoubleQLearningAgent
+            agent = DoubleQLearningAgent(profiling_data, replay_capacity=20000, replay_batch=32, replay_ratio=1.0)
+        else:
+            from a2c.actor_critic_agent import A2CAgent
+            agent = A2CAgent(profiling_data)
+        initial = SimState.initial(profiling_data.bandwidth)
+
+        def run(n):
+            state = initial
+            for _ in range(n):
+                result = agent.train(state)
+                state = initial if result[3] else result[2]
+        return run
+
+    if case == "a2c_batch_train":
+        from a2c.batch_a2c_agent import BatchA2CAgent
+        from simulator.batch_simulator import BatchState
+        agent = BatchA2CAgent(profiling_data, n_envs=64, seed=0)
+        initial = BatchState.initial(agent.n_envs, profiling_data.bandwidth)
+
+        def run(n):
+            # one step = one environment step, n_envs of them per batched train call
+            state = initial
+            for _ in range(max(1, n // agent.n_envs)):
+                result = agent.train(state)
+                state = initial if result[3].all() else result[2]
+        return run
+
+    if case == "greedy_decide":
+        from model.doubleQ import DoubleQLearningAgent
+        agent = DoubleQLearningAgent(profiling_data)
+        state = initial = SimState.initial(profiling_data.bandwidth)
+        for _ in range(2048):
+            result = agent.train(state)
+            state = initial if result[3] else result[2]
+        policy = agent.greedy_policy()
+
+        def run(n):
+            for i in range(n):
+                policy.decide(transitions[i % len(transitions)][0])
+        return run
+
+    if case == "random_scheduler":
+        from reference_schedulers.random_scheduler import run_random_scheduler
+        num_layers = len(profiling_data.layers)
+
+        def run(n):
+            # one step = one layer of one episode
+            run_random_scheduler(profiling_data, episodes=max(1, n // num_layers), max_steps=num_layers, seed=0)
+        return run
+
+    raise ValueError(f"Unknown benchmark case: {case}")
+
+
+def run_case(case, num_layers, nodes_per_layer, min_time=0.5):
+    """Time one case on a synthetic profile, growing the step count until min_time is reached."""
+    from profiling.initialize_profiling import get_synthetic_profiling_data
+
+    random.seed(0)
+    np.random.seed(0)
+    profiling_data = get_synthetic_profiling_data(num_layers, nodes_per_layer)
+    run = _make_workload(case, profiling_data)
+    run(16)  # warm-up: imports, lazy caches
+
+    steps = 64
+    while True:
+        blocks_before = sys.getallocatedblocks()
+        start = time.perf_counter()
+        run(steps)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or steps >= 1 << 24:
+            break
+        steps *= 2 if elapsed <= 0 else max(2, min(16, int(min_time / elapsed) + 1))
+    net_blocks = sys.getallocatedblocks() - blocks_before
+
+    # Separate short pass under tracemalloc, which slows the workload down
+    traced_steps = max(16, steps // 16)
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    run(traced_steps)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "case": case,
+        "num_layers": num_layers,
+        "nodes_per_layer": nodes_per_layer,
+        "steps": steps,
+        "seconds": elapsed,
+        "steps_per_sec": steps / elapsed,
+        "net_blocks_per_step": net_blocks / steps,
+        "peak_traced_kb": (peak - base) / 1024,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def run_benchmarks(cases=CASES, sizes=SIZES, min_time=0.5):
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for num_layers, nodes_per_layer in sizes:
+        for case in cases:
+            with ctx.Pool(1) as pool:
+                result = pool.apply(run_case, (case, num_layers, nodes_per_layer, min_time))
+            print(f"{case:<24} layers={num_layers:<3} width={nodes_per_layer:<3} "
+                  f"{result['steps_per_sec']:>12.0f} steps/s  rss={result['peak_rss_kb'] / 1024:.1f} MB")
+            results.append(result)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(report, baseline, tolerance=0.1):
+    """
+    Compare steps/sec against a baseline report. Returns the regressions:
+    cases slower than the baseline by more than tolerance (fraction).
+    """
+    def key(r):
+        return r["case"], r["num_layers"], r["nodes_per_layer"]
+
+    base = {key(r): r for r in baseline["results"]}
+    regressions = []
+    for r in report["results"]:
+        b = base.get(key(r))
+        if b is None:
+            continue
+        ratio = r["steps_per_sec"] / b["steps_per_sec"]
+        r["baseline_ratio"] = ratio
+        if ratio < 1.0 - tolerance:
+            regressions.append(r)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default="bench_results.json", help="machine-readable results file")
+    parser.add_argument("--baseline", help="baseline report to compare steps/sec against")
+    parser.add_argument("--save-baseline", help="also write this run as a baseline report")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed slowdown vs baseline (fraction)")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds per case")
+    parser.add_argument("--cases", nargs="+", default=list(CASES), choices=CASES)
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.cases, SIZES, args.min_time)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['case']} layers={r['num_layers']} width={r['nodes_per_layer']}: "
+                  f"{r['baseline_ratio']:.2f}x baseline steps/sec")
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
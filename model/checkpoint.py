@@ -0,0 +1,160 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+# File = MAGIC followed by one or more segments.
+# Segment = SEGMENT_TAG, uint64 header length, JSON header, padding, array payloads.
+# Array offsets in the header are relative to the segment's (aligned) data start,
+# so every payload can be opened in place with np.memmap.
+MAGIC = b"QTCKPT\x00\x01"
+SEGMENT_TAG = b"CKPTSEG1"
+FORMAT_VERSION = 1
+ALIGN = 64
+
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def is_checkpoint(path):
+    """True if path holds a checkpoint (as opposed to e.g. a legacy pickle)."""
+    if not os.path.exists(path):
+        return False
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def _segment_bytes(arrays, meta, kind, segment_start):
+    """Serialize one segment that will start at byte offset segment_start of the file."""
+    layout = {}
+    offset = 0
+    payloads = []
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        layout[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+        payloads.append(arr)
+        offset = _align(offset + arr.nbytes)
+
+    header = json.dumps({
+        "version": FORMAT_VERSION,
+        "kind": kind,
+        "meta": meta,
+        "arrays": layout,
+        "data_size": offset,
+    }).encode("utf-8")
+
+    head = SEGMENT_TAG + struct.pack("<Q", len(header)) + header
+    data_start = _align(segment_start + len(head))
+    chunks = [head, b"\0" * (data_start - segment_start - len(head))]
+    for arr in payloads:
+        raw = arr.tobytes()
+        chunks.append(raw)
+        chunks.append(b"\0" * (_align(len(raw)) - len(raw)))
+    return b"".join(chunks)
+
+
+def write_checkpoint(path, arrays, meta, kind="full"):
+    """
+    Write a checkpoint holding a single segment.
+    The file is written next to path and renamed over it, so readers in other
+    processes never see a partial file.
+    """
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(_segment_bytes(arrays, meta, kind, len(MAGIC)))
+    os.replace(tmp, path)
+
+
+def _scan_segments(f, size):
+    """Yield (header, data_start, end) of every complete segment of an open checkpoint."""
+    f.seek(0)
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"{f.name} is not a checkpoint file")
+    pos = len(MAGIC)
+    while pos < size:
+        f.seek(pos)
+        head = f.read(len(SEGMENT_TAG) + 8)
+        if len(head) < len(SEGMENT_TAG) + 8 or head[:len(SEGMENT_TAG)] != SEGMENT_TAG:
+            return
+        (header_len,) = struct.unpack("<Q", head[len(SEGMENT_TAG):])
+        raw_header = f.read(header_len)
+        if len(raw_header) < header_len:
+            return
+        header = json.loads(raw_header.decode("utf-8"))
+        data_start = _align(pos + len(head) + header_len)
+        end = data_start + header["data_size"]
+        if end > size:
+            return
+        yield header, data_start, end
+        pos = end
+
+
+def append_segment(path, arrays, meta, kind="delta"):
+    """
+    Append a segment to an existing checkpoint and flush it to disk.
+    A crash mid-append leaves a truncated tail that readers skip; it is cut
+    off here before writing, so the segments written before stay valid.
+    """
+    with open(path, "r+b") as f:
+        size = os.path.getsize(path)
+        start = len(MAGIC)
+        for _, _, end in _scan_segments(f, size):
+            start = end
+        f.truncate(start)
+        f.seek(start)
+        f.write(_segment_bytes(arrays, meta, kind, start))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_segments(path, mmap=True):
+    """
+    Return the segments of a checkpoint as a list of (header, arrays).
+    With mmap=True the arrays are copy-on-write memory maps: opening is free,
+    pages are read on access and writes never reach the file.
+    A truncated trailing segment (interrupted append) is ignored.
+    """
+    segments = []
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        for header, data_start, _ in list(_scan_segments(f, size)):
+            arrays = {}
+            for name, spec in header["arrays"].items():
+                dtype = np.dtype(spec["dtype"])
+                shape = tuple(spec["shape"])
+                offset = data_start + spec["offset"]
+                count = int(np.prod(shape))
+                if mmap and count > 0:
+                    arrays[name] = np.memmap(path, dtype=dtype, mode="c", offset=offset, shape=shape)
+                else:
+                    f.seek(offset)
+                    arrays[name] = np.frombuffer(f.read(count * dtype.itemsize), dtype=dtype).reshape(shape).copy()
+            segments.append((header, arrays))
+    return segments
+
+
+def read_checkpoint(path, mmap=True):
+    """Return (meta, arrays) of the last full segment of a checkpoint."""
+    segments = read_segments(path, mmap=mmap)
+    full = [s for s in segments if s[0]["kind"] == "full"]
+    if not full:
+        raise ValueError(f"{path} holds no full segment")
+    header, arrays = full[-1]
+    return header["meta"], arrays
+
+
+def read_checkpoint_with_deltas(path, mmap=True):
+    """
+    Return (meta, arrays, deltas) where arrays belong to the last full segment
+    and deltas is the list of delta segment arrays appended after it, oldest first.
+    """
+    segments = read_segments(path, mmap=mmap)
+    last_full = max((i for i, s in enumerate(segments) if s[0]["kind"] == "full"), default=None)
+    if last_full is None:
+        raise ValueError(f"{path} holds no full segment")
+    header, arrays = segments[last_full]
+    deltas = [a for h, a in segments[last_full + 1:] if h["kind"] == "delta"]
+    return header["meta"], arrays, deltas
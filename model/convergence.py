@@ -0,0 +1,107 @@
+import math
+from collections import deque
+
+import numpy as np
+
+
+class ConvergenceMonitor:
+    """
+    Tracks whether a training run has settled, so it can stop early.
+
+    Per episode it keeps the energy, completion time and the relative size of
+    the value updates (RMS of the updates over RMS of the updated values); the
+    greedy action of every known state is compared every check_every episodes.
+    The criteria are evaluated every check_every episodes; the run has
+    converged once, after min_episodes, they held at patience checks in a row:
+      - the mean energy and time of the last window episodes differ from the
+        window before by at most rel_tol (relative) or z standard errors of
+        the difference, whichever is larger; episodes are noisy, so a fixed
+        relative tolerance alone would rarely be met,
+      - the updates stopped shrinking: the mean relative update of the last
+        window is at least (1 - update_tol) of the window before's (with a
+        constant step size they level off at the noise floor, not at zero),
+      - at least stability of the states kept their greedy action since the
+        previous check (skipped when no greedy snapshot is given).
+    """
+
+    def __init__(self, window=200, min_episodes=400, rel_tol=0.02, z=2.0, update_tol=0.1, stability=0.95,
+                 check_every=None, patience=2):
+        self.window = window
+        self.min_episodes = max(min_episodes, 2 * window)
+        self.rel_tol = rel_tol
+        self.z = z
+        self.update_tol = update_tol
+        self.stability = stability
+        self.check_every = check_every or window
+        self.patience = patience
+
+        self.episodes = 0
+        self.converged = False
+        self._energy = deque(maxlen=2 * window)
+        self._time = deque(maxlen=2 * window)
+        self._update = deque(maxlen=2 * window)
+        self._update_sq = 0.0
+        self._value_sq = 0.0
+        self._greedy = None
+        self._streak = 0
+        self.greedy_stability = None
+
+    def record_step(self, update, value):
+        """Value update applied in a training step and the value it produced."""
+        self._update_sq += update * update
+        self._value_sq += value * value
+
+    def _rolling(self, values):
+        """(mean, variance) of the last window values and mean of the window before."""
+        values = np.asarray(values)
+        last, prev = values[-self.window:], values[:-self.window]
+        return float(last.mean()), float(last.var()), float(prev.mean()) if len(prev) else math.nan
+
+    def _settled(self, values):
+        values = np.asarray(values)
+        last, prev = values[-self.window:], values[:-self.window]
+        diff = abs(last.mean() - prev.mean())
+        stderr = math.sqrt((last.var() + prev.var()) / self.window)
+        return diff <= max(self.rel_tol * abs(prev.mean()), self.z * stderr)
+
+    def end_episode(self, energy, completion_time, greedy=None):
+        """
+        Close an episode; greedy is a callable returning {state: greedy action}.
+        Returns True once the run has converged.
+        """
+        self.episodes += 1
+        self._energy.append(energy)
+        self._time.append(completion_time)
+        self._update.append(math.sqrt(self._update_sq) / (math.sqrt(self._value_sq) + 1e-12))
+        self._update_sq = self._value_sq = 0.0
+
+        if self.episodes % self.check_every:
+            return self.converged
+        if greedy is not None:
+            snapshot = greedy()
+            if self._greedy is not None:
+                common = [s for s in snapshot if s in self._greedy]
+                same = sum(snapshot[s] == self._greedy[s] for s in common)
+                self.greedy_stability = same / len(common) if common else 0.0
+            self._greedy = snapshot
+
+        if self.episodes >= self.min_episodes and len(self._energy) == 2 * self.window:
+            settled = all(self._settled(values) for values in (self._energy, self._time))
+            update, prev_update = self._rolling(self._update)[0::2]
+            levelled = update >= (1 - self.update_tol) * prev_update
+            stable = greedy is None or (self.greedy_stability is not None and self.greedy_stability >= self.stability)
+            self._streak = self._streak + 1 if settled and levelled and stable else 0
+            self.converged = self._streak >= self.patience
+        return self.converged
+
+    def metrics(self):
+        energy_mean, energy_var, energy_prev = self._rolling(self._energy) if self._energy else (math.nan,) * 3
+        time_mean, time_var, time_prev = self._rolling(self._time) if self._time else (math.nan,) * 3
+        return {
+            "episodes": self.episodes,
+            "converged": self.converged,
+            "energy": {"mean": energy_mean, "var": energy_var, "prev_mean": energy_prev},
+            "time": {"mean": time_mean, "var": time_var, "prev_mean": time_prev},
+            "update": float(np.mean(list(self._update)[-self.window:])) if self._update else math.nan,
+            "greedy_stability": self.greedy_stability,
+        }
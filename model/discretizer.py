@@ -0,0 +1,129 @@
+import bisect
+import math
+
+import numpy as np
+
+
+class UniformBins:
+    """
+    np.digitize(value, bins) - 1, clamped to [0, len(bins) - 1], for sorted bins.
+
+    On evenly spaced bins (np.linspace) the bin is computed arithmetically and
+    then corrected by at most one against the bin edges themselves, so values
+    on or next to an edge land exactly where np.digitize puts them; other bins
+    fall back to bisection.
+    """
+
+    def __init__(self, bins):
+        self.bins = np.asarray(bins, dtype=float)
+        self._edges = self.bins.tolist()
+        self.n = len(self._edges)
+        self.lo, self.hi = self._edges[0], self._edges[-1]
+        steps = np.diff(self.bins)
+        self.uniform = self.n > 1 and bool(np.allclose(steps, steps[0], rtol=1e-9, atol=0.0)) and steps[0] > 0
+        self._inv_step = (self.n - 1) / (self.hi - self.lo) if self.uniform else None
+
+    def index(self, value):
+        """Bin of one float."""
+        edges = self._edges
+        if value < self.lo:
+            return 0
+        if not value < self.hi:  # also NaN, which np.digitize puts past the last edge
+            return self.n - 1
+        if not self.uniform:
+            return bisect.bisect_right(edges, value) - 1
+        i = min(int((value - self.lo) * self._inv_step), self.n - 2)
+        if edges[i] > value:
+            return i - 1
+        if edges[i + 1] <= value:
+            return i + 1
+        return i
+
+    def indices(self, values):
+        """Bins of an array of floats."""
+        values = np.asarray(values, dtype=float)
+        if not self.uniform:
+            return np.clip(np.digitize(values, self.bins) - 1, 0, self.n - 1)
+        # fmin sends NaN to the last bin, as np.digitize does
+        pos = np.fmax(np.fmin(np.floor((values - self.lo) * self._inv_step), self.n - 1), 0).astype(np.int64)
+        pos -= self.bins[pos] > values
+        pos += (pos < self.n - 1) & (self.bins[np.minimum(pos + 1, self.n - 1)] <= values)
+        return np.maximum(pos, 0)
+
+
+class StateDiscretizer:
+    """
+    Mixed-radix Double Q state ids of SimStates (or legacy tuples) and BatchStates.
+
+    Digits: (bandwidth bin, cloud time bin, layer, surplus bin, negative
+    surplus count, prev action id + 1). state_id memoizes the ids of the
+    last memo_size state objects by identity: a training step keys its
+    state for the action choice, the update and the replay buffer, and the
+    state it moves to is the next step's current state, so each state is
+    discretized once. A keyed state must not be modified in place
+    afterwards (the simulators always build new ones); compute_id skips
+    the memo.
+    """
+
+    def __init__(self, bandwidth_bins, cloudtime_bins, surplus_bins, num_layers, actions, memo_size=4):
+        self.bandwidth = UniformBins(bandwidth_bins)
+        self.cloudtime = UniformBins(cloudtime_bins)
+        self.surplus = UniformBins(surplus_bins)
+        self.num_layers = num_layers
+        self.actions = actions
+        self.radix = (self.bandwidth.n, self.cloudtime.n, num_layers, self.surplus.n, num_layers + 1,
+                      actions.max_actions + 1)
+        # State ids are stored as int64, so the whole id range has to fit in one
+        if math.prod(self.radix) > np.iinfo(np.int64).max:
+            raise ValueError(
+                f"state ids of radix {self.radix} do not fit in int64, "
+                f"the profile has too many actions per layer ({actions.max_actions})"
+            )
+        # Multiplier of every digit, most significant first (Python ints, exact)
+        self._place = tuple(math.prod(self.radix[i + 1:]) for i in range(len(self.radix)))
+        self.memo_size = memo_size
+        self._memo = []  # [(state, id)], most recent last
+
+    def _prev_digit(self, prev_action):
+        """prev action id + 1 from a SimState id (-1 = none) or a legacy action array / None."""
+        if isinstance(prev_action, int):
+            return prev_action + 1
+        return 0 if prev_action is None else self.actions.id_of(prev_action) + 1
+
+    def state_id(self, state):
+        """Id of one state, from the memo if this state object was keyed recently."""
+        for keyed, state_id in self._memo:
+            if keyed is state:
+                return state_id
+        state_id = self.compute_id(state)
+        self._memo.append((state, state_id))
+        if len(self._memo) > self.memo_size:
+            del self._memo[0]
+        return state_id
+
+    def compute_id(self, state):
+        bw, ctime, layer, prev_action, surplus, negative_surplus_count = state
+        p_bw, p_ct, p_layer, p_surplus, p_neg, _ = self._place
+        return (self.bandwidth.index(float(bw)) * p_bw
+                + self.cloudtime.index(float(ctime)) * p_ct
+                + int(layer) * p_layer
+                + self.surplus.index(float(surplus)) * p_surplus
+                + min(int(negative_surplus_count), self.num_layers) * p_neg
+                + self._prev_digit(prev_action))
+
+    def state_ids(self, state):
+        """Ids of every environment of a BatchState."""
+        p_bw, p_ct, p_layer, p_surplus, p_neg, _ = self._place
+        return (self.bandwidth.indices(state.bandwidth) * p_bw
+                + self.cloudtime.indices(state.cloud_time) * p_ct
+                + state.layer * p_layer
+                + self.surplus.indices(state.surplus) * p_surplus
+                + np.minimum(state.negative_surplus_count, self.num_layers) * p_neg
+                + state.prev_mask + 1)
+
+    def layers_of(self, state_ids):
+        """Layer digit of state ids."""
+        return (np.asarray(state_ids) // self._place[2]) % self.num_layers
+
+    def clear(self):
+        self._memo = []
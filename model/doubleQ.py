@@ -1,20 +1,31 @@
 import numpy as np
-import random
 from profiling.profile import ProfilingData
 from simulator.simulator import CloudEdgeSimulator
+from simulator.noise import make_noise
+from profiling.action_catalog import get_action_catalog
+from model.qtable import DoubleQTable
+from model.greedy_policy import GreedyPolicy
+from model.discretizer import StateDiscretizer
+from model.replay import ReplayBuffer
+from model.checkpoint import write_checkpoint, append_segment, read_checkpoint_with_deltas, is_checkpoint
 import pickle
 import os
 
 
 class DoubleQLearningAgent:
-    def __init__(self, profiling_data: ProfilingData, alpha=0.25, gamma=0.9, epsilon=0.025):
+    def __init__(self, profiling_data: ProfilingData, alpha=0.25, gamma=0.9, epsilon=0.025,
+                 action_mode="auto", exact_max_nodes=10, seed=None,
+                 replay_capacity=0, replay_batch=32, replay_ratio=1.0,
+                 max_table_mb=None, eviction="lfu", prune_min_visits=0):
         self.profiling = profiling_data
         self.alpha = alpha
         self.gamma = gamma
         self.epsilon = epsilon
-        self.Q1 = {}
-        self.Q2 = {}
-        self.simulator = CloudEdgeSimulator(profiling_data)
+        # One random stream for exploration and transitions, seed=None → global random state;
+        # the replay buffer samples from an independent child of the same seed
+        noise_seed, replay_seed = (None, None) if seed is None else np.random.SeedSequence(seed).spawn(2)
+        self.noise = make_noise(noise_seed)
+        self.simulator = CloudEdgeSimulator(profiling_data, noise=self.noise)
 
         # ---- Discretization bins ----
         # Bandwidth in Mbps (range 1–100 Mbps, 20 bins)
@@ -24,132 +35,424 @@ class DoubleQLearningAgent:
 
         self.surplus_bins = np.linspace(-10, 10, int((10 - (-10)) / 0.1) + 1)
 
+        # ---- Q-table layout ----
+        # Actions are indexed by their action id (digit i = location of node i, see ActionCatalog).
+        # "exact": one column per action id, base ** max_nodes columns.
+        # "factored": Q(s, a) = sum over nodes of Q_i(s, location_i), stored in
+        #   base * max_nodes columns (column base*i + location), so the greedy action
+        #   is a per-node argmax and wide layers cost O(nodes) instead of O(base ** nodes).
+        # "auto" picks exact up to 2 ** exact_max_nodes placements per layer.
+        self.actions = get_action_catalog(profiling_data)
+        self.num_layers = self.actions.num_layers
+        self.max_nodes = self.actions.max_nodes
+        self.max_actions = self.actions.max_actions
+        if action_mode == "auto":
+            action_mode = "exact" if self.actions.fits(exact_max_nodes) else "factored"
+        if action_mode not in ("exact", "factored"):
+            raise ValueError(f"Unknown action mode: {action_mode}")
+        self.action_mode = action_mode
+        self.factored = action_mode == "factored"
+        self._base = self.actions.base
+        self._node_index = np.arange(self.max_nodes, dtype=np.int64)
+        self._node_place = self.actions.place
+        # ---- Table memory ----
+        # max_table_mb bounds the Q arrays: past it, new states evict the least
+        # visited ("lfu") or least recently used ("lru") ones. prune_min_visits > 0
+        # drops the states visited fewer times from the tables (and the file)
+        # whenever the checkpoint is written in full.
+        n_columns = self._base * self.max_nodes if self.factored else self.max_actions
+        self.max_table_rows = None if max_table_mb is None else DoubleQTable.rows_for_memory(n_columns, max_table_mb)
+        self.eviction = eviction
+        self.prune_min_visits = prune_min_visits
+        self.tables = DoubleQTable(n_columns, max_rows=self.max_table_rows, eviction=eviction)
+        # Size of the last Q update and the value it produced (convergence tracking)
+        self.last_update = 0.0
+        self.last_value = 0.0
+
+        # ---- Experience replay ----
+        # replay_capacity > 0 keeps the last transitions in a ReplayBuffer and,
+        # after every online update, applies replay_ratio minibatches (fractions
+        # accumulate across steps) of replay_batch transitions each.
+        self.replay = ReplayBuffer(replay_capacity, seed=replay_seed) if replay_capacity > 0 else None
+        self.replay_batch = replay_batch
+        self.replay_ratio = replay_ratio
+        self._replay_credit = 0.0
+        self._layer_actions = np.array([self._num_actions(l) for l in range(self.num_layers)], dtype=np.int64)
+        self._layer_nodes = np.array(self.actions.num_nodes, dtype=np.int64)
+
+        # ---- Checkpointing ----
+        self.compact_after = 8        # delta segments appended before the checkpoint is rewritten
+        self._checkpoint_file = None  # checkpoint the tables were loaded from / last saved to
+        self._delta_segments = 0
+        self._saved_evictions = 0     # table evictions the checkpoint file already reflects
+
+        # Mixed-radix layout of the state id:
+        # (bandwidth bin, cloud time bin, layer, surplus bin, negative surplus count, prev action id + 1)
+        self.discretizer = StateDiscretizer(self.bandwidth_bins, self.cloudtime_bins, self.surplus_bins,
+                                            self.num_layers, self.actions)
+        self._state_radix = self.discretizer.radix
+
+    @property
+    def Q1(self):
+        return self.tables.q1[:self.tables.size]
+
+    @property
+    def Q2(self):
+        return self.tables.q2[:self.tables.size]
 
     # ----- Helpers -----
     def _discretize(self, value, bins):
         """Map continuous value to nearest bin center."""
+        return bins[self._bin_index(value, bins)]
+
+    def _bin_index(self, value, bins):
+        """Index of the bin a continuous value falls into."""
         idx = np.digitize(value, bins) - 1
-        idx = max(0, min(idx, len(bins) - 1))  # clamp
-        return bins[idx]
+        return max(0, min(int(idx), len(bins) - 1))  # clamp
 
-    def _state_to_key(self, state):
+    def _state_to_id(self, state):
         """
-        Discretize continuous values and form a stable Q-table key.
-        State = [bandwidth, congestion_time, layer, prev_action, surplus]
+        Discretize continuous values and form a stable integer state id.
+        State = [bandwidth, congestion_time, layer, prev_action, surplus, negative_surplus_count],
+        as a SimState or a legacy tuple; see StateDiscretizer.
         """
-        bw, ctime, layer, prev_action, surplus, negative_surplus_count = state
+        return self.discretizer.state_id(state)
 
-        # Discretize continuous values
-        bw_disc = self._discretize(float(bw), self.bandwidth_bins)
-        ctime_disc = self._discretize(float(ctime), self.cloudtime_bins)
-        surplus_disc = self._discretize(float(surplus), self.surplus_bins)
-
-        base_key = (bw_disc, ctime_disc, int(layer), surplus_disc, int(negative_surplus_count))
-
-        if prev_action is not None:
-            prev_action_key = self._action_to_key(prev_action)
-            return base_key + (prev_action_key,)
-        return base_key + (None,)
-
-    def _action_to_key(self, action):
-        """Convert action array into immutable tuple (only assignment col)."""
-        return tuple(int(x) for x in action[:, 1].tolist())
+    def _num_actions(self, layer_idx):
+        """Number of valid action ids for a layer (first/last layer → edge only)."""
+        return self.actions.num_actions(layer_idx)
 
     def _get_possible_actions(self, layer_idx):
-        """Generate all possible action patterns for given layer."""
-        nodes = self.profiling.get_num_nodes(layer_idx)
+        """All possible action patterns for given layer, indexed by action id."""
+        return self.actions.stacked(layer_idx)[:self._num_actions(layer_idx)]
 
-        # First layer → EDGE only
-        if (layer_idx == 0 or layer_idx == (len(self.profiling.layers) - 1)):
-            a = np.zeros((nodes, 2), dtype=int)
-            a[:, 0] = layer_idx
-            a[:, 1] = 0   # 0 = edge
-            return [a]
+    def _factored_columns(self, layer_idx, action_id):
+        """Columns of the per-node components of an action in the factored table."""
+        nodes = self.actions.num_nodes[layer_idx]
+        return self._base * self._node_index[:nodes] + (action_id // self._node_place[:nodes]) % self._base
 
-
-        # Middle layers → all patterns (edge=0, cloud=1)
-        actions = []
-        for pattern in range(2 ** nodes):
-            a = np.zeros((nodes, 2), dtype=int)
-            a[:, 0] = layer_idx
-            for i in range(nodes):
-                a[i, 1] = (pattern >> i) & 1
-            actions.append(a)
-        return actions
+    def _factored_greedy(self, q_values, layer_idx):
+        """Action id maximizing a factored Q row: the best location of every node (ties → lowest)."""
+        if self._num_actions(layer_idx) == 1:
+            return 0
+        nodes = self.actions.num_nodes[layer_idx]
+        q = q_values[:self._base * nodes].reshape(nodes, self._base)
+        return int(q.argmax(axis=1) @ self._node_place[:nodes])
 
 
     # ----- Action selection -----
-    def choose_action(self, state):
+    def _choose_action_id(self, state):
         layer = int(state[2])
-        actions = self._get_possible_actions(layer)
-        s_key = self._state_to_key(state)
+        n_actions = self._num_actions(layer)
 
         # ε-greedy
-        if (random.random() < self.epsilon) and layer > 0 and layer < (len(self.profiling.layers) - 1) :
-            return random.choice(actions)
+        if (self.noise.random() < self.epsilon) and layer > 0 and layer < (self.num_layers - 1) :
+            return self.noise.randrange(n_actions)
 
-        q_values = []
-        for a in actions:
-            key = (s_key, self._action_to_key(a))
-            q_values.append(self.Q1.get(key, 0.0) + self.Q2.get(key, 0.0))
+        row = self.tables.lookup(self._state_to_id(state))
+        if row < 0:
+            return 0
+        if self.factored:
+            return self._factored_greedy(self.tables.q1[row] + self.tables.q2[row], layer)
+        q_values = self.tables.q1[row, :n_actions] + self.tables.q2[row, :n_actions]
+        return int(np.argmax(q_values))
 
-        return actions[int(np.argmax(q_values))]
+    def choose_action(self, state):
+        return self.actions.get(int(state[2]), self._choose_action_id(state))
+
+    def greedy_policy(self):
+        """Freeze the current tables into a GreedyPolicy (no exploration, no writes)."""
+        return GreedyPolicy(self)
+
+    def greedy_actions(self):
+        """{state id: greedy action id} of every visited state."""
+        return self.greedy_policy().greedy_actions()
 
 
     # ----- Training update -----
     def train(self, current_state):
+        self.tables.tick()
         # Choose action
-        action = self.choose_action(current_state)
+        action_id = self._choose_action_id(current_state)
+        action = self.actions.get(int(current_state[2]), action_id)
         # Environment transition
-        energy, completion_time = self.simulator.compute_energy_and_time(current_state=current_state, current_action=action, cloud_pending_ms= current_state[1])
+        energy, completion_time = self.simulator.compute_energy_and_time(current_state=current_state, current_action=action_id, cloud_pending_ms= current_state[1])
         reward, surplus, negative_surplus_count = self.simulator.calculate_reward(int(current_state[2]), energy, completion_time, current_state[4], current_state[5])
-        next_state, terminal, _ = self.simulator.get_next_state(current_state, action, surplus, negative_surplus_count)
+        next_state, terminal, _ = self.simulator.get_next_state(current_state, action_id, surplus, negative_surplus_count)
+
+        # Current row (allocated before picking the arrays, since allocation may grow them)
+        state_id = self._state_to_id(current_state)
+        row = self.tables.row(state_id)
+        if self.replay is not None:
+            self._remember(state_id, action_id, reward, current_state, next_state, terminal)
 
         # Decide which Q-table to update
-        if random.random() < 0.5:
-            q_table, q_other = self.Q1, self.Q2
+        if self.noise.random() < 0.5:
+            q_table, q_other = self.tables.q1, self.tables.q2
         else:
-            q_table, q_other = self.Q2, self.Q1
+            q_table, q_other = self.tables.q2, self.tables.q1
+
+        if self.factored:
+            self._train_factored(current_state, action_id, reward, next_state, terminal, row, q_table, q_other)
+            if self.replay is not None:
+                self._replay()
+            return action, reward, next_state, terminal, energy, completion_time , next_state[0]
 
-        # Current key
-        key = (self._state_to_key(current_state), self._action_to_key(action))
-        old_value = q_table.get(key, 0.0)
+        old_value = q_table[row, action_id]
 
         if terminal:
             target = reward
         else:
-            layer_next = int(next_state[2])
-            next_actions = self._get_possible_actions(layer_next)
-
-            # Best next action
-            best_next_action = max(
-                next_actions,
-                key=lambda a: q_table.get(
-                    (self._state_to_key(next_state), self._action_to_key(a)), 0.0
-                ),
-            )
-            target = reward + self.gamma * q_other.get(
-                (self._state_to_key(next_state), self._action_to_key(best_next_action)), 0.0
-            )
+            next_row = self.tables.lookup(self._state_to_id(next_state))
+            if next_row < 0:
+                # Unseen next state → all Q-values are zero
+                target = reward
+            else:
+                # Best next action
+                n_next = self._num_actions(int(next_state[2]))
+                best_next_action = int(np.argmax(q_table[next_row, :n_next]))
+                target = reward + self.gamma * q_other[next_row, best_next_action]
 
         # Update Q-value
-        q_table[key] = old_value + self.alpha * (target - old_value)
+        self.last_update = self.alpha * (target - old_value)
+        self.last_value = q_table[row, action_id] = old_value + self.last_update
+        self.tables.dirty.add(row)
+        if self.replay is not None:
+            self._replay()
 
         return action, reward, next_state, terminal, energy, completion_time , next_state[0]
-    
-    def save_qtables(self, filename="q_tables.pkl"):
-            """Save Q1 and Q2 tables to disk."""
-            with open(filename, "wb") as f:
-                pickle.dump((self.Q1, self.Q2), f)
-            print(f"Q-tables saved to {filename}")
-
-    def load_qtables(self, filename="q_tables.pkl"):
-        """Load Q1 and Q2 tables if file exists, else skip."""
-        if os.path.exists(filename):
-            with open(filename, "rb") as f:
-                self.Q1, self.Q2 = pickle.load(f)
-            print(f"Q-tables found and loaded from {filename}, q1 size: {len(self.Q1)}, q2 size: {len(self.Q2)}")
-            return True
+
+    def _train_factored(self, current_state, action_id, reward, next_state, terminal, row, q_table, q_other):
+        """Double Q update of the per-node components; the TD error is shared evenly among them."""
+        layer = int(current_state[2])
+        cols = self._factored_columns(layer, action_id)
+        old_value = q_table[row, cols].sum()
+
+        target = reward
+        if not terminal:
+            next_row = self.tables.lookup(self._state_to_id(next_state))
+            if next_row >= 0:
+                next_layer = int(next_state[2])
+                best_next_action = self._factored_greedy(q_table[next_row], next_layer)
+                target = reward + self.gamma * q_other[next_row, self._factored_columns(next_layer, best_next_action)].sum()
+
+        self.last_update = self.alpha * (target - old_value)
+        self.last_value = old_value + self.last_update
+        q_table[row, cols] += self.last_update / len(cols)
+        self.tables.dirty.add(row)
+
+    # ----- Experience replay -----
+    def _remember(self, state_id, action_id, reward, current_state, next_state, terminal):
+        self.replay.add(state_id, action_id, reward, self._state_to_id(next_state),
+                        int(current_state[2]), int(next_state[2]), terminal)
+
+    def _replay(self):
+        """Apply the minibatch updates the replay ratio has accumulated."""
+        self._replay_credit += self.replay_ratio
+        if len(self.replay) < self.replay_batch:
+            return
+        while self._replay_credit >= 1.0:
+            self._replay_credit -= 1.0
+            self._replay_minibatch(self.replay.sample(self.replay_batch))
+
+    def _replay_minibatch(self, slots):
+        """
+        Vectorized Double Q update of a minibatch: each transition updates Q1
+        or Q2 (coin flip) towards the other table's value of its greedy next
+        action. Transitions of the same (state, action) average their updates,
+        so duplicates in a minibatch never step further than alpha.
+        """
+        buf, tables = self.replay, self.tables
+        # replayed samples are not new visits, the LFU eviction and pruning count environment steps only
+        rows = np.array([tables.row(s, visit=False) for s in buf.state_ids[slots].tolist()], dtype=np.int64)
+        next_rows = np.array([tables.lookup(s) for s in buf.next_state_ids[slots].tolist()], dtype=np.int64)
+        action_ids, rewards = buf.action_ids[slots], buf.rewards[slots]
+        layers, next_layers = buf.layers[slots], buf.next_layers[slots]
+        bootstrap = ~buf.terminal[slots] & (next_rows >= 0)
+        first = buf.rng.random(len(slots)) < 0.5
+
+        for q_table, q_other, pick in ((self.tables.q1, self.tables.q2, first),
+                                       (self.tables.q2, self.tables.q1, ~first)):
+            if not pick.any():
+                continue
+            r, nr, b = rows[pick], np.maximum(next_rows[pick], 0), bootstrap[pick]
+            if self.factored:
+                self._replay_factored(q_table, q_other, r, nr, b, action_ids[pick], rewards[pick],
+                                      layers[pick], next_layers[pick])
+                continue
+            n_next = self._layer_actions[next_layers[pick]]
+            next_q = np.where(np.arange(self.max_actions) < n_next[:, None], q_table[nr], -np.inf)
+            best_next = next_q.argmax(axis=1)
+            target = rewards[pick] + np.where(b, self.gamma * q_other[nr, best_next], 0.0)
+            a = action_ids[pick]
+            self._apply_mean(q_table, r, a, self.alpha * (target - q_table[r, a]))
+        self.tables.dirty.update(rows.tolist())
+
+    def _replay_factored(self, q_table, q_other, rows, next_rows, bootstrap, action_ids, rewards, layers, next_layers):
+        """Minibatch counterpart of _train_factored."""
+        nodes = self._node_index
+        valid = nodes < self._layer_nodes[layers][:, None]
+        base = self._base
+        cols = base * nodes + (action_ids[:, None] // self._node_place) % base
+        old_value = np.where(valid, q_table[rows[:, None], cols], 0.0).sum(axis=1)
+
+        next_valid = nodes < self._layer_nodes[next_layers][:, None]
+        next_q = q_table[next_rows].reshape(len(rows), self.max_nodes, base)
+        best = next_q.argmax(axis=2) * (self._layer_actions[next_layers] > 1)[:, None]
+        next_cols = base * nodes + best
+        next_value = np.where(next_valid, q_other[next_rows[:, None], next_cols], 0.0).sum(axis=1)
+
+        target = rewards + np.where(bootstrap, self.gamma * next_value, 0.0)
+        share = self.alpha * (target - old_value) / valid.sum(axis=1)
+        self._apply_mean(q_table, np.broadcast_to(rows[:, None], cols.shape)[valid], cols[valid],
+                         np.broadcast_to(share[:, None], cols.shape)[valid])
+
+    def _apply_mean(self, q_table, rows, cols, updates):
+        """Add updates to q_table[rows, cols], averaging those hitting the same cell."""
+        cells, inverse, counts = np.unique(rows * q_table.shape[1] + cols, return_inverse=True, return_counts=True)
+        total = np.zeros(len(cells))
+        np.add.at(total, inverse, updates)
+        q_table.flat[cells] += total / counts
+
+    # ----- Legacy dict tables -----
+    def _legacy_state_to_id(self, key):
+        """Map a state key of the old tuple-keyed tables to a state id."""
+        bw, ctime, layer, surplus, negative_surplus_count, prev_action_key = key
+
+        def nearest(value, bins):
+            return int(np.argmin(np.abs(bins - float(value))))
+
+        digits = (
+            nearest(bw, self.bandwidth_bins),
+            nearest(ctime, self.cloudtime_bins),
+            int(layer),
+            nearest(surplus, self.surplus_bins),
+            min(int(negative_surplus_count), self.num_layers),
+            0 if prev_action_key is None else self.actions.id_of_mask(self.actions.mask_of_key(prev_action_key)) + 1,
+        )
+        state_id = 0
+        for digit, radix in zip(digits, self._state_radix):
+            state_id = state_id * radix + digit
+        return state_id
+
+    def _import_legacy_tables(self, Q1, Q2):
+        """Fill the array tables from the old {(state_key, action_key): value} dicts."""
+        if self.factored:
+            raise ValueError("Legacy Q-tables hold exact action values; load them with action_mode='exact'")
+        self.tables = DoubleQTable(self.max_actions)
+        for legacy, q in ((Q1, "q1"), (Q2, "q2")):
+            for (s_key, a_key), value in legacy.items():
+                row = self.tables.row(self._legacy_state_to_id(s_key))
+                action_id = self.actions.id_of_mask(self.actions.mask_of_key(a_key))  # legacy keys are edge/cloud
+                getattr(self.tables, q)[row, action_id] = value
+
+    # ----- Checkpoints -----
+    def _bound_tables(self):
+        """Apply the memory cap to loaded tables; True if states beyond it were dropped."""
+        size = self.tables.size
+        self.tables.bound(self.max_table_rows, self.eviction)
+        return self.tables.size < size
+
+    def _occupancy_note(self):
+        occupancy = self.tables.occupancy()
+        if occupancy["max_rows"] is None and not occupancy["pruned"]:
+            return ""
+        note = f" ({occupancy['rows']}/{occupancy['max_rows'] or 'unbounded'} states"
+        return note + f", {occupancy['evictions']} evicted, {occupancy['pruned']} pruned)"
+
+    def _checkpoint_meta(self):
+        """Layout the saved state ids and action columns depend on."""
+        return {
+            "table": "double_q",
+            "bins": {
+                "bandwidth": self.bandwidth_bins.tolist(),
+                "cloudtime": self.cloudtime_bins.tolist(),
+                "surplus": self.surplus_bins.tolist(),
+            },
+            "state_radix": list(self._state_radix),
+            "actions": {"num_nodes": list(self.actions.num_nodes), "max_actions": self.max_actions,
+                        "mode": self.action_mode},
+            "profiling_hash": self.profiling.fingerprint(),
+        }
+
+    def _layout_matches(self, meta):
+        ours = self._checkpoint_meta()
+        theirs = dict(meta, actions={"mode": "exact", **meta.get("actions", {})})  # checkpoints predating modes are exact
+        return all(theirs.get(k) == ours[k] for k in ("table", "bins", "state_radix", "actions"))
+
+    def save_qtables(self, filename="q_tables.ckpt", incremental=False, verbose=True):
+            """
+            Save Q1 and Q2 tables to disk.
+            incremental: append only the rows written since the last save as a delta
+            segment when filename is the checkpoint these tables were loaded from or
+            last saved to; every compact_after deltas, and after any eviction (a delta
+            cannot drop states), the file is rewritten in full.
+            """
+            state_ids, q1, q2 = self.tables.to_arrays()
+            if (incremental and filename == self._checkpoint_file and self.tables.evictions == self._saved_evictions
+                    and self._delta_segments < self.compact_after and is_checkpoint(filename)):
+                rows = self.tables.take_dirty()
+                if len(rows) > 0:
+                    append_segment(filename, {"state_ids": state_ids[rows], "Q1": q1[rows], "Q2": q2[rows],
+                                              "visits": self.tables.visits[rows]},
+                                   {"table": "double_q", "rows": len(rows)})
+                    self._delta_segments += 1
+                if verbose:
+                    print(f"Q-table delta of {len(rows)} states saved to {filename}")
+                return
+
+            if self.prune_min_visits > 0:
+                self.tables.prune(self.prune_min_visits)
+                state_ids, q1, q2 = self.tables.to_arrays()
+            write_checkpoint(filename, {"state_ids": state_ids, "Q1": q1, "Q2": q2,
+                                        "visits": self.tables.visits[:self.tables.size]}, self._checkpoint_meta())
+            self.tables.dirty = set()
+            self._checkpoint_file = filename
+            self._delta_segments = 0
+            self._saved_evictions = self.tables.evictions
+            if verbose:
+                print(f"Q-tables saved to {filename}{self._occupancy_note()}")
+
+    def load_qtables(self, filename="q_tables.ckpt"):
+        """
+        Load Q1 and Q2 tables if file exists, else skip.
+        The checkpoint is memory-mapped copy-on-write and its delta segments are
+        replayed on top; a legacy pickle (either at filename or next to it with
+        a .pkl extension) is imported instead.
+        """
+        legacy_filename = os.path.splitext(filename)[0] + ".pkl"
+        if is_checkpoint(filename):
+            meta, arrays, deltas = read_checkpoint_with_deltas(filename)
+            if not self._layout_matches(meta):
+                print(f"Q-table layout in {filename} does not match this profile. Starting fresh.")
+                return False
+            if meta.get("profiling_hash") != self.profiling.fingerprint():
+                print(f"Warning: Q-tables in {filename} were learned on a different profile.")
+            self.tables = DoubleQTable.from_arrays(arrays["state_ids"], arrays["Q1"], arrays["Q2"], copy=False,
+                                                   visits=arrays.get("visits"))
+            for delta in deltas:
+                self.tables.update_rows(delta["state_ids"], delta["Q1"], delta["Q2"], delta.get("visits"))
+            self._checkpoint_file = filename
+            self._delta_segments = len(deltas)
+            self._saved_evictions = self.tables.evictions
+            if self._bound_tables():
+                self._checkpoint_file = None  # the file holds the trimmed states, rewrite it in full
+        elif os.path.exists(filename) or os.path.exists(legacy_filename):
+            self.import_qtables(filename if os.path.exists(filename) else legacy_filename)
         else:
             print(f"Q-table file not found at {filename}. Starting fresh.")
             return False
+        print(f"Q-tables found and loaded from {filename}, q1 size: {len(self.Q1)}, q2 size: {len(self.Q2)}")
+        return True
+
+    def import_qtables(self, filename):
+        """Import pickled tables: the old tuple-keyed dict pair or a pickled array dict."""
+        with open(filename, "rb") as f:
+            data = pickle.load(f)
+        if isinstance(data, tuple):
+            self._import_legacy_tables(*data)
+        else:
+            self.tables = DoubleQTable.from_arrays(data["state_ids"], data["Q1"], data["Q2"])
+        self._bound_tables()
+        self._checkpoint_file = None
+        print(f"Imported pickled Q-tables from {filename}")
@@ -0,0 +1,79 @@
+import numpy as np
+from model.discretizer import StateDiscretizer
+
+
+class GreedyPolicy:
+    """
+    Frozen greedy policy compiled from the Q1/Q2 tables of a DoubleQLearningAgent.
+
+    The greedy action id of every visited state is computed once; decide()
+    then only discretizes the state and does a dict lookup. Unseen states and
+    edge-only layers get action id 0 (all edge), as in the agent. Nothing is
+    explored and the agent's tables are never written.
+    """
+
+    def __init__(self, agent):
+        self.actions = agent.actions
+        self.num_layers = agent.num_layers
+        self.discretizer = StateDiscretizer(agent.bandwidth_bins, agent.cloudtime_bins, agent.surplus_bins,
+                                            agent.num_layers, agent.actions)
+
+        state_ids, q1, q2 = agent.tables.to_arrays()
+        greedy = self._greedy_ids(agent, np.asarray(state_ids), q1 + q2)
+
+        order = np.argsort(state_ids, kind="stable")
+        self.state_ids = np.array(state_ids, dtype=np.int64)[order]
+        self.action_ids = greedy[order]
+        for arr in (self.state_ids, self.action_ids):
+            arr.flags.writeable = False
+        self._greedy = dict(zip(self.state_ids.tolist(), self.action_ids.tolist()))
+
+    def __len__(self):
+        return len(self.state_ids)
+
+    def greedy_actions(self):
+        """{state id: greedy action id} of every compiled state."""
+        return dict(self._greedy)
+
+    def _greedy_ids(self, agent, state_ids, q):
+        """Greedy action id of every table row, computed one layer at a time."""
+        greedy = np.zeros(len(state_ids), dtype=np.int64)
+        layers = self.discretizer.layers_of(state_ids)
+        for layer_idx in range(self.num_layers):
+            rows = np.flatnonzero(layers == layer_idx)
+            n_actions = agent._num_actions(layer_idx)
+            if len(rows) == 0 or n_actions == 1:
+                continue
+            if agent.factored:
+                nodes, base = self.actions.num_nodes[layer_idx], self.actions.base
+                per_node = q[rows, :base * nodes].reshape(len(rows), nodes, base)
+                greedy[rows] = per_node.argmax(axis=2) @ self.actions.place[:nodes]
+            else:
+                greedy[rows] = np.argmax(q[rows, :n_actions], axis=1)
+        return greedy
+
+    # ----- Single decisions -----
+    def state_id(self, state):
+        return self.discretizer.compute_id(state)
+
+    def decide_id(self, state):
+        """Greedy action id for a state tuple."""
+        return self._greedy.get(self.state_id(state), 0)
+
+    def decide(self, state):
+        """Greedy action array for a state tuple."""
+        return self.actions.get(int(state[2]), self.decide_id(state))
+
+    # ----- Batched decisions -----
+    def state_ids_of(self, state):
+        """State ids of every environment of a BatchState."""
+        return self.discretizer.state_ids(state)
+
+    def decide_ids(self, state):
+        """Greedy action ids of every environment of a BatchState."""
+        state_ids = self.state_ids_of(state)
+        if len(self.state_ids) == 0:
+            return np.zeros(len(state_ids), dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.state_ids, state_ids), len(self.state_ids) - 1)
+        found = self.state_ids[pos] == state_ids
+        return np.where(found, self.action_ids[pos], 0)
@@ -0,0 +1,172 @@
+import csv
+import json
+import time
+
+# Phases of DoubleQLearningAgent.train; "update" is the rest of train (table rows, Q update)
+PHASES = ("select", "simulate", "reward", "next_state", "update")
+
+
+class TrainingStats:
+    """
+    Opt-in instrumentation of a DoubleQLearningAgent.
+
+    attach() shadows the agent's hot-path methods with timed wrappers on the
+    instance, detach() removes them again; an agent that was never attached
+    runs its plain methods, so disabled instrumentation costs nothing.
+    Recorded: wall time and call count per train phase, new vs seen states
+    (rows allocated for the updated state, hits of next-state lookups) and
+    the Q-table size after every sampled episode.
+    """
+
+    def __init__(self):
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.calls = dict.fromkeys(PHASES, 0)
+        self.steps = 0
+        self.train_seconds = 0.0
+        self.new_states = 0
+        self.seen_states = 0
+        self.lookup_hits = 0
+        self.lookup_misses = 0
+        self.table_sizes = []  # (episode, rows, capacity, bytes, evictions)
+        self._agent = None
+        self._tables = None
+
+    # ----- Attaching -----
+    def attach(self, agent):
+        """Install the timed wrappers on agent (and its current tables)."""
+        self._agent = agent
+        sim = agent.simulator
+        agent._choose_action_id = self._timed("select", agent._choose_action_id)
+        sim.compute_energy_and_time = self._timed("simulate", sim.compute_energy_and_time)
+        sim.calculate_reward = self._timed("reward", sim.calculate_reward)
+        sim.get_next_state = self._timed("next_state", sim.get_next_state)
+        agent.train = self._timed_train(agent.train)
+        self._attach_tables(agent.tables)
+        return self
+
+    def _attach_tables(self, tables):
+        row, lookup, index = tables.row, tables.lookup, tables.index
+
+        def counted_row(state_id, visit=True):
+            if visit:
+                if state_id in index:
+                    self.seen_states += 1
+                else:
+                    self.new_states += 1
+            return row(state_id, visit)
+
+        def counted_lookup(state_id):
+            r = lookup(state_id)
+            if r < 0:
+                self.lookup_misses += 1
+            else:
+                self.lookup_hits += 1
+            return r
+
+        tables.row, tables.lookup = counted_row, counted_lookup
+        self._tables = tables
+
+    def detach(self):
+        """Remove the wrappers, restoring the agent's plain methods."""
+        agent = self._agent
+        if agent is None:
+            return
+        for name in ("_choose_action_id", "train"):
+            agent.__dict__.pop(name, None)
+        for name in ("compute_energy_and_time", "calculate_reward", "get_next_state"):
+            agent.simulator.__dict__.pop(name, None)
+        for name in ("row", "lookup"):
+            self._tables.__dict__.pop(name, None)
+        self._agent = self._tables = None
+
+    def _timed(self, phase, fn):
+        seconds, calls, clock = self.seconds, self.calls, time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = clock()
+            result = fn(*args, **kwargs)
+            seconds[phase] += clock() - start
+            calls[phase] += 1
+            return result
+        return timed
+
+    def _timed_train(self, train):
+        clock = time.perf_counter
+
+        def timed_train(current_state):
+            if self._agent.tables is not self._tables:  # tables replaced, e.g. by load_qtables
+                self._attach_tables(self._agent.tables)
+            inner = sum(self.seconds[p] for p in PHASES[:-1])
+            start = clock()
+            result = train(current_state)
+            elapsed = clock() - start
+            self.train_seconds += elapsed
+            self.seconds["update"] += elapsed - (sum(self.seconds[p] for p in PHASES[:-1]) - inner)
+            self.calls["update"] += 1
+            self.steps += 1
+            return result
+        return timed_train
+
+    def sample_tables(self, episode):
+        """Record the Q-table size, e.g. after every episode."""
+        tables = self._agent.tables
+        self.table_sizes.append(
+            (episode, tables.size, len(tables.state_ids), int(tables.q1.nbytes + tables.q2.nbytes), tables.evictions)
+        )
+
+    # ----- Export -----
+    def summary(self):
+        phases = {}
+        for phase in PHASES:
+            calls = self.calls[phase]
+            phases[phase] = {
+                "calls": calls,
+                "seconds": self.seconds[phase],
+                "mean_us": self.seconds[phase] / calls * 1e6 if calls else 0.0,
+                "share": self.seconds[phase] / self.train_seconds if self.train_seconds else 0.0,
+            }
+        rows = self.new_states + self.seen_states
+        lookups = self.lookup_hits + self.lookup_misses
+        last = self.table_sizes[-1] if self.table_sizes else None
+        return {
+            "steps": self.steps,
+            "train_seconds": self.train_seconds,
+            "steps_per_sec": self.steps / self.train_seconds if self.train_seconds else 0.0,
+            "phases": phases,
+            "states": {
+                "new": self.new_states,
+                "seen": self.seen_states,
+                "seen_rate": self.seen_states / rows if rows else 0.0,
+                "lookup_hits": self.lookup_hits,
+                "lookup_misses": self.lookup_misses,
+                "lookup_hit_rate": self.lookup_hits / lookups if lookups else 0.0,
+            },
+            "table": {
+                "rows": last[1] if last else 0,
+                "capacity": last[2] if last else 0,
+                "bytes": last[3] if last else 0,
+                "evictions": last[4] if last else 0,
+            },
+            "table_growth": [list(t) for t in self.table_sizes],
+        }
+
+    def _flat(self, summary):
+        """(metric, value) pairs of a summary, table growth left out."""
+        items = [("steps", summary["steps"]), ("train_seconds", summary["train_seconds"]),
+                 ("steps_per_sec", summary["steps_per_sec"])]
+        for phase, values in summary["phases"].items():
+            items += [(f"{phase}.{k}", v) for k, v in values.items()]
+        for group in ("states", "table"):
+            items += [(f"{group}.{k}", v) for k, v in summary[group].items()]
+        return items
+
+    def save(self, filename):
+        """Write the summary as JSON (.json) or as metric,value CSV rows (any other extension)."""
+        summary = self.summary()
+        with open(filename, "w", newline="") as f:
+            if filename.endswith(".json"):
+                json.dump(summary, f, indent=2)
+            else:
+                writer = csv.writer(f)
+                writer.writerow(("metric", "value"))
+                writer.writerows(self._flat(summary))
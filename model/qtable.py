@@ -0,0 +1,225 @@
+import numpy as np
+
+
+class DoubleQTable:
+    """
+    Array-backed storage for the Q1/Q2 pair of a Double Q-learning agent.
+
+    States are identified by integer ids and mapped once to a row index.
+    Q-values live in two contiguous float arrays of shape (rows, n_actions),
+    where the column is the action id (see ActionCatalog).
+
+    Every row() call counts a visit of the state and stamps it with the
+    current clock (advanced by tick(), once per training step). With
+    max_rows set the table is bounded: a new state beyond it takes over the
+    row of an evicted one, the least visited ("lfu", ties → least recently
+    used) or least recently used ("lru") state. Rows used at the current
+    clock are never evicted. Victims are picked evict_batch at a time, so
+    an eviction costs O(1) amortized, and a victim visited after it was
+    picked is skipped.
+    """
+
+    EVICTION_POLICIES = ("lfu", "lru")
+
+    def __init__(self, n_actions, capacity=1024, max_rows=None, eviction="lfu"):
+        if eviction not in self.EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {eviction}")
+        self.n_actions = n_actions
+        self.index = {}  # state_id -> row
+        self.size = 0
+        self.dirty = set()  # rows written since the last checkpoint
+        self.max_rows = max_rows
+        self.eviction = eviction
+        self.evictions = 0
+        self.pruned = 0
+        self.clock = 0
+        if max_rows is not None:
+            capacity = min(capacity, max_rows)
+        self.state_ids = np.zeros(capacity, dtype=np.int64)
+        self.q1 = np.zeros((capacity, n_actions))
+        self.q2 = np.zeros((capacity, n_actions))
+        self.visits = np.zeros(capacity, dtype=np.int64)
+        self.last_used = np.zeros(capacity, dtype=np.int64)
+        self._victims = []        # rows picked for eviction, next victim last
+        self._victims_clock = 0   # clock they were picked at
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def row_bytes(self):
+        """Array bytes per row (Q1, Q2, state id, visits, last use), without the index."""
+        return 8 * (2 * self.n_actions + 3)
+
+    @classmethod
+    def rows_for_memory(cls, n_actions, max_mb):
+        """max_rows fitting the arrays of a table in max_mb megabytes."""
+        return max(1, int(max_mb * 2**20) // (8 * (2 * n_actions + 3)))
+
+    def tick(self):
+        """Advance the clock, e.g. at every training step."""
+        self.clock += 1
+
+    def lookup(self, state_id):
+        """Return the row of a state, or -1 if it was never visited."""
+        return self.index.get(state_id, -1)
+
+    def row(self, state_id, visit=True):
+        """
+        Return the row of a state, allocating a zero row on first visit.
+        visit=False (e.g. replayed transitions) stamps the row as in use without counting a visit.
+        """
+        row = self.index.get(state_id)
+        if row is None:
+            if self.max_rows is not None and self.size >= self.max_rows:
+                row = self._evict()
+            if row is None:
+                if self.size == len(self.state_ids):
+                    self._grow()
+                row = self.size
+                self.size += 1
+            self.index[state_id] = row
+            self.state_ids[row] = state_id
+        if visit:
+            self.visits[row] += 1
+        self.last_used[row] = self.clock
+        return row
+
+    def _grow(self):
+        capacity = max(1, 2 * len(self.state_ids))
+        if self.max_rows is not None and self.size < self.max_rows:
+            capacity = min(capacity, self.max_rows)
+        state_ids = np.zeros(capacity, dtype=np.int64)
+        q1 = np.zeros((capacity, self.n_actions))
+        q2 = np.zeros((capacity, self.n_actions))
+        visits = np.zeros(capacity, dtype=np.int64)
+        last_used = np.zeros(capacity, dtype=np.int64)
+        state_ids[:self.size] = self.state_ids[:self.size]
+        q1[:self.size] = self.q1[:self.size]
+        q2[:self.size] = self.q2[:self.size]
+        visits[:self.size] = self.visits[:self.size]
+        last_used[:self.size] = self.last_used[:self.size]
+        self.state_ids, self.q1, self.q2 = state_ids, q1, q2
+        self.visits, self.last_used = visits, last_used
+
+    # ----- Bounded mode -----
+    def _pick_victims(self):
+        """Queue the evict_batch rows to evict next, among the rows not used at the current clock."""
+        candidates = np.flatnonzero(self.last_used[:self.size] < self.clock)
+        batch = min(len(candidates), max(1, self.max_rows // 16))
+        if self.eviction == "lfu":
+            order = np.lexsort((self.last_used[candidates], self.visits[candidates]))
+        else:
+            order = np.argsort(self.last_used[candidates], kind="stable")
+        self._victims = candidates[order[:batch]][::-1].tolist()
+        self._victims_clock = self.clock
+
+    def _evict(self):
+        """Free the row of the next victim for a new state; None if every row is in use (the table grows)."""
+        while True:
+            if not self._victims:
+                self._pick_victims()
+                if not self._victims:
+                    return None
+            row = self._victims.pop()
+            if self.last_used[row] < self._victims_clock:
+                break
+        del self.index[int(self.state_ids[row])]
+        self.q1[row] = 0.0
+        self.q2[row] = 0.0
+        self.visits[row] = 0
+        self.dirty.add(row)
+        self.evictions += 1
+        return row
+
+    def bound(self, max_rows, eviction="lfu"):
+        """Switch to bounded mode (max_rows=None = unbounded), pruning the least used rows beyond max_rows."""
+        if eviction not in self.EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {eviction}")
+        self.max_rows, self.eviction = max_rows, eviction
+        self._victims = []
+        if max_rows is not None and self.size > max_rows:
+            if eviction == "lfu":
+                order = np.lexsort((self.last_used[:self.size], self.visits[:self.size]))
+            else:
+                order = np.argsort(self.last_used[:self.size], kind="stable")
+            keep = np.ones(self.size, dtype=bool)
+            keep[order[:self.size - max_rows]] = False
+            self.evictions += self.size - max_rows
+            self._compact(keep)
+
+    def prune(self, min_visits):
+        """Drop the states visited fewer than min_visits times; returns how many. Row numbers change."""
+        keep = self.visits[:self.size] >= min_visits
+        dropped = int(self.size - keep.sum())
+        if dropped:
+            self._compact(keep)
+            self.pruned += dropped
+        return dropped
+
+    def _compact(self, keep):
+        rows = np.flatnonzero(keep)
+        for name in ("state_ids", "q1", "q2", "visits", "last_used"):
+            arr = getattr(self, name)
+            kept = arr[rows]
+            arr = np.zeros(arr.shape, dtype=arr.dtype)  # fresh arrays, the old ones may be memory maps
+            arr[:len(rows)] = kept
+            setattr(self, name, arr)
+        self.size = len(rows)
+        self.index = {s: row for row, s in enumerate(self.state_ids[:self.size].tolist())}
+        self.dirty = set()
+        self._victims = []
+
+    def occupancy(self):
+        """Rows in use against the cap, with evictions and prunes so far."""
+        return {
+            "rows": self.size,
+            "max_rows": self.max_rows,
+            "fill": self.size / self.max_rows if self.max_rows else None,
+            "bytes": self.size * self.row_bytes,
+            "evictions": self.evictions,
+            "pruned": self.pruned,
+        }
+
+    def take_dirty(self):
+        """Return the sorted rows written since the last call and reset the dirty set."""
+        rows = np.fromiter(sorted(self.dirty), dtype=np.int64, count=len(self.dirty))
+        self.dirty = set()
+        return rows
+
+    def update_rows(self, state_ids, q1_rows, q2_rows, visits=None):
+        """Upsert the rows of the given states, e.g. from a checkpoint delta."""
+        rows = [self.row(s) for s in np.asarray(state_ids).tolist()]
+        self.q1[rows] = q1_rows
+        self.q2[rows] = q2_rows
+        if visits is not None:
+            self.visits[rows] = visits
+
+    # ----- Serialization helpers -----
+    def to_arrays(self):
+        """Return (state_ids, Q1, Q2) views trimmed to the used rows."""
+        return self.state_ids[:self.size], self.q1[:self.size], self.q2[:self.size]
+
+    @classmethod
+    def from_arrays(cls, state_ids, q1, q2, copy=True, visits=None):
+        """
+        Build a table from saved arrays. With copy=False the (writable) arrays,
+        e.g. copy-on-write memory maps, are adopted as they are until the table grows.
+        visits: saved visit counts, None = one visit per state.
+        """
+        state_ids = np.asarray(state_ids, dtype=np.int64)
+        q1 = np.asarray(q1, dtype=float)
+        table = cls(q1.shape[1], capacity=0 if not copy else max(1, len(state_ids)))
+        table.size = len(state_ids)
+        if copy:
+            table.state_ids[:table.size] = state_ids
+            table.q1[:table.size] = q1
+            table.q2[:table.size] = q2
+        else:
+            table.state_ids, table.q1, table.q2 = state_ids, q1, np.asarray(q2, dtype=float)
+        table.visits = np.ones(len(table.state_ids), dtype=np.int64)
+        if visits is not None:
+            table.visits[:table.size] = visits
+        table.last_used = np.zeros(len(table.state_ids), dtype=np.int64)
+        table.index = {s: row for row, s in enumerate(state_ids.tolist())}
+        return table
@@ -0,0 +1,44 @@
+import numpy as np
+
+
+class ReplayBuffer:
+    """
+    Ring buffer of Double Q transitions, preallocated as NumPy arrays.
+
+    A transition is (state id, action id, reward, next state id, next layer,
+    terminal); the layers are kept so a minibatch can mask each next state's
+    valid actions without decoding its id. Once full, the oldest transitions
+    are overwritten.
+    """
+
+    def __init__(self, capacity, seed=None):
+        self.capacity = capacity
+        self.size = 0
+        self._next = 0  # slot the next transition goes to
+        self.rng = np.random.default_rng(seed)
+        self.state_ids = np.zeros(capacity, dtype=np.int64)
+        self.action_ids = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity)
+        self.next_state_ids = np.zeros(capacity, dtype=np.int64)
+        self.layers = np.zeros(capacity, dtype=np.int64)
+        self.next_layers = np.zeros(capacity, dtype=np.int64)
+        self.terminal = np.zeros(capacity, dtype=bool)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state_id, action_id, reward, next_state_id, layer, next_layer, terminal):
+        i = self._next
+        self.state_ids[i] = state_id
+        self.action_ids[i] = action_id
+        self.rewards[i] = reward
+        self.next_state_ids[i] = next_state_id
+        self.layers[i] = layer
+        self.next_layers[i] = next_layer
+        self.terminal[i] = terminal
+        self._next = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def sample(self, batch_size):
+        """Slots of a uniform minibatch (with replacement)."""
+        return self.rng.integers(0, self.size, batch_size)
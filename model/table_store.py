@@ -0,0 +1,59 @@
+import os
+import re
+
+
+class DeadlineTableStore:
+    """
+    Double Q checkpoints kept per deadline bucket under one directory.
+
+    The reward scale depends on the deadline, so deadlines only share a table
+    with deadlines of the same bucket_ms wide bucket. A bucket without a table
+    is warm-started from the nearest trained bucket: its checkpoint is opened
+    memory-mapped copy-on-write (see DoubleQLearningAgent.load_qtables), so
+    every deadline warm-started from one neighbour shares its pages, and the
+    first save writes the new bucket's own file, leaving the neighbour as it was.
+    """
+
+    _NAME = re.compile(r"^q_d(\d+)\.ckpt$")
+
+    def __init__(self, directory, bucket_ms=20):
+        self.directory = directory
+        self.bucket_ms = bucket_ms
+        os.makedirs(directory, exist_ok=True)
+
+    def bucket(self, deadline):
+        """Bucket (ms) a deadline falls into."""
+        return int(deadline // self.bucket_ms * self.bucket_ms)
+
+    def path(self, bucket):
+        return os.path.join(self.directory, f"q_d{bucket}.ckpt")
+
+    def trained(self):
+        """Sorted buckets that have a checkpoint."""
+        buckets = []
+        for name in os.listdir(self.directory):
+            match = self._NAME.match(name)
+            if match:
+                buckets.append(int(match.group(1)))
+        return sorted(buckets)
+
+    def nearest(self, deadline, among=None):
+        """
+        Trained bucket closest to a deadline (ties → the shorter deadline), None if none is.
+        among: only consider these buckets, e.g. to not depend on what else finished first.
+        """
+        bucket = self.bucket(deadline)
+        trained = self.trained()
+        if among is not None:
+            trained = [b for b in trained if b in among]
+        if not trained:
+            return None
+        return min(trained, key=lambda b: (abs(b - bucket), b))
+
+    def source(self, deadline, among=None):
+        """Checkpoint to start a deadline from: its own bucket's, else the nearest neighbour's, else None."""
+        own = self.bucket(deadline)
+        if os.path.exists(self.path(own)):
+            return self.path(own)
+        nearest = self.nearest(deadline, among)
+        return None if nearest is None else self.path(nearest)
@@ -1 +0,0 @@
-print("Profiling data initialized.")
\ No newline at end of file
@@ -0,0 +1,195 @@
+import numpy as np
+from profiling.profile import ProfilingData, CompiledProfilingData
+
+
+# Widest layer whose 2 ** nodes placements are stacked up front (4096 placements);
+# with several edge devices, layers are enumerated up to the same number of placements
+MAX_ENUMERATED_NODES = 12
+
+
+class ActionCatalog:
+    """
+    Immutable catalog of the placements available at each layer.
+
+    With K = numberOfEdgeDevice edge devices every node goes to edge device
+    k < K or to the cloud (K), and an action id is the placement written in
+    base K + 1: digit i = location of node i. With a single edge device
+    this is the placement bitmask (bit i = node i on cloud).
+    actions[layer][action_id] is the (nodes, 2) action array
+    [[layer_idx, location], ...] used by the simulator.
+
+    Layers with more than 2 ** max_enumerated_nodes placements are not
+    enumerated: their entries in actions/masks/digits/cloud/mask_to_index
+    are None and get() builds the array of an action id on demand.
+    """
+
+    def __init__(self, profiling_data: ProfilingData, max_enumerated_nodes=MAX_ENUMERATED_NODES):
+        self.num_layers = len(profiling_data.layers)
+        self.num_nodes = tuple(profiling_data.get_num_nodes(l) for l in range(self.num_layers))
+        self.max_nodes = max(self.num_nodes)
+        self.num_devices = max(1, int(profiling_data.numberOfEdgeDevice or 1))
+        self.base = self.num_devices + 1
+        self.cloud_digit = self.num_devices
+        self.max_actions = self.base ** self.max_nodes
+        self.place = self.base ** np.arange(self.max_nodes, dtype=np.int64)  # value of each node's digit
+        self.place.flags.writeable = False
+        self._place_rows = self.place.tolist()
+        self.enumerated = tuple(self.base ** nodes <= 2 ** max_enumerated_nodes for nodes in self.num_nodes)
+        self.all_enumerated = all(self.enumerated)
+
+        self.actions = []   # per layer: (placements, nodes, 2) stacked action arrays
+        self.masks = []     # per layer: (placements,) action ids
+        self.digits = []    # per layer: (placements, nodes) location of every node
+        self.cloud = []     # per layer: (placements, nodes) bool, True = node on cloud
+        self.mask_to_index = []  # per layer: {action id: index into the stacked arrays}
+        self._has_cloud = []     # per layer: [action id → some node on the cloud]
+        self.used_locations = []  # per layer: [action id → bitmask of the locations used]
+        self._digit_rows = []     # per layer: [action id → list of node locations]
+        for layer_idx, nodes in enumerate(self.num_nodes):
+            if not self.enumerated[layer_idx]:
+                for per_layer in (self.actions, self.masks, self.digits, self.cloud, self.mask_to_index,
+                                  self._has_cloud, self.used_locations, self._digit_rows):
+                    per_layer.append(None)
+                continue
+            masks = np.arange(self.base ** nodes, dtype=np.int64)
+            digits = (masks[:, None] // self.place[:nodes]) % self.base
+            cloud = digits == self.cloud_digit
+            actions = np.zeros((len(masks), nodes, 2), dtype=int)
+            actions[:, :, 0] = layer_idx
+            actions[:, :, 1] = digits
+            for arr in (masks, digits, cloud, actions):
+                arr.flags.writeable = False
+            self.actions.append(actions)
+            self.masks.append(masks)
+            self.digits.append(digits)
+            self.cloud.append(cloud)
+            self.mask_to_index.append({int(m): i for i, m in enumerate(masks)})
+            self._has_cloud.append(cloud.any(axis=1).tolist())
+            self.used_locations.append(np.bitwise_or.reduce(1 << digits, axis=1).tolist())
+            self._digit_rows.append(digits.tolist())
+
+    def is_edge_only(self, layer_idx):
+        """First and last layer run on the edge."""
+        return layer_idx == 0 or layer_idx == (self.num_layers - 1)
+
+    def num_actions(self, layer_idx, edge_only_ends=True):
+        """Number of valid action ids for a layer."""
+        if edge_only_ends and self.is_edge_only(layer_idx):
+            return 1
+        return self.base ** self.num_nodes[layer_idx]
+
+    def fits(self, exact_max_nodes):
+        """Whether every layer has at most 2 ** exact_max_nodes placements (agents' "auto" action mode)."""
+        return self.max_actions <= 2 ** exact_max_nodes
+
+    def full_id(self, layer_idx):
+        """Action id placing every node of a layer on the cloud."""
+        return self.base ** self.num_nodes[layer_idx] - 1
+
+    def stacked(self, layer_idx):
+        """All placements of an enumerated layer as one (placements, nodes, 2) array."""
+        if not self.enumerated[layer_idx]:
+            raise ValueError(f"Layer {layer_idx} has {self.num_nodes[layer_idx]} nodes, too many to enumerate its placements")
+        return self.actions[layer_idx]
+
+    # ----- Placement digits -----
+    def location_digits(self, layer_idx, action_id):
+        """Location of every node of a layer (k < num_devices: edge device k, num_devices: cloud)."""
+        if self.enumerated[layer_idx]:
+            return self._digit_rows[layer_idx][action_id]
+        if self.base == 2:
+            return [(action_id >> i) & 1 for i in range(self.num_nodes[layer_idx])]
+        digits = []
+        for _ in range(self.num_nodes[layer_idx]):
+            action_id, digit = divmod(action_id, self.base)
+            digits.append(digit)
+        return digits
+
+    def digits_of(self, action_ids):
+        """(N, max_nodes) digits of an array of action ids (nodes past a layer's own read as 0)."""
+        return (np.asarray(action_ids, dtype=np.int64)[:, None] // self.place) % self.base
+
+    def has_cloud(self, layer_idx, action_id):
+        """Whether an action id puts some node of a layer on the cloud (False for -1 = no action)."""
+        if action_id < 0:
+            return False
+        if self.enumerated[layer_idx]:
+            return self._has_cloud[layer_idx][action_id]
+        if self.base == 2:
+            return action_id > 0
+        return self.cloud_digit in self.location_digits(layer_idx, action_id)
+
+    def locations(self, layer_idx, action_id):
+        """Bitmask of the locations (bit k = edge device k, bit num_devices = cloud) a placement uses."""
+        if self.enumerated[layer_idx]:
+            return self.used_locations[layer_idx][action_id]
+        if self.base == 2:  # edge unless all on the cloud, cloud unless all on the edge
+            return int(action_id != self.full_id(layer_idx)) | (int(action_id != 0) << 1)
+        used = 0
+        for digit in set(self.location_digits(layer_idx, action_id)):
+            used |= 1 << digit
+        return used
+
+    def get(self, layer_idx, action_id):
+        """Read-only action array for an action id (shared for enumerated layers)."""
+        if self.enumerated[layer_idx]:
+            return self.actions[layer_idx][self.mask_to_index[layer_idx][action_id]]
+        return self.build(layer_idx, action_id)
+
+    def build(self, layer_idx, action_id):
+        """Fresh read-only action array for an action id, in O(nodes)."""
+        nodes = self.num_nodes[layer_idx]
+        a = np.zeros((nodes, 2), dtype=int)
+        a[:, 0] = layer_idx
+        a[:, 1] = [(action_id // p) % self.base for p in self._place_rows[:nodes]]
+        a.flags.writeable = False
+        return a
+
+    def index_of(self, layer_idx, mask):
+        if self.enumerated[layer_idx]:
+            return self.mask_to_index[layer_idx][mask]
+        return mask
+
+    def id_of(self, action):
+        """Action id of an action array."""
+        action_id = 0
+        for place, location in zip(self._place_rows, action[:, 1].tolist()):
+            action_id += int(location) * place
+        return action_id
+
+    def id_of_mask(self, mask):
+        """Action id of a single-edge-device placement bitmask (bit i set = node i on cloud, else edge device 0)."""
+        action_id = 0
+        for place in self._place_rows:
+            if not mask:
+                break
+            if mask & 1:
+                action_id += self.cloud_digit * place
+            mask >>= 1
+        return action_id
+
+    @staticmethod
+    def mask_of(action):
+        """Placement bitmask of a single-edge-device action array (see id_of)."""
+        mask = 0
+        for i, placement in enumerate(action[:, 1].tolist()):
+            mask |= int(placement) << i
+        return mask
+
+    @staticmethod
+    def mask_of_key(action_key):
+        """Placement bitmask of an action given as a tuple of decisions."""
+        return sum(int(p) << i for i, p in enumerate(action_key))
+
+
+def get_action_catalog(profiling_data: ProfilingData) -> ActionCatalog:
+    """Return the catalog of a ProfilingData object, building it once."""
+    if isinstance(profiling_data, CompiledProfilingData):
+        return profiling_data.derived("action_catalog", ActionCatalog)
+    catalog = getattr(profiling_data, "_action_catalog", None)
+    num_nodes = tuple(len(layer) for layer in profiling_data.layers)
+    num_devices = max(1, int(profiling_data.numberOfEdgeDevice or 1))
+    if catalog is None or catalog.num_nodes != num_nodes or catalog.num_devices != num_devices:
+        catalog = ActionCatalog(profiling_data)
+        profiling_data._action_catalog = catalog
+    return catalog
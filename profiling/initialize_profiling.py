@@ -1,4 +1,5 @@
-from profiling.profile import ProfilingData
+import random
+from profiling.profile import CompiledProfilingData
 
 
 def get_profiling_data(deadline):
@@ -29,7 +30,7 @@ def get_profiling_data(deadline):
         (4, 0): 0.5
     }
 
-    profiling_data = ProfilingData(
+    profiling_data = CompiledProfilingData(
         numberOfEdgeDevice=numberOfEdgeDevice,
         layers=layers,
         node_edge_times=node_edge_times,
@@ -44,3 +45,42 @@ def get_profiling_data(deadline):
     )
     return profiling_data
 
+
+
+def get_synthetic_profiling_data(num_layers, nodes_per_layer, deadline=300, seed=0, output_size_range=None):
+    """
+    Random profile for scaling experiments: a single-node input and output layer
+    around num_layers - 2 hidden layers of nodes_per_layer parallel nodes.
+    output_size_range: (min, max) KB of per-node outputs, None = every node sends output_size.
+    """
+    rng = random.Random(seed)
+    layers = [[0]] + [list(range(nodes_per_layer)) for _ in range(num_layers - 2)] + [[0]]
+
+    node_edge_times, node_cloud_times, node_edge_powers = {}, {}, {}
+    node_output_sizes = {} if output_size_range is not None else None
+    for layer_idx, layer in enumerate(layers):
+        for node_idx in layer:
+            key = (layer_idx, node_idx)
+            if len(layer) == 1 and layer_idx in (0, len(layers) - 1):
+                node_edge_times[key], node_cloud_times[key], node_edge_powers[key] = 1, 0, 0.5
+                continue
+            node_edge_times[key] = rng.randint(20, 50)
+            node_cloud_times[key] = rng.randint(8, 25)
+            node_edge_powers[key] = round(rng.uniform(10.0, 14.0), 3)
+            if node_output_sizes is not None:
+                node_output_sizes[key] = rng.randint(*output_size_range)
+
+    return CompiledProfilingData(
+        numberOfEdgeDevice=2,
+        layers=layers,
+        node_edge_times=node_edge_times,
+        node_cloud_times=node_cloud_times,
+        bandwidth=5.0,
+        rtt=10.0,
+        output_size=5,
+        node_edge_powers=node_edge_powers,
+        edge_idle_power=4.0,
+        deadline=deadline,
+        edge_communication_power=5.0,
+        node_output_sizes=node_output_sizes,
+    )
@@ -1,3 +1,8 @@
+import copy
+import hashlib
+import numpy as np
+
+
 class ProfilingData:
     def __init__(
         self,
@@ -12,6 +17,7 @@ class ProfilingData:
         edge_idle_power,
         deadline,
         edge_communication_power,
+        node_output_sizes=None,  # Dict {(layer_idx, node_idx): output size KB}, default output_size
     ):
         self.numberOfEdgeDevice = numberOfEdgeDevice
         self.layers = layers
@@ -24,6 +30,7 @@ class ProfilingData:
         self.edge_idle_power = edge_idle_power
         self.deadline = deadline
         self.edge_communication_power = edge_communication_power
+        self.node_output_sizes = node_output_sizes
 
     def get_num_nodes(self, layer_idx):
         return len(self.layers[layer_idx])
@@ -37,6 +44,12 @@ class ProfilingData:
     def get_node_edge_power(self, layer_idx, node_idx):
         return self.node_edge_powers.get((layer_idx, node_idx), 0.0)
 
+    def get_node_output_size(self, layer_idx, node_idx):
+        """Size (KB) of the output a node sends to the next layer."""
+        if self.node_output_sizes is None:
+            return self.output_size
+        return self.node_output_sizes.get((layer_idx, node_idx), self.output_size)
+
     def get_total_nodes(self):
         total_nodes = sum(len(layer) for layer in self.layers)
         return total_nodes
@@ -55,3 +68,229 @@ class ProfilingData:
         for node_idx in range(len(self.layers[layer_idx])):
             layer_time += self.get_node_edge_time(layer_idx, node_idx)
         return layer_time
+
+    def get_fractional_deadline(self, layer_idx: int):
+        """Share of the deadline (s) given to a layer, proportional to its edge time."""
+        return (self.get_edge_time_for_layer(layer_idx) / self.get_total_edge_time()) * (self.deadline / 1000.0)
+
+    def fingerprint(self):
+        """Short hash of every field but the deadline, to tell which profile saved tables were learned on."""
+        fields = (
+            self.numberOfEdgeDevice,
+            [list(layer) for layer in self.layers],
+            sorted(self.node_edge_times.items()),
+            sorted(self.node_cloud_times.items()),
+            sorted(self.node_edge_powers.items()),
+            self.bandwidth,
+            self.rtt,
+            self.output_size,
+            self.edge_idle_power,
+            self.edge_communication_power,
+        )
+        if self.node_output_sizes is not None:
+            fields += (sorted(self.node_output_sizes.items()),)
+        return hashlib.sha256(repr(fields).encode("utf-8")).hexdigest()[:16]
+
+
+# Fields the compiled arrays (and the action catalog, cost tables, ... derived from them) depend on
+_NODE_FIELDS = ("layers", "node_edge_times", "node_cloud_times", "node_edge_powers", "output_size", "node_output_sizes",
+                "numberOfEdgeDevice")
+
+
+class CompiledProfilingData(ProfilingData):
+    """
+    ProfilingData with the (layer, node) dicts compiled into padded NumPy arrays
+    of shape (layers, max_nodes) and the per-layer aggregates computed once.
+
+    Assigning a node field drops everything compiled, assigning the deadline
+    drops only the fractional deadlines; both are rebuilt on next access.
+    In-place edits of the node dicts are not seen, call invalidate() after them.
+    """
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in _NODE_FIELDS:
+            self.invalidate()
+        elif name == "deadline":
+            self.__dict__["_deadline_cache"] = None
+
+    @classmethod
+    def from_profiling(cls, profiling_data: ProfilingData):
+        if isinstance(profiling_data, cls):
+            return profiling_data
+        return cls(
+            numberOfEdgeDevice=profiling_data.numberOfEdgeDevice,
+            layers=profiling_data.layers,
+            node_edge_times=profiling_data.node_edge_times,
+            node_cloud_times=profiling_data.node_cloud_times,
+            bandwidth=profiling_data.bandwidth,
+            rtt=profiling_data.rtt,
+            output_size=profiling_data.output_size,
+            node_edge_powers=profiling_data.node_edge_powers,
+            edge_idle_power=profiling_data.edge_idle_power,
+            deadline=profiling_data.deadline,
+            edge_communication_power=profiling_data.edge_communication_power,
+            node_output_sizes=getattr(profiling_data, "node_output_sizes", None),
+        )
+
+    def with_deadline(self, deadline):
+        """
+        Copy for another deadline. The compiled arrays and everything registered
+        through derived() are shared, only the fractional deadlines are re-derived.
+        """
+        self._compiled()  # compile before copying so the cache is shared
+        clone = copy.copy(self)
+        clone.deadline = deadline
+        return clone
+
+    def derived(self, key, build):
+        """
+        Deadline-independent data built from this profile once (e.g. the action
+        catalog or cost tables), shared with with_deadline copies and dropped with
+        the compiled arrays when a node field changes.
+        """
+        cache = self._compiled()
+        value = cache.get(key)
+        if value is None:
+            value = build(self)
+            cache[key] = value
+        return value
+
+    def invalidate(self):
+        self.__dict__["_cache"] = None
+        self.__dict__["_deadline_cache"] = None
+
+    def _compiled(self):
+        cache = self.__dict__.get("_cache")
+        if cache is None:
+            cache = self._compile()
+            self.__dict__["_cache"] = cache
+        return cache
+
+    def _compile(self):
+        num_nodes = np.array([len(layer) for layer in self.layers], dtype=np.int64)
+        shape = (len(self.layers), int(num_nodes.max()))
+        edge_times = np.zeros(shape)
+        cloud_times = np.zeros(shape)
+        edge_powers = np.zeros(shape)
+        output_sizes = np.zeros(shape)
+        node_mask = np.arange(shape[1]) < num_nodes[:, None]
+        for layer_idx, nodes in enumerate(num_nodes):
+            for node_idx in range(nodes):
+                key = (layer_idx, node_idx)
+                edge_times[key] = self.node_edge_times.get(key, 0.0)
+                cloud_times[key] = self.node_cloud_times.get(key, 0.0)
+                edge_powers[key] = self.node_edge_powers.get(key, 0.0)
+                output_sizes[key] = ProfilingData.get_node_output_size(self, layer_idx, node_idx)
+
+        layer_edge_times = edge_times.sum(axis=1)
+        cache = {
+            "num_nodes": num_nodes,
+            "node_mask": node_mask,
+            "edge_times": edge_times,
+            "cloud_times": cloud_times,
+            "edge_powers": edge_powers,
+            "output_sizes": output_sizes,
+            "layer_edge_times": layer_edge_times,
+            "total_edge_time": float(layer_edge_times.sum()),
+            # J per layer when every node runs on the edge
+            "all_edge_energy": (edge_powers * edge_times / 1000.0).sum(axis=1),
+        }
+        for arr in list(cache.values()):
+            if isinstance(arr, np.ndarray):
+                arr.flags.writeable = False
+        # Python rows for the scalar accessors: list indexing returns plain floats,
+        # which keeps per-node loops in the scalar simulator cheap
+        for key in ("edge_times", "cloud_times", "edge_powers", "output_sizes"):
+            cache[key + "_rows"] = cache[key].tolist()
+        return cache
+
+    # ---- Compiled arrays ----
+    @property
+    def num_nodes(self):
+        return self._compiled()["num_nodes"]
+
+    @property
+    def node_mask(self):
+        return self._compiled()["node_mask"]
+
+    @property
+    def edge_times(self):
+        """Edge compute time (ms) per (layer, node), zero padded."""
+        return self._compiled()["edge_times"]
+
+    @property
+    def cloud_times(self):
+        """Cloud compute time (ms) per (layer, node), zero padded."""
+        return self._compiled()["cloud_times"]
+
+    @property
+    def edge_powers(self):
+        """Edge power (W) per (layer, node), zero padded."""
+        return self._compiled()["edge_powers"]
+
+    @property
+    def output_sizes(self):
+        """Output size (KB) per (layer, node), zero padded."""
+        return self._compiled()["output_sizes"]
+
+    @property
+    def layer_edge_times(self):
+        return self._compiled()["layer_edge_times"]
+
+    @property
+    def all_edge_energy(self):
+        return self._compiled()["all_edge_energy"]
+
+    @property
+    def fractional_deadlines(self):
+        """Per-layer share of the deadline in seconds."""
+        fractional = self.__dict__.get("_deadline_cache")
+        if fractional is None:
+            cache = self._compiled()
+            fractional = (cache["layer_edge_times"] / cache["total_edge_time"]) * (self.deadline / 1000.0)
+            fractional.flags.writeable = False
+            self.__dict__["_deadline_cache"] = fractional
+        return fractional
+
+    # ---- O(1) accessors ----
+    # Padding is zero, like the dict defaults; only indices past the padding need handling.
+    def get_node_edge_time(self, layer_idx, node_idx):
+        try:
+            return (self._cache or self._compiled())["edge_times_rows"][layer_idx][node_idx]
+        except IndexError:
+            return 0.0
+
+    def get_node_cloud_time(self, layer_idx, node_idx):
+        try:
+            return (self._cache or self._compiled())["cloud_times_rows"][layer_idx][node_idx]
+        except IndexError:
+            return 0.0
+
+    def get_node_edge_power(self, layer_idx, node_idx):
+        try:
+            return (self._cache or self._compiled())["edge_powers_rows"][layer_idx][node_idx]
+        except IndexError:
+            return 0.0
+
+    def get_node_output_size(self, layer_idx, node_idx):
+        try:
+            return (self._cache or self._compiled())["output_sizes_rows"][layer_idx][node_idx]
+        except IndexError:
+            return self.output_size
+
+    def get_total_nodes(self):
+        return int(self.num_nodes.sum())
+
+    def get_total_edge_time(self):
+        return self._compiled()["total_edge_time"]
+
+    def get_edge_time_for_layer(self, layer_idx: int):
+        return self.layer_edge_times[layer_idx]
+
+    def get_fractional_deadline(self, layer_idx: int):
+        return self.fractional_deadlines[layer_idx]
+
+    def get_all_edge_energy(self):
+        """Total energy (J) when every node runs on the edge."""
+        return float(self.all_edge_energy.sum())
@@ -0,0 +1,313 @@
+import numpy as np
+from simulator.batch_simulator import BatchCloudEdgeSimulator, BatchState
+from simulator.cost_tables import get_cost_tables
+from simulator.transfer import get_transfer_model
+from profiling.profile import ProfilingData, CompiledProfilingData
+from profiling.action_catalog import get_action_catalog
+
+# Bandwidth range the simulator keeps the link in (Mbps)
+BANDWIDTH_RANGE = (1.0, 30.0)
+
+
+def _interp(x, grid):
+    """(lower index, weight of the upper neighbour) of x on a uniform grid, clamped to its ends."""
+    pos = np.clip((x - grid[0]) / (grid[1] - grid[0]), 0.0, len(grid) - 1)
+    lower = np.minimum(pos.astype(np.int64), len(grid) - 2)
+    return lower, pos - lower
+
+
+def _transition_matrix(grid, samples):
+    """
+    T[i, j] = probability of landing on grid[j] from row i, whose value moves
+    to each of samples[i] (shape (rows, K), equally likely) and is split
+    linearly between its two neighbouring grid points.
+    """
+    lower, w = _interp(samples, grid)
+    rows = np.broadcast_to(np.arange(len(samples))[:, None], lower.shape)
+    matrix = np.zeros((len(samples), len(grid)))
+    k = samples.shape[1]
+    np.add.at(matrix, (rows, lower), (1.0 - w) / k)
+    np.add.at(matrix, (rows, lower + 1), w / k)
+    return matrix
+
+
+def _quadrature(lo, hi, k):
+    """Midpoints of k equal slices of U(lo, hi)."""
+    return lo + (np.arange(k) + 0.5) / k * (hi - lo)
+
+
+class OracleModel:
+    """
+    Deadline-independent part of the oracle's MDP: the bandwidth and cloud
+    time grids, the step costs of every (bandwidth, cloud time, previous
+    placement, action) and the bandwidth / cloud time transition matrices.
+    Built once per profile and grid options, see get_oracle_model.
+    """
+
+    def __init__(self, profiling_data: ProfilingData, bandwidth_step=1.0, cloud_time_step=10.0, quadrature=16):
+        self.profiling = CompiledProfilingData.from_profiling(profiling_data)
+        self.actions = get_action_catalog(self.profiling)
+        if not self.actions.all_enumerated:
+            raise ValueError("OracleScheduler enumerates every placement; some layer is too wide")
+        self.quadrature = quadrature
+        self.num_layers = self.actions.num_layers
+        self.tables = get_cost_tables(self.profiling)
+        self.transfer = get_transfer_model(self.profiling)
+        self.n_actions = [self.actions.num_actions(l) for l in range(self.num_layers)]
+        # Previous placements of a layer: the previous layer's action ids, none (-1) for the first
+        self.prev_masks = [np.array([-1])] + [np.arange(n) for n in self.n_actions[:-1]]
+
+        lo, hi = BANDWIDTH_RANGE
+        self.bandwidth_grid = np.arange(lo, hi + 1e-9, bandwidth_step)
+        max_cloud_ms = float(self.tables.cloud_proc_ms.max()) + 100.0
+        self.cloud_time_grid = np.arange(0.0, max_cloud_ms + cloud_time_step, cloud_time_step)
+        self.bandwidth_matrix = self._bandwidth_matrix()
+
+        self.energy, self.completion_s, self.prev_groups, self.prev_group, self.prev_has_cloud = [], [], [], [], []
+        for layer in range(self.num_layers):
+            energy, completion_s, kb = self._step_costs(layer)
+            prev_has_cloud = self.tables.prev_has_cloud(np.full(len(self.prev_masks[layer]), layer),
+                                                        self.prev_masks[layer])
+            # previous placements moving the same data and leaving the cloud in the same state cost the same
+            _, first, group = np.unique(np.column_stack([kb, prev_has_cloud]), axis=0,
+                                        return_index=True, return_inverse=True)
+            self.energy.append(energy)
+            self.completion_s.append(completion_s)
+            self.prev_groups.append(first)         # representative previous placement of every group
+            self.prev_group.append(group.ravel())  # group of every previous placement
+            self.prev_has_cloud.append(prev_has_cloud)
+
+    def _step_costs(self, layer):
+        """
+        Energy (J) and completion time (s) of every (bandwidth, cloud time, prev,
+        action), shape (B, C, P, A), and the (P, A) KB crossing the link.
+        """
+        ids = np.arange(self.n_actions[layer])
+        prev = self.prev_masks[layer]
+        layers = np.full(len(ids), layer)
+        edge_time_s, edge_energy, _, has_cloud = self.tables.lookup(layers, ids)
+        slack_s = self.tables.slack(layers, ids)
+
+        pairs_prev, pairs_ids = np.repeat(prev, len(ids)), np.tile(ids, len(prev))
+        kb = self.transfer.crossing_kb_batch(np.full(len(pairs_ids), layer), pairs_prev, pairs_ids)
+        kb = kb.reshape(len(prev), len(ids))
+        transmission_s = self.transfer.transfer_time_s(kb[None, :, :], self.bandwidth_grid[:, None, None])
+
+        idle_s = np.where(has_cloud, np.maximum(0.0, self.cloud_time_grid[:, None] / 1000.0 - edge_time_s), 0.0)
+        idle_device_s = idle_s * self.tables.num_devices + slack_s
+        energy = (self.profiling.edge_communication_power * transmission_s[:, None]
+                  + edge_energy + self.profiling.edge_idle_power * idle_device_s[None, :, None, :])
+        completion_s = transmission_s[:, None] + edge_time_s + idle_s[None, :, None, :]
+        return energy, completion_s, kb
+
+    def _bandwidth_matrix(self):
+        grid = self.bandwidth_grid
+        moves = grid[:, None] + _quadrature(-5.0, 5.0, self.quadrature)
+        return _transition_matrix(grid, np.clip(moves, *BANDWIDTH_RANGE))
+
+    def cloud_time_matrices(self, layer):
+        """
+        (new work, drain, decay): distribution of the next cloud time for each
+        action that puts work on the cloud (A, C), and the (C, C) matrices of
+        the previous work draining (U(10, 20)) or idle decay (U(0, 10)).
+        Cloud times below zero behave like zero and are clamped to it.
+        """
+        grid = self.cloud_time_grid
+        ids = np.arange(self.n_actions[layer])
+        cloud_proc_ms = self.tables.lookup(np.full(len(ids), layer), ids)[2]
+        congestion = _quadrature(0.0, 100.0, self.quadrature)
+        new_work = _transition_matrix(grid, cloud_proc_ms[:, None] + congestion)
+        drain = _transition_matrix(grid, np.maximum(grid[:, None] - _quadrature(10.0, 20.0, self.quadrature), 0.0))
+        decay = _transition_matrix(grid, np.maximum(grid[:, None] - _quadrature(0.0, 10.0, self.quadrature), 0.0))
+        return new_work, drain, decay
+
+
+def get_oracle_model(profiling_data: ProfilingData, bandwidth_step=1.0, cloud_time_step=10.0,
+                     quadrature=16) -> OracleModel:
+    """Return the oracle model of a profile, shared by all its with_deadline copies."""
+    return CompiledProfilingData.from_profiling(profiling_data).derived(
+        ("oracle_model", bandwidth_step, cloud_time_step, quadrature),
+        lambda p: OracleModel(p, bandwidth_step, cloud_time_step, quadrature),
+    )
+
+
+class OracleScheduler:
+    """
+    Backward induction over the discretized expected-cost MDP of a profile.
+
+    State: (layer, bandwidth, cloud time, surplus, previous placement), with
+    bandwidth, cloud time and surplus on uniform grids; the previous
+    placement is exact. Costs and transitions are the simulator's: step
+    costs from the cost tables and the transfer model, the uniform noise of
+    get_next_state integrated with `quadrature` midpoints per draw, and
+    values between grid points interpolated linearly.
+
+    The cost of a step is the negated reward of calculate_reward without
+    its early-finish bonus on the last layer: the energy, or on a missed
+    fractional deadline (energy + 100 * delay) * 1e6. The bonus needs the
+    count of early layers in the state, which the scheduler does without.
+    Layers are solved over every state at once, once per group of previous
+    placements with the same costs (see OracleModel) and chunk_elements
+    (state, action) values at a time; first/last layers are edge only, as
+    for the Double Q agent.
+    """
+
+    def __init__(self, profiling_data: ProfilingData, gamma=1.0, bandwidth_step=1.0, cloud_time_step=10.0,
+                 surplus_points=256, quadrature=16, chunk_elements=1 << 20):
+        self.profiling = CompiledProfilingData.from_profiling(profiling_data).with_deadline(profiling_data.deadline)
+        self.model = get_oracle_model(self.profiling, bandwidth_step, cloud_time_step, quadrature)
+        self.actions = self.model.actions
+        self.gamma = gamma
+        self.chunk_elements = chunk_elements
+        self.num_layers = self.model.num_layers
+        self.n_actions = self.model.n_actions
+        self.bandwidth_grid = self.model.bandwidth_grid
+        self.cloud_time_grid = self.model.cloud_time_grid
+        # Surplus: from finishing every layer instantly to the slowest placements all the way
+        deadline_s = self.profiling.deadline / 1000.0
+        slowest = sum(float(completion_s.max()) for completion_s in self.model.completion_s)
+        self.surplus_grid = np.linspace(-deadline_s, max(slowest - deadline_s, 0.0) + 1e-3, surplus_points)
+
+        self.policy = None  # per layer: action id of shape (bandwidth, cloud time, surplus, prev group)
+        self.values = None  # per layer: expected cost-to-go of the same shape
+
+    # ----- Solver -----
+    def solve(self):
+        """Backward induction from the last layer; fills self.values and self.policy."""
+        model = self.model
+        B, C, S = len(self.bandwidth_grid), len(self.cloud_time_grid), len(self.surplus_grid)
+        surplus = self.surplus_grid[None, None, :, None]
+        chunk = max(1, self.chunk_elements // (B * C * S))
+        values, policy = [None] * self.num_layers, [None] * self.num_layers
+        next_values = next_group = None  # cost-to-go of the next layer per prev group, and the group of each action
+
+        for layer in reversed(range(self.num_layers)):
+            n_actions = self.n_actions[layer]
+            fractional_deadline_s = self.profiling.fractional_deadlines[layer]
+            has_cloud = model.tables.has_cloud[layer, :n_actions]
+            groups = model.prev_groups[layer]
+            best_value = np.full((B, C, S, len(groups)), np.inf)
+            best_action = np.zeros((B, C, S, len(groups)), dtype=np.int64)
+            if next_values is not None:
+                new_work, drain, decay = model.cloud_time_matrices(layer)
+
+            for first in range(0, n_actions, chunk):
+                acts = slice(first, min(first + chunk, n_actions))
+                width = acts.stop - acts.start
+                if next_values is None:
+                    new_work_value = drain_value = decay_value = np.zeros((B, C, S, width))
+                else:
+                    # expectation over the bandwidth change, then over the cloud time change
+                    following = next_values[..., next_group[acts]]
+                    expected = (model.bandwidth_matrix @ following.reshape(B, -1)).reshape(B, C, S * width)
+                    new_work_value = np.einsum("ac,bcsa->bsa", new_work[acts],
+                                               expected.reshape(B, C, S, width))[:, None]
+                    drain_value = (drain @ expected).reshape(B, C, S, width)
+                    decay_value = (decay @ expected).reshape(B, C, S, width)
+
+                for g, p in enumerate(groups.tolist()):
+                    # cost-to-go after each action from the next cloud time, before the next surplus is known
+                    follow = np.where(has_cloud[acts], new_work_value,
+                                      drain_value if model.prev_has_cloud[layer][p] else decay_value)
+                    follow = np.broadcast_to(follow, (B, C, S, width))
+
+                    t = model.completion_s[layer][:, :, p, acts][:, :, None, :]   # (B, C, 1, a)
+                    constrained = t + surplus                                    # (B, C, S, a)
+                    delay = constrained - fractional_deadline_s
+                    e = model.energy[layer][:, :, p, acts][:, :, None, :]
+                    cost = np.where(delay > 0, (e + delay * 100) * 1000000, e)
+
+                    lower, w = _interp(delay, self.surplus_grid)
+                    after = (np.take_along_axis(follow, lower, axis=2) * (1.0 - w)
+                             + np.take_along_axis(follow, lower + 1, axis=2) * w)
+                    q = cost + self.gamma * after
+                    best = q.argmin(axis=3)
+                    value = np.take_along_axis(q, best[..., None], axis=3)[..., 0]
+                    better = value < best_value[..., g]  # ties keep the lower action id, as argmin does
+                    best_value[..., g] = np.where(better, value, best_value[..., g])
+                    best_action[..., g] = np.where(better, best + acts.start, best_action[..., g])
+
+            values[layer], policy[layer] = best_value, best_action
+            next_values, next_group = best_value, model.prev_group[layer]
+        self.values, self.policy = values, policy
+        return self
+
+    # ----- Policy -----
+    def _nearest(self, x, grid):
+        return np.clip(np.rint((x - grid[0]) / (grid[1] - grid[0])).astype(np.int64), 0, len(grid) - 1)
+
+    def decide_ids(self, state: BatchState):
+        """Action id of every environment, from the nearest grid state."""
+        if self.policy is None:
+            self.solve()
+        b = self._nearest(state.bandwidth, self.bandwidth_grid)
+        c = self._nearest(np.maximum(state.cloud_time, 0.0), self.cloud_time_grid)
+        s = self._nearest(state.surplus, self.surplus_grid)
+        p = np.maximum(state.prev_mask, 0)  # the first layer's only prev (none) is index 0
+        action_ids = np.zeros(len(state), dtype=np.int64)
+        for layer in np.unique(state.layer).tolist():
+            at = state.layer == layer
+            group = self.model.prev_group[layer][p[at]]
+            action_ids[at] = self.policy[layer][b[at], c[at], s[at], group]
+        return action_ids
+
+    def expected_cost(self, bandwidth=None):
+        """Expected cost of an episode from the initial state (cloud time 0, no surplus)."""
+        if self.values is None:
+            self.solve()
+        bandwidth = self.profiling.bandwidth if bandwidth is None else bandwidth
+        lower, w = _interp(np.asarray(float(bandwidth)), self.bandwidth_grid)
+        s = self._nearest(0.0, self.surplus_grid)
+        v = self.values[0][:, 0, s, self.model.prev_group[0][0]]
+        return float(v[lower] * (1.0 - w) + v[lower + 1] * w)
+
+
+def get_oracle(profiling_data: ProfilingData, **options) -> OracleScheduler:
+    """Solved oracle of a profile and deadline."""
+    return OracleScheduler(profiling_data, **options).solve()
+
+
+def run_oracle_scheduler(profiling_data: ProfilingData, episodes=10, max_steps=20, seed=None, metrics=None,
+                         oracle=None, chunk_size=65536):
+    """
+    Roll out the oracle's policy on the batch simulator, episodes stepped
+    together chunk_size at a time like run_random_scheduler, and return
+    (mean energy, mean completion time ms). Each episode starts from the
+    profile's bandwidth with no cloud work and no surplus, as the agents' do.
+    oracle: a solved OracleScheduler of this profile, None = solve one now.
+    metrics: a MetricsSink receiving the episodes; its deadline defaults to the profile's.
+    """
+    oracle = oracle if oracle is not None else get_oracle(profiling_data)
+    simulator = BatchCloudEdgeSimulator(profiling_data, rng=np.random.default_rng(seed))
+    if metrics is not None and metrics.deadline_ms is None:
+        metrics.deadline_ms = profiling_data.deadline
+
+    total_energy, total_time = 0.0, 0.0
+    for first in range(0, episodes, chunk_size):
+        n = min(chunk_size, episodes - first)
+        state = BatchState.initial(n, profiling_data.bandwidth)
+        episode_energies = np.zeros(n)
+        episode_completion_times = np.zeros(n)
+        active = np.ones(n, dtype=bool)
+
+        for step in range(max_steps):
+            action_ids = oracle.decide_ids(state)
+            energy, completion_time_s, _, next_state, terminal = simulator.step(state, action_ids)
+            if metrics is not None and metrics.wants_steps:
+                metrics.step(first + np.flatnonzero(active), step, state.layer[active], action_ids[active],
+                             energy[active], completion_time_s[active])
+            episode_energies += np.where(active, energy, 0.0)
+            episode_completion_times += np.where(active, completion_time_s * 1000, 0.0)  # ms
+            state = next_state
+            active &= ~terminal
+            if not active.any():
+                break
+
+        total_energy += np.sum(episode_energies)
+        total_time += np.sum(episode_completion_times)
+        if metrics is not None:
+            metrics.episodes_batch(episode_energies, episode_completion_times)
+
+    if metrics is not None:
+        metrics.close()
+    return total_energy / episodes, total_time / episodes
@@ -1,8 +1,37 @@
 import random
 import numpy as np
-import matplotlib.pyplot as plt
-from simulator.simulator import CloudEdgeSimulator
-from profiling.profile import ProfilingData
+from simulator.batch_simulator import BatchCloudEdgeSimulator, BatchState
+from profiling.profile import ProfilingData, CompiledProfilingData
+from profiling.action_catalog import get_action_catalog
+
+# Episodes stepped together per batch; larger runs go chunk by chunk
+RANDOM_CHUNK_SIZE = 65536
+
+
+def get_random_action_id(profiling_data: ProfilingData, layer_idx: int):
+    """Random action id for a single layer (first & last layer forced to edge)."""
+    actions = get_action_catalog(profiling_data)
+    if actions.is_edge_only(layer_idx):
+        return 0
+
+    locations = list(range(actions.base))  # edge devices, then the cloud
+    action_id = 0
+    for node in range(actions.num_nodes[layer_idx]):
+        action_id += random.choice(locations) * int(actions.place[node])
+    return action_id
+
+
+def get_all_edge_action_id(profilingData: ProfilingData, layer_idx: int):
+    """All nodes on edge for a single layer, spread over the edge devices."""
+    return int(_all_edge_ids(profilingData)[layer_idx])
+
+
+def get_all_cloud_action_id(profilingData: ProfilingData, layer_idx: int):
+    """All nodes on cloud for a single layer (except first/last, forced to edge)."""
+    actions = get_action_catalog(profilingData)
+    if actions.is_edge_only(layer_idx):
+        return 0  # input/output must be edge
+    return actions.full_id(layer_idx)  # all cloud
 
 
 def get_random_action(profiling_data: ProfilingData, layer_idx: int):
@@ -10,93 +39,128 @@ def get_random_action(profiling_data: ProfilingData, layer_idx: int):
     Generate a random action for a single layer in the format:
     [[layer_idx, decision], ...]
     """
-    num_nodes = profiling_data.get_num_nodes(layer_idx)
+    return get_action_catalog(profiling_data).get(layer_idx, get_random_action_id(profiling_data, layer_idx))
 
-    a = np.zeros((num_nodes, 2), dtype=int)
-    a[:, 0] = layer_idx
 
-    if layer_idx == 0 or layer_idx == (len(profiling_data.layers) - 1):
-        a[:, 1] = 0  # first & last layer forced to edge
-    else:
-        for node in range(num_nodes):
-            a[node, 1] = random.choice([0, 1])
-
-    return a
 def get_all_edge_action(profilingData: ProfilingData, layer_idx: int):
     """All nodes on edge for a single layer."""
-    num_nodes = profilingData.get_num_nodes(layer_idx)
-    a = np.zeros((num_nodes, 2), dtype=int)
-    a[:, 0] = layer_idx
-    a[:, 1] = 0  # all edge
-    return a
+    return get_action_catalog(profilingData).get(layer_idx, get_all_edge_action_id(profilingData, layer_idx))
 
 
 def get_all_cloud_action(profilingData: ProfilingData, layer_idx: int):
     """All nodes on cloud for a single layer (except first/last, forced to edge)."""
-    num_nodes = profilingData.get_num_nodes(layer_idx)
-    a = np.zeros((num_nodes, 2), dtype=int)
-    a[:, 0] = layer_idx
-    if layer_idx == 0 or layer_idx == (len(profilingData.layers) - 1):
-        a[:, 1] = 0  # input/output must be edge
-    else:
-        a[:, 1] = 1  # all cloud
-    return a
+    return get_action_catalog(profilingData).get(layer_idx, get_all_cloud_action_id(profilingData, layer_idx))
 
-def run_random_scheduler(profiling_data: ProfilingData, episodes=10, max_steps=20, is_random=True, is_all_cloud=False):
+def get_random_action_ids(profiling_data: ProfilingData, layers, rng):
+    """Random action id for every environment of a batch."""
+    counts = _action_counts(profiling_data)
+    return rng.integers(0, counts[layers])
+
+
+def get_all_edge_action_ids(profiling_data: ProfilingData, layers, rng=None):
+    return _all_edge_ids(profiling_data)[layers]
+
+
+def get_all_cloud_action_ids(profiling_data: ProfilingData, layers, rng=None):
+    # first/last layer have a single (edge) action, the others' last id is all-cloud
+    return _action_counts(profiling_data)[layers] - 1
+
+
+def _all_edge_ids(profiling_data: ProfilingData):
+    """All-edge action id of every layer, built once per profile."""
+    return CompiledProfilingData.from_profiling(profiling_data).derived("all_edge_ids", _build_all_edge_ids)
+
+
+def _build_all_edge_ids(p: CompiledProfilingData):
+    """
+    Longest processing time first: the slowest remaining node of a layer goes
+    to the least busy edge device, which keeps the layer's edge time close to
+    the balanced one. With a single edge device every id is 0.
+    """
+    actions = get_action_catalog(p)
+    ids = np.zeros(actions.num_layers, dtype=np.int64)
+    for layer_idx in range(actions.num_layers):
+        if actions.is_edge_only(layer_idx):
+            continue  # input/output run on the first edge device
+        edge_times = p.edge_times[layer_idx, :actions.num_nodes[layer_idx]].tolist()
+        busy = [0.0] * actions.num_devices
+        action_id = 0
+        for node in sorted(range(len(edge_times)), key=lambda i: -edge_times[i]):
+            device = busy.index(min(busy))
+            busy[device] += edge_times[node]
+            action_id += device * int(actions.place[node])
+        ids[layer_idx] = action_id
+    ids.flags.writeable = False
+    return ids
+
+
+def _action_counts(profiling_data: ProfilingData):
+    actions = get_action_catalog(profiling_data)
+    return np.array([actions.num_actions(l) for l in range(actions.num_layers)], dtype=np.int64)
+
+
+def run_random_scheduler(profiling_data: ProfilingData, episodes=10, max_steps=20, is_random=True, is_all_cloud=False, seed=None,
+                         metrics=None, chunk_size=RANDOM_CHUNK_SIZE):
     """
     Run random offloading scheduler benchmark over multiple episodes.
     Collect per-episode reward, energy, and completion time.
+    All episodes are independent, so they are stepped together on the batch
+    simulator, chunk_size episodes at a time to keep the memory bounded.
+    seed: seed of the simulator's random generator, None = fresh entropy.
+    metrics: a MetricsSink receiving the episodes (one batch per chunk) and,
+    if it asks for them, one array record per step; its deadline defaults to the profile's.
     """
-    episode_energies = []
-    episode_completion_times = []
-
-    for ep in range(episodes):
-        energies = []
-        times = []
-
-        simulator = CloudEdgeSimulator(profiling_data)
-        initial_bandwidth = 15.0
-        initial_cloud_time = 0.0
-        initial_layer = 0
-        prev_action = None
-        state = (initial_bandwidth, initial_cloud_time, initial_layer, prev_action, 0, 0)  # (bandwidth, cloud_time, layer, prev_action, surplus, negative_surplus_count)
-
-        for step in range(max_steps):
-            action = get_random_action(profiling_data, state[2]) if is_random else get_all_cloud_action(profiling_data, state[2]) if is_all_cloud else get_all_edge_action(profiling_data, state[2])   
-            next_state, terminal, cloud_time = simulator.get_next_state(state, action, 0, state[5])
-            total_energy, completion_time = simulator.compute_energy_and_time(state, action, cloud_time)
-
-        #             energy, completion_time = self.simulator.compute_energy_and_time(current_state=current_state, current_action=action, cloud_pending_ms= current_state[1])
-        # reward, surplus, negative_surplus_count = self.simulator.calculate_reward(int(current_state[2]), energy, completion_time, current_state[4], current_state[5])
-        # next_state, terminal, _ = self.simulator.get_next_state(current_state, action, surplus, negative_surplus_count)
-
-            energies.append(total_energy)
-            times.append((completion_time * 1000))  # convert to ms
-
-            state = next_state
-            if terminal:
-                initial_bandwidth = next_state[0]
-                break
-
-        # record episode-level results
-        episode_energies.append(np.sum(energies))
-        episode_completion_times.append(np.sum(times))
-
-    # --- Plotting ---
-    # plt.figure(figsize=(6,4))
-    # plt.plot(np.arange(1, episodes+1, 1), episode_energies, marker='o')
-    # plt.xlabel("Episodes")
-    # plt.ylabel("Total Edge Energy (Joules)")
-    # plt.title(f"{'Random' if is_random else 'All Cloud' if is_all_cloud else 'All Edge'} Scheduler: Energy vs Episodes, {'average energy=' + str(np.mean(episode_energies)) if episodes > 0 else ''}")
-    # plt.grid(True)
-    # plt.show()
-
-    # plt.figure(figsize=(6,4))
-    # plt.plot(np.arange(1, episodes+1, 1), episode_completion_times, marker='s')
-    # plt.xlabel("Episodes")
-    # plt.ylabel("Avg Completion Time (ms)")
-    # plt.title(f"{'Random' if is_random else 'All Cloud' if is_all_cloud else 'All Edge'}: Completion Time vs Episodes, {'average time=' + str(np.mean(episode_completion_times)) if episodes > 0 else ''}")
-    # plt.grid(True)
-    # plt.show()
-
-    return np.mean(episode_energies), np.mean(episode_completion_times)
+    if is_random:
+        choose_action_ids = get_random_action_ids
+    elif is_all_cloud:
+        choose_action_ids = get_all_cloud_action_ids
+    else:
+        choose_action_ids = get_all_edge_action_ids
+
+    simulator = BatchCloudEdgeSimulator(profiling_data, rng=np.random.default_rng(seed))
+    if metrics is not None and metrics.deadline_ms is None:
+        metrics.deadline_ms = profiling_data.deadline
+
+    total_energy, total_time = 0.0, 0.0
+    for first in range(0, episodes, chunk_size):
+        episode_energies, episode_completion_times = _run_random_chunk(
+            simulator, profiling_data, choose_action_ids, min(chunk_size, episodes - first), max_steps, metrics, first
+        )
+        total_energy += np.sum(episode_energies)
+        total_time += np.sum(episode_completion_times)
+        if metrics is not None:
+            metrics.episodes_batch(episode_energies, episode_completion_times)
+
+    if metrics is not None:
+        metrics.close()
+    return total_energy / episodes, total_time / episodes
+
+
+def _run_random_chunk(simulator, profiling_data, choose_action_ids, episodes, max_steps, metrics, first_episode):
+    """Step a chunk of episodes together; returns their (energy, completion time ms) arrays."""
+    initial_bandwidth = 15.0
+    initial_cloud_time = 0.0
+    state = BatchState.initial(episodes, initial_bandwidth, initial_cloud_time)
+    no_surplus = np.zeros(episodes)
+
+    episode_energies = np.zeros(episodes)
+    episode_completion_times = np.zeros(episodes)
+    active = np.ones(episodes, dtype=bool)
+
+    for step in range(max_steps):
+        action_ids = choose_action_ids(profiling_data, state.layer, simulator.rng)
+        next_state, terminal, cloud_time = simulator.next_states(state, action_ids, no_surplus, state.negative_surplus_count)
+        total_energy, completion_time = simulator.energy_and_time(state, action_ids, cloud_time)
+        if metrics is not None and metrics.wants_steps:
+            metrics.step(first_episode + np.flatnonzero(active), step, state.layer[active], action_ids[active],
+                         total_energy[active], completion_time[active])
+
+        episode_energies += np.where(active, total_energy, 0.0)
+        episode_completion_times += np.where(active, completion_time * 1000, 0.0)  # convert to ms
+
+        state = next_state
+        active &= ~terminal
+        if not active.any():
+            break
+
+    return episode_energies, episode_completion_times
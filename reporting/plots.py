@@ -0,0 +1,72 @@
+"""
+Plots of sweep and episode results. Optional: matplotlib is only needed
+here, and nothing on the training or sweep path imports this module, so
+headless runs and sweep workers never load it.
+"""
+import numpy as np
+import matplotlib.pyplot as plt
+
+SCHEDULER_LABELS = {
+    "double_q": "Double Q",
+    "a2c": "A2C",
+    "random": "Random",
+    "all_edge": "All Edge",
+    "all_cloud": "All Cloud",
+    "oracle": "Oracle (DP)",
+}
+
+
+def _series(results, scheduler, metric):
+    # run_sweep returns results ordered by deadline within each scheduler
+    rows = [r for r in results if r["scheduler"] == scheduler]
+    return [r["deadline"] for r in rows], [r[metric] for r in rows]
+
+
+def plot_metric_vs_deadline(results, metric, ylabel, title, schedulers=tuple(SCHEDULER_LABELS)):
+    """One line per scheduler of a sweep result metric against the deadline."""
+    plt.figure(figsize=(8, 6))
+    for scheduler in schedulers:
+        deadlines, values = _series(results, scheduler, metric)
+        if deadlines:
+            plt.plot(deadlines, values, label=SCHEDULER_LABELS.get(scheduler, scheduler))
+    plt.xlabel("Deadline (ms)")
+    plt.ylabel(ylabel)
+    plt.title(title)
+    plt.legend()
+    plt.grid(True, linestyle="--", alpha=0.6)
+    plt.tight_layout()
+
+
+def plot_sweep(results, show=True):
+    """Energy and completion time against the deadline, as main.py has always shown them."""
+    plot_metric_vs_deadline(results, "energy", "Average Energy (Joules)", "Average Energy vs Deadline")
+    if show:
+        plt.show()
+    plot_metric_vs_deadline(results, "time", "Average Completion Time (ms)", "Average Completion Time vs Deadline")
+    if show:
+        plt.show()
+
+
+def plot_episodes(energies, completion_times, name, show=True):
+    """Per-episode energy and completion time of one scheduler run, e.g. read_columns of a metrics file."""
+    energies = np.asarray(energies)
+    completion_times = np.asarray(completion_times)
+    episodes = np.arange(1, len(energies) + 1)
+
+    plt.figure(figsize=(6, 4))
+    plt.plot(episodes, energies, marker='o')
+    plt.xlabel("Episodes")
+    plt.ylabel("Total Edge Energy (Joules)")
+    plt.title(f"{name} Scheduler: Energy vs Episodes, average energy={np.mean(energies)}")
+    plt.grid(True)
+    if show:
+        plt.show()
+
+    plt.figure(figsize=(6, 4))
+    plt.plot(episodes, completion_times, marker='s')
+    plt.xlabel("Episodes")
+    plt.ylabel("Avg Completion Time (ms)")
+    plt.title(f"{name}: Completion Time vs Episodes, average time={np.mean(completion_times)}")
+    plt.grid(True)
+    if show:
+        plt.show()
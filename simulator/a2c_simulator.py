@@ -1,25 +1,50 @@
 from a2c.actor_critic_agent import A2CAgent   # <-- your new A2C agent file
+from a2c.batch_a2c_agent import BatchA2CAgent
 from profiling.profile import ProfilingData
+from simulator.simulator import SimState
+from simulator.batch_simulator import BatchState
+from simulator.doubleQ_simulator import _sink
 import numpy as np
 
 
-def run__a2c_simulation(profiling_data: ProfilingData, episodes=10000, max_steps=20):
-    agent = A2CAgent(profiling_data)
-    edge_energy = []
-    completion_time = []
+def run__a2c_simulation(profiling_data: ProfilingData, episodes=10000, max_steps=20,
+                        table_file="a2c_tables.ckpt", legacy_files=("value_table.npy", "policy_table.npy"),
+                        checkpoint_every=None, seed=None, convergence=None, metrics=None):
+    """
+    Train the A2C agent and return (mean energy, mean completion time ms).
+    table_file: checkpoint loaded before and saved after the run, None = fresh in-memory tables.
+    legacy_files: pickled (value, policy) tables imported when table_file doesn't exist yet.
+    checkpoint_every: also append a delta checkpoint every K episodes.
+    seed: seed of the agent's random stream (exploration and transitions),
+    None = the global random state.
+    convergence: a ConvergenceMonitor; training stops as soon as it reports
+    convergence and the means cover the episodes actually run.
+    metrics: a MetricsSink receiving every episode (and step), see run_simulation.
+    """
+    agent = A2CAgent(profiling_data, seed=seed)
+    persist = table_file is not None
+    if persist:
+        agent.filename = table_file
+        agent.filename_value, agent.filename_policy = legacy_files if legacy_files is not None else (None, None)
+    sink = _sink(metrics, profiling_data)
     bandwidth = profiling_data.bandwidth
 
     # Try loading previous tables if available
-    agent.load_tables()
+    if persist:
+        agent.load_tables()
 
     for ep in range(episodes):
         total_edge_energy = 0.0
         total_completion_time = 0.0
-        current_state = (bandwidth, 0, 0, None, 0.0, 0)  # (bandwidth, cloud_time, layer, prev_action, surplus, negative_surplus_count)
+        current_state = SimState(bandwidth, 0, 0, -1, 0.0, 0)  # (bandwidth, cloud_time, layer, prev_mask, surplus, negative_surplus_count)
 
-        for _ in range(max_steps):
+        for step in range(max_steps):
             # A2C train returns: (action, reward, next_state, terminal, energy, completionTime)
-            _, reward, next_state, terminal, energy, completion_time_s = agent.train(current_state)
+            action, reward, next_state, terminal, energy, completion_time_s = agent.train(current_state)
+            if sink.wants_steps:
+                sink.step(ep, step, current_state[2], action, energy, completion_time_s, reward)
+            if convergence is not None:
+                convergence.record_step(agent.last_update, agent.last_value)
 
             total_edge_energy += energy
             total_completion_time += (completion_time_s * 1000)  # s → ms
@@ -29,10 +54,84 @@ def run__a2c_simulation(profiling_data: ProfilingData, episodes=10000, max_steps
                 bandwidth = next_state[0]
                 break
 
-        edge_energy.append(total_edge_energy)
-        completion_time.append(total_completion_time)
+        sink.episode(total_edge_energy, total_completion_time)
+
+        if persist and checkpoint_every and (ep + 1) % checkpoint_every == 0:
+            agent.save_tables(incremental=True, verbose=False)
+
+        if convergence is not None and convergence.end_episode(total_edge_energy, total_completion_time,
+                                                               agent.greedy_actions):
+            print(f"Converged after {ep + 1} episodes")
+            break
 
     # Save the learned tables
-    agent.save_tables()
+    if persist:
+        agent.save_tables(incremental=True)
+
+    sink.close()
+    return sink.energy.mean, sink.time.stats.mean
+
+
+def run_batch_a2c_simulation(profiling_data: ProfilingData, episodes=10000, max_steps=20, n_envs=64,
+                             table_file="a2c_batch_tables.ckpt", seed=None, convergence=None, metrics=None):
+    """
+    Train the array-backed BatchA2CAgent on n_envs environments stepped
+    together and return (mean energy, mean completion time ms) over the
+    first `episodes` finished episodes. An environment starts its next
+    episode from the bandwidth its last one ended with, as in run__a2c_simulation.
+    table_file: checkpoint loaded before and saved after the run, None = fresh in-memory tables.
+    seed: seed of the agent's numpy Generator, None = fresh entropy.
+    convergence: a ConvergenceMonitor fed every finished episode; training
+    stops as soon as it reports convergence.
+    metrics: a MetricsSink receiving every finished episode; step records
+    hold the arrays of all environments.
+    """
+    agent = BatchA2CAgent(profiling_data, n_envs=n_envs, seed=seed)
+    if table_file is not None:
+        agent.filename = table_file
+        agent.load_tables()
+
+    sink = _sink(metrics, profiling_data)
+    n_envs = min(n_envs, episodes)
+    state = BatchState.initial(n_envs, profiling_data.bandwidth)
+    total_edge_energy = np.zeros(n_envs)
+    total_completion_time = np.zeros(n_envs)
+    steps = np.zeros(n_envs, dtype=np.int64)
+    converged = False
+
+    while sink.episodes < episodes and not converged:
+        action_ids, reward, next_state, terminal, energy, completion_time_s = agent.train(state)
+        if sink.wants_steps:
+            sink.step(sink.episodes, steps, state.layer, action_ids, energy, completion_time_s, reward)
+        if convergence is not None:
+            convergence.record_step(agent.last_update, agent.last_value)
+        total_edge_energy += energy
+        total_completion_time += completion_time_s * 1000  # s → ms
+        steps += 1
+
+        done = terminal | (steps >= max_steps)
+        for i in np.flatnonzero(done).tolist():
+            if sink.episodes == episodes:
+                break
+            sink.episode(float(total_edge_energy[i]), float(total_completion_time[i]))
+            if convergence is not None and convergence.end_episode(total_edge_energy[i], total_completion_time[i],
+                                                                   agent.greedy_actions):
+                print(f"Converged after {sink.episodes} episodes")
+                converged = True
+                break
+
+        # finished environments restart at the first layer, keeping their bandwidth
+        restart = BatchState.initial(n_envs, 0.0)
+        restart.bandwidth = next_state.bandwidth
+        state = next_state if not done.any() else BatchState(*(
+            np.where(done, getattr(restart, f), getattr(next_state, f)) for f in SimState.__slots__
+        ))
+        total_edge_energy[done] = 0.0
+        total_completion_time[done] = 0.0
+        steps[done] = 0
+
+    if table_file is not None:
+        agent.save_tables()
 
-    return np.mean(edge_energy), np.mean(completion_time)
+    sink.close()
+    return sink.energy.mean, sink.time.stats.mean
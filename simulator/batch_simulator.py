@@ -0,0 +1,172 @@
+import numpy as np
+from profiling.profile import ProfilingData, CompiledProfilingData
+from profiling.action_catalog import get_action_catalog
+from simulator.cost_tables import get_cost_tables
+from simulator.transfer import get_transfer_model
+from simulator.simulator import SimState
+
+
+class BatchState:
+    """
+    Structure-of-arrays state of N independent environments.
+    prev_mask holds the previous layer's action id (see ActionCatalog), -1 = no previous action.
+    """
+
+    def __init__(self, bandwidth, cloud_time, layer, prev_mask, surplus, negative_surplus_count):
+        self.bandwidth = np.asarray(bandwidth, dtype=float)
+        self.cloud_time = np.asarray(cloud_time, dtype=float)
+        self.layer = np.asarray(layer, dtype=np.int64)
+        self.prev_mask = np.asarray(prev_mask, dtype=np.int64)
+        self.surplus = np.asarray(surplus, dtype=float)
+        self.negative_surplus_count = np.asarray(negative_surplus_count, dtype=np.int64)
+
+    @classmethod
+    def initial(cls, n, bandwidth, cloud_time=0.0):
+        """N environments at the first layer with no previous action."""
+        return cls(
+            np.full(n, bandwidth, dtype=float),
+            np.full(n, cloud_time, dtype=float),
+            np.zeros(n, dtype=np.int64),
+            np.full(n, -1, dtype=np.int64),
+            np.zeros(n),
+            np.zeros(n, dtype=np.int64),
+        )
+
+    @classmethod
+    def from_states(cls, states, actions=None):
+        """Batch of SimState objects (legacy tuples are converted with the ActionCatalog actions)."""
+        states = [s if isinstance(s, SimState) else SimState.from_tuple(s, actions) for s in states]
+        return cls(*([getattr(s, f) for s in states] for f in SimState.__slots__))
+
+    def state(self, i):
+        """SimState of environment i."""
+        return SimState(*(getattr(self, f)[i].item() for f in SimState.__slots__))
+
+    def __len__(self):
+        return len(self.layer)
+
+    def copy(self):
+        return BatchState(
+            self.bandwidth.copy(), self.cloud_time.copy(), self.layer.copy(),
+            self.prev_mask.copy(), self.surplus.copy(), self.negative_surplus_count.copy(),
+        )
+
+
+class BatchCloudEdgeSimulator:
+    def __init__(self, profiling_data: ProfilingData, rng=None):
+        """
+        Vectorized counterpart of CloudEdgeSimulator stepping N environments at once.
+        Per-action costs are read from the (layer, action id) cost tables,
+        which are shared by every deadline of the same profile.
+        Args:
+            profiling_data: ProfilingData object
+            rng: numpy Generator used for the stochastic transitions
+        """
+        self.profiling = CompiledProfilingData.from_profiling(profiling_data)
+        self.actions = get_action_catalog(self.profiling)
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.num_layers = self.actions.num_layers
+        self._bind_tables()
+
+    def _bind_tables(self):
+        self.tables = get_cost_tables(self.profiling)
+        self.transfer = get_transfer_model(self.profiling)
+        self.full_mask = self.tables.full_mask
+
+    def batch_state(self, states):
+        """BatchState of SimStates or legacy tuples, whose action arrays are read with this profile's catalog."""
+        return BatchState.from_states(states, self.actions)
+
+    def _transmission(self, state, action_ids):
+        """Transmission time (s) of the largest output crossing the edge/cloud link, see TransferModel."""
+        crossing_kb = self.transfer.crossing_kb_batch(state.layer, state.prev_mask, action_ids)
+        return self.transfer.transfer_time_s(crossing_kb, state.bandwidth)
+
+    def energy_and_time(self, state: BatchState, action_ids, cloud_pending_ms=None):
+        """
+        Energy (J) and completion time (s) of every environment.
+        cloud_pending_ms defaults to the cloud time carried in the state.
+        """
+        action_ids = np.asarray(action_ids, dtype=np.int64)
+        if cloud_pending_ms is None:
+            cloud_pending_ms = state.cloud_time
+        layer = state.layer
+
+        transmission_time_s = self._transmission(state, action_ids)
+        edge_total_time_s, edge_energy, _, has_cloud = self.tables.lookup(layer, action_ids)
+        idle_time_s = np.where(
+            has_cloud,
+            np.maximum(0.0, cloud_pending_ms / 1000.0 - edge_total_time_s),
+            0.0,
+        )
+
+        # every edge device idles while waiting for the cloud, and the less loaded ones while the busiest computes
+        idle_device_s = idle_time_s * self.tables.num_devices + self.tables.slack(layer, action_ids)
+        total_energy = (
+            self.profiling.edge_communication_power * transmission_time_s
+            + edge_energy
+            + self.profiling.edge_idle_power * idle_device_s
+        )
+        completion_time_s = idle_time_s + edge_total_time_s + transmission_time_s
+        return total_energy, completion_time_s
+
+    def rewards(self, layer, total_energy, completion_time_s, previous_surplus, negative_surplus_count):
+        """Vectorized calculate_reward, returns (reward, surplus, negative_surplus_count)."""
+        fractional_deadline_s = self.profiling.fractional_deadlines[layer]
+        constrained_completion_time_s = completion_time_s + previous_surplus
+        surplus = constrained_completion_time_s - fractional_deadline_s
+        negative_surplus_count = negative_surplus_count + (surplus < 0)
+
+        delay = constrained_completion_time_s - fractional_deadline_s
+        reward = np.where(
+            constrained_completion_time_s > fractional_deadline_s,
+            -(total_energy + (delay * 100)) * 1000000,
+            np.where(
+                layer == self.num_layers - 1,
+                total_energy * 1000000 * negative_surplus_count,
+                -total_energy,
+            ),
+        )
+        return reward, surplus, negative_surplus_count
+
+    def next_states(self, state: BatchState, action_ids, surplus, negative_surplus_count):
+        """Vectorized get_next_state, returns (next_state, terminal, cloud_time)."""
+        action_ids = np.asarray(action_ids, dtype=np.int64)
+        n = len(state)
+        layer = state.layer
+
+        # --- Cloud processing update ---
+        _, _, cloud_proc_ms, has_cloud = self.tables.lookup(layer, action_ids)
+        u = self.rng.random(n)
+        cloud_time = np.where(
+            has_cloud,
+            cloud_proc_ms + 100.0 * u,                             # congestion U(0, 100)
+            np.where(
+                self.tables.prev_has_cloud(layer, state.prev_mask),
+                state.cloud_time - (10.0 + 10.0 * u),              # previous cloud work drains U(10, 20)
+                np.maximum(0.0, state.cloud_time - 10.0 * u),      # idle decay U(0, 10)
+            ),
+        )
+
+        # --- Bandwidth update (stochastic change) ---
+        bw_change = self.rng.uniform(-5, 5, n)
+        new_bandwidth = np.minimum(np.maximum(1.0, state.bandwidth + bw_change), 30.0)
+
+        # --- Advance to next layer ---
+        terminal = layer + 1 >= self.num_layers
+        next_layer = np.where(terminal, layer, layer + 1)
+
+        next_state = BatchState(new_bandwidth, cloud_time, next_layer, action_ids, surplus, negative_surplus_count)
+        return next_state, terminal, cloud_time
+
+    def step(self, state: BatchState, action_ids):
+        """
+        One environment step in the agents' order: cost, reward, then transition.
+        Returns (energy, completion_time_s, reward, next_state, terminal).
+        """
+        energy, completion_time_s = self.energy_and_time(state, action_ids)
+        reward, surplus, negative_surplus_count = self.rewards(
+            state.layer, energy, completion_time_s, state.surplus, state.negative_surplus_count
+        )
+        next_state, terminal, _ = self.next_states(state, action_ids, surplus, negative_surplus_count)
+        return energy, completion_time_s, reward, next_state, terminal
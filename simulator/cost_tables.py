@@ -0,0 +1,132 @@
+import numpy as np
+from profiling.profile import ProfilingData, CompiledProfilingData
+from profiling.action_catalog import get_action_catalog
+
+
+class CostTables:
+    """
+    Deadline-independent per-action costs, indexed by (layer, action id).
+    Only the reward thresholds (fractional deadlines) depend on the deadline,
+    so one set of tables serves a whole deadline sweep.
+
+    Nodes on the same edge device run one after the other, the edge devices
+    run in parallel: a layer's edge time is its busiest device's, and the
+    other devices idle for the difference (the slack, in device-seconds).
+    With one edge device the slack is zero.
+
+    When some layer is too wide to enumerate, no tables are built and the
+    lookups sum the per-node costs from the placement digits instead, in O(nodes).
+    """
+
+    def __init__(self, profiling_data: ProfilingData):
+        p = CompiledProfilingData.from_profiling(profiling_data)
+        actions = get_action_catalog(p)
+        self.actions = actions
+        self.num_devices = actions.num_devices
+        self.full_mask = np.array([actions.full_id(l) for l in range(actions.num_layers)], dtype=np.int64)  # all nodes on cloud
+        self.full_mask.flags.writeable = False
+
+        # Per-node costs for the digit path, zero padded to max_nodes
+        self._node_mask = p.node_mask
+        self._edge_time_s = p.edge_times / 1000.0
+        self._edge_energy = p.edge_powers * self._edge_time_s
+        self._cloud_time_ms = p.cloud_times
+
+        self.edge_time_s = None      # edge compute time of the busiest edge device
+        self.edge_energy = None      # sum of edge compute energy of the edge nodes
+        self.edge_slack_s = None     # idle device-seconds of the other devices meanwhile
+        self.device_busy_s = None    # (layers, actions, devices) edge compute time per device
+        self.cloud_proc_ms = None    # slowest cloud node
+        self.has_cloud = None
+        if actions.all_enumerated:
+            self._build(p, actions)
+
+    def _build(self, p, actions):
+        shape = (actions.num_layers, actions.max_actions)
+        self.edge_time_s = np.zeros(shape)
+        self.edge_energy = np.zeros(shape)
+        self.edge_slack_s = np.zeros(shape)
+        self.device_busy_s = np.zeros(shape + (self.num_devices,))
+        self.cloud_proc_ms = np.zeros(shape)
+        self.has_cloud = np.zeros(shape, dtype=bool)
+
+        for layer_idx in range(actions.num_layers):
+            nodes = actions.num_nodes[layer_idx]
+            n_actions = actions.num_actions(layer_idx, edge_only_ends=False)
+            digits = actions.digits[layer_idx]
+            cloud = actions.cloud[layer_idx]
+            edge = ~cloud
+            edge_t = p.edge_times[layer_idx, :nodes] / 1000.0
+            edge_p = p.edge_powers[layer_idx, :nodes]
+            cloud_t = p.cloud_times[layer_idx, :nodes]
+
+            busy = np.stack([(digits == k) @ edge_t for k in range(self.num_devices)], axis=1)
+            span = busy.max(axis=1)
+            self.device_busy_s[layer_idx, :n_actions] = busy
+            self.edge_time_s[layer_idx, :n_actions] = span
+            self.edge_slack_s[layer_idx, :n_actions] = (span[:, None] - busy).sum(axis=1)
+            self.edge_energy[layer_idx, :n_actions] = edge @ (edge_p * edge_t)
+            self.cloud_proc_ms[layer_idx, :n_actions] = np.where(cloud, cloud_t, -np.inf).max(axis=1).clip(min=0.0)
+            self.has_cloud[layer_idx, :n_actions] = cloud.any(axis=1)
+
+        for arr in (self.edge_time_s, self.edge_energy, self.edge_slack_s, self.device_busy_s, self.cloud_proc_ms,
+                    self.has_cloud):
+            arr.flags.writeable = False
+
+    def _digits(self, layer, action_ids):
+        """(placement digits, node mask) of every (layer, action id) pair, for the digit path."""
+        return self.actions.digits_of(action_ids), self._node_mask[layer]
+
+    def _busy(self, layer, action_ids):
+        digits, node_mask = self._digits(layer, action_ids)
+        edge_t = self._edge_time_s[layer]
+        return np.stack([np.where((digits == k) & node_mask, edge_t, 0.0).sum(axis=1)
+                         for k in range(self.num_devices)], axis=1)
+
+    def lookup(self, layer, action_ids):
+        """(edge_time_s, edge_energy, cloud_proc_ms, has_cloud) of every (layer, action id) pair."""
+        if self.edge_time_s is not None:
+            return (
+                self.edge_time_s[layer, action_ids],
+                self.edge_energy[layer, action_ids],
+                self.cloud_proc_ms[layer, action_ids],
+                self.has_cloud[layer, action_ids],
+            )
+        digits, node_mask = self._digits(layer, action_ids)
+        cloud = (digits == self.num_devices) & node_mask
+        edge = ~cloud & node_mask
+        return (
+            self._busy(layer, action_ids).max(axis=1),
+            (edge * self._edge_energy[layer]).sum(axis=1),
+            np.where(cloud, self._cloud_time_ms[layer], 0.0).max(axis=1),
+            cloud.any(axis=1),
+        )
+
+    def slack(self, layer, action_ids):
+        """Idle device-seconds of the edge devices while the busiest one computes."""
+        if self.edge_slack_s is not None:
+            return self.edge_slack_s[layer, action_ids]
+        busy = self._busy(layer, action_ids)
+        return (busy.max(axis=1)[:, None] - busy).sum(axis=1)
+
+    def device_busy(self, layer, action_ids):
+        """(N, devices) edge compute time (s) queued on every edge device."""
+        if self.device_busy_s is not None:
+            return self.device_busy_s[layer, action_ids]
+        return self._busy(layer, action_ids)
+
+    def prev_has_cloud(self, layer, prev_ids):
+        """Whether the previous layer's placement (-1 = none) put some node on the cloud."""
+        prev_layer = np.maximum(layer - 1, 0)
+        ids = np.maximum(prev_ids, 0)
+        if self.has_cloud is not None:
+            has_cloud = self.has_cloud[prev_layer, ids]
+        else:
+            digits, node_mask = self._digits(prev_layer, ids)
+            has_cloud = ((digits == self.num_devices) & node_mask).any(axis=1)
+        return has_cloud & (prev_ids >= 0)
+
+
+def get_cost_tables(profiling_data: ProfilingData) -> CostTables:
+    """Return the cost tables of a profile, shared by all its with_deadline copies."""
+    return CompiledProfilingData.from_profiling(profiling_data).derived("cost_tables", CostTables)
@@ -1,20 +1,61 @@
 from model.doubleQ import DoubleQLearningAgent
+from model.instrumentation import TrainingStats
 from profiling.profile import ProfilingData
-import numpy as np
+from simulator.simulator import SimState
+from simulator.metrics import MetricsSink
+import os
 
-def run_simulation(profiling_data: ProfilingData, episodes=10000, max_steps=20):
-    agent = DoubleQLearningAgent(profiling_data)
-    edge_energy = []
-    completion_time = []
+def run_simulation(profiling_data: ProfilingData, episodes=10000, max_steps=20, qtable_file="q_tables.ckpt",
+                   checkpoint_every=None, evaluate=False, seed=None, stats_file=None, warm_start_file=None,
+                   convergence=None, replay_capacity=0, replay_batch=32, replay_ratio=1.0, metrics=None,
+                   max_table_mb=None, eviction="lfu", prune_min_visits=0):
+    """
+    Train the Double Q agent and return (mean energy, mean completion time ms).
+    qtable_file: tables loaded before and saved after the run, None = fresh in-memory tables.
+    checkpoint_every: also append a delta checkpoint every K episodes, so a crash
+    loses at most K episodes of learning.
+    evaluate: run the frozen greedy policy of the loaded tables instead of
+    training; the tables are neither updated nor saved.
+    seed: seed of the agent's random stream (exploration and transitions),
+    None = the global random state.
+    stats_file: record per-phase timings, state hit rates and table growth of
+    the training loop and write them there (.json, else CSV); None = no instrumentation.
+    warm_start_file: checkpoint loaded instead when qtable_file doesn't exist
+    yet, e.g. the tables of a neighbouring deadline; it is never written.
+    convergence: a ConvergenceMonitor; training stops as soon as it reports
+    convergence (episodes is then an upper bound) and the means cover the
+    episodes actually run. None = always run every episode.
+    replay_capacity, replay_batch, replay_ratio: experience replay of the
+    agent (see DoubleQLearningAgent), replay_capacity=0 = online updates only.
+    metrics: a MetricsSink receiving every episode (and step, if it asks for
+    them); its deadline defaults to the profile's. The sink is closed at the end.
+    max_table_mb, eviction, prune_min_visits: memory cap, eviction policy and
+    checkpoint-time pruning of the Q-tables (see DoubleQLearningAgent),
+    max_table_mb=None = unbounded.
+    """
+    agent = DoubleQLearningAgent(profiling_data, seed=seed, replay_capacity=replay_capacity,
+                                 replay_batch=replay_batch, replay_ratio=replay_ratio, max_table_mb=max_table_mb,
+                                 eviction=eviction, prune_min_visits=prune_min_visits)
+    sink = _sink(metrics, profiling_data)
     bandwidth = profiling_data.bandwidth
-    agent.load_qtables()
+    if warm_start_file is not None and (qtable_file is None or not os.path.exists(qtable_file)):
+        agent.load_qtables(warm_start_file)
+    elif qtable_file is not None:
+        agent.load_qtables(qtable_file)
+    if evaluate:
+        return _run_greedy(agent, agent.greedy_policy(), episodes, max_steps, bandwidth, sink)
+    stats = TrainingStats().attach(agent) if stats_file is not None else None
     for ep in range(episodes):
         total_edge_energy = 0.0
         total_completion_time = 0.0
-        current_state = (bandwidth, 0, 0, None, 0, 0) # (bandwidth, cloud_time, layer, prev_action, surplus, negativesurpluscount)
+        current_state = SimState.initial(bandwidth) # (bandwidth, cloud_time, layer, prev_mask, surplus, negativesurpluscount)
 
-        for __ in range(max_steps):
-            _, ___, next_state, terminal, energy, completionTime, new_bandwidth = agent.train(current_state)
+        for step in range(max_steps):
+            action, reward, next_state, terminal, energy, completionTime, new_bandwidth = agent.train(current_state)
+            if sink.wants_steps:
+                sink.step(ep, step, current_state[2], action, energy, completionTime, reward)
+            if convergence is not None:
+                convergence.record_step(agent.last_update, agent.last_value)
             total_edge_energy += energy
             total_completion_time += (completionTime * 1000)  # ms
             current_state = next_state
@@ -22,9 +63,60 @@ def run_simulation(profiling_data: ProfilingData, episodes=10000, max_steps=20):
                 bandwidth = new_bandwidth
                 break
 
-        edge_energy.append(total_edge_energy)
-        completion_time.append(total_completion_time)
+        sink.episode(total_edge_energy, total_completion_time)
+        if stats is not None:
+            stats.sample_tables(ep)
 
-    agent.save_qtables()
-    return np.mean(edge_energy), np.mean(completion_time)
+        if qtable_file is not None and checkpoint_every and (ep + 1) % checkpoint_every == 0:
+            agent.save_qtables(qtable_file, incremental=True, verbose=False)
 
+        if convergence is not None and convergence.end_episode(total_edge_energy, total_completion_time,
+                                                               agent.greedy_actions):
+            print(f"Converged after {ep + 1} episodes")
+            break
+
+    if qtable_file is not None:
+        agent.save_qtables(qtable_file, incremental=True)
+    if stats is not None:
+        stats.detach()
+        stats.save(stats_file)
+    sink.close()
+    return sink.energy.mean, sink.time.stats.mean
+
+
+def _sink(metrics, profiling_data):
+    """The caller's MetricsSink (deadline defaulting to the profile's) or a plain one for the means."""
+    if metrics is None:
+        return MetricsSink(percentiles=())
+    if metrics.deadline_ms is None:
+        metrics.deadline_ms = profiling_data.deadline
+    return metrics
+
+
+
+def _run_greedy(agent, policy, episodes, max_steps, bandwidth, sink):
+    """Roll out a frozen GreedyPolicy; returns (mean energy, mean completion time ms)."""
+    simulator = agent.simulator
+    for ep in range(episodes):
+        total_edge_energy = 0.0
+        total_completion_time = 0.0
+        current_state = SimState.initial(bandwidth)
+
+        for step in range(max_steps):
+            layer = int(current_state[2])
+            action = policy.decide(current_state)
+            energy, completionTime = simulator.compute_energy_and_time(current_state, action, current_state[1])
+            reward, surplus, negative_surplus_count = simulator.calculate_reward(layer, energy, completionTime, current_state[4], current_state[5])
+            if sink.wants_steps:
+                sink.step(ep, step, layer, action, energy, completionTime, reward)
+            next_state, terminal, _ = simulator.get_next_state(current_state, action, surplus, negative_surplus_count)
+            total_edge_energy += energy
+            total_completion_time += (completionTime * 1000)  # ms
+            current_state = next_state
+            if terminal:
+                bandwidth = next_state[0]
+                break
+
+        sink.episode(total_edge_energy, total_completion_time)
+    sink.close()
+    return sink.energy.mean, sink.time.stats.mean
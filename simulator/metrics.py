@@ -0,0 +1,209 @@
+import math
+
+import numpy as np
+from model.checkpoint import write_checkpoint, append_segment, read_segments, is_checkpoint
+
+METRIC_COLUMNS = ("episode", "energy", "time_ms", "missed")
+
+
+class RunningStats:
+    """Online count, mean, variance, min and max (Welford; batches are merged with Chan's formula)."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def add_batch(self, values):
+        values = np.asarray(values, dtype=float)
+        n = len(values)
+        if n == 0:
+            return
+        mean = float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self._m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    @property
+    def var(self):
+        return self._m2 / self.count if self.count else math.nan
+
+
+class LogHistogram:
+    """
+    Constant-memory quantile estimates over a stream of positive values.
+    Bins grow geometrically by (1 + 2 * rel_error) from min_value to
+    max_value, so a quantile is off by at most rel_error (values outside the
+    range are clamped into the first/last bin, and answers into [min, max]).
+    """
+
+    def __init__(self, min_value=1e-3, max_value=1e7, rel_error=0.005):
+        self.min_value = min_value
+        self._log_base = math.log1p(2 * rel_error)
+        self.bins = int(math.ceil(math.log(max_value / min_value) / self._log_base)) + 1
+        self.counts = np.zeros(self.bins, dtype=np.int64)
+        self.stats = RunningStats()
+
+    def _index(self, values):
+        values = np.maximum(np.asarray(values, dtype=float), self.min_value)
+        return np.minimum((np.log(values / self.min_value) / self._log_base).astype(np.int64), self.bins - 1)
+
+    def add(self, value):
+        self.counts[int(self._index(value))] += 1
+        self.stats.add(value)
+
+    def add_batch(self, values):
+        values = np.asarray(values, dtype=float)
+        self.counts += np.bincount(self._index(values), minlength=self.bins)
+        self.stats.add_batch(values)
+
+    def quantile(self, q):
+        """Value below which a fraction q of the stream falls (NaN if empty)."""
+        total = self.stats.count
+        if total == 0:
+            return math.nan
+        i = int(np.searchsorted(np.cumsum(self.counts), q * total))
+        i = min(i, self.bins - 1)
+        value = self.min_value * math.exp((i + 0.5) * self._log_base)  # geometric bin center
+        return min(max(value, self.stats.min), self.stats.max)
+
+
+class MetricsSink:
+    """
+    Streaming per-episode (and optionally per-step) metrics of a scheduler run.
+
+    Keeps running mean/variance of episode energy and completion time,
+    completion-time percentiles from a LogHistogram and the deadline-miss
+    rate, all in constant memory. Records are passed to the on_episode /
+    on_step callbacks as they come in (per-step records are only built when
+    on_step is set) and, with columnar_file, appended to an append-only
+    column file every flush_every episodes; see read_columns / iter_records.
+    """
+
+    def __init__(self, deadline_ms=None, percentiles=(50, 95, 99), columnar_file=None, on_episode=None, on_step=None,
+                 flush_every=4096):
+        self.deadline_ms = deadline_ms
+        self.percentiles = percentiles
+        self.columnar_file = columnar_file
+        self.on_episode = on_episode
+        self.on_step = on_step
+        self.flush_every = flush_every
+
+        self.episodes = 0
+        self.misses = 0
+        self.energy = RunningStats()
+        self.time = LogHistogram()
+        self._buffer = {name: [] for name in METRIC_COLUMNS}
+
+    @property
+    def wants_steps(self):
+        return self.on_step is not None
+
+    def step(self, episode, step, layer, action, energy, completion_time_s, reward=None):
+        """Per-step record (arrays for batched runners), passed to on_step."""
+        if self.on_step is not None:
+            self.on_step({"episode": episode, "step": step, "layer": layer, "action": action,
+                          "energy": energy, "time_ms": completion_time_s * 1000, "reward": reward})
+
+    def episode(self, energy, completion_time_ms):
+        """Close one episode of a scheduler run."""
+        missed = self.deadline_ms is not None and completion_time_ms > self.deadline_ms
+        self.energy.add(energy)
+        self.time.add(completion_time_ms)
+        self.misses += missed
+        record = {"episode": self.episodes, "energy": energy, "time_ms": completion_time_ms, "missed": missed}
+        self.episodes += 1
+        if self.on_episode is not None:
+            self.on_episode(record)
+        if self.columnar_file is not None:
+            for name in METRIC_COLUMNS:
+                self._buffer[name].append(record[name])
+            if len(self._buffer["episode"]) >= self.flush_every:
+                self.flush()
+
+    def episodes_batch(self, energy, completion_time_ms):
+        """Close a batch of episodes at once (arrays), e.g. from the batch simulator."""
+        energy = np.asarray(energy, dtype=float)
+        completion_time_ms = np.asarray(completion_time_ms, dtype=float)
+        n = len(energy)
+        missed = (completion_time_ms > self.deadline_ms if self.deadline_ms is not None
+                  else np.zeros(n, dtype=bool))
+        self.energy.add_batch(energy)
+        self.time.add_batch(completion_time_ms)
+        self.misses += int(missed.sum())
+        episode = np.arange(self.episodes, self.episodes + n)
+        self.episodes += n
+        if self.on_episode is not None:
+            for i in range(n):
+                self.on_episode({"episode": int(episode[i]), "energy": float(energy[i]),
+                                 "time_ms": float(completion_time_ms[i]), "missed": bool(missed[i])})
+        if self.columnar_file is not None:
+            self.flush()
+            self._append({"episode": episode, "energy": energy, "time_ms": completion_time_ms, "missed": missed})
+
+    def flush(self):
+        """Append the buffered episodes to the columnar file."""
+        if self.columnar_file is None or not self._buffer["episode"]:
+            return
+        columns = {
+            "episode": np.array(self._buffer["episode"], dtype=np.int64),
+            "energy": np.array(self._buffer["energy"], dtype=float),
+            "time_ms": np.array(self._buffer["time_ms"], dtype=float),
+            "missed": np.array(self._buffer["missed"], dtype=bool),
+        }
+        self._buffer = {name: [] for name in METRIC_COLUMNS}
+        self._append(columns)
+
+    def _append(self, columns):
+        meta = {"table": "episode_metrics", "rows": len(columns["episode"])}
+        if is_checkpoint(self.columnar_file):
+            append_segment(self.columnar_file, columns, meta)
+        else:
+            write_checkpoint(self.columnar_file, columns, meta)
+
+    def close(self):
+        self.flush()
+
+    def summary(self):
+        time = self.time.stats
+        summary = {
+            "episodes": self.episodes,
+            "energy": {"mean": self.energy.mean if self.episodes else math.nan, "var": self.energy.var,
+                       "min": self.energy.min, "max": self.energy.max},
+            "time_ms": {"mean": time.mean if self.episodes else math.nan, "var": time.var,
+                        "min": time.min, "max": time.max},
+            "deadline_ms": self.deadline_ms,
+            "deadline_miss_rate": self.misses / self.episodes if self.episodes and self.deadline_ms is not None
+            else math.nan,
+        }
+        for p in self.percentiles:
+            summary["time_ms"][f"p{p}"] = self.time.quantile(p / 100)
+        return summary
+
+
+def iter_records(path):
+    """Yield the per-episode records of a columnar metrics file, one segment in memory at a time."""
+    for _, columns in read_segments(path):
+        for row in zip(*(columns[name].tolist() for name in METRIC_COLUMNS)):
+            yield dict(zip(METRIC_COLUMNS, row))
+
+
+def read_columns(path):
+    """All columns of a columnar metrics file, concatenated."""
+    segments = [columns for _, columns in read_segments(path)]
+    return {name: np.concatenate([columns[name] for columns in segments]) for name in METRIC_COLUMNS}
@@ -0,0 +1,78 @@
+import random
+import numpy as np
+
+# Uniforms pre-drawn per refill of a NoiseStream
+NOISE_BLOCK_SIZE = 4096
+
+
+class GlobalNoise:
+    """Draws from the global random / np.random state, the behaviour of unseeded runs."""
+
+    def random(self):
+        return random.random()
+
+    def uniform(self, low, high):
+        return random.uniform(low, high)
+
+    def randrange(self, n):
+        return random.randrange(n)
+
+    def choice(self, n, p):
+        return int(np.random.choice(n, p=p))
+
+    def random_array(self, n):
+        return np.random.random(n)
+
+
+class NoiseStream:
+    """
+    Random draws from a private numpy Generator.
+
+    Uniforms are drawn in blocks of block_size and handed out one by one as
+    Python floats, so a scalar draw is a list lookup. The same seed always
+    gives the same sequence, independent of any other stream or the global state.
+    """
+
+    def __init__(self, rng, block_size=NOISE_BLOCK_SIZE):
+        self.rng = rng
+        self.block_size = block_size
+        self._buffer = []
+        self._pos = 0
+
+    def _refill(self):
+        self._buffer = self.rng.random(self.block_size).tolist()
+        self._pos = 0
+
+    def random(self):
+        """Uniform float in [0, 1)."""
+        if self._pos == len(self._buffer):
+            self._refill()
+        u = self._buffer[self._pos]
+        self._pos += 1
+        return u
+
+    def uniform(self, low, high):
+        return low + (high - low) * self.random()
+
+    def randrange(self, n):
+        return min(int(self.random() * n), n - 1)
+
+    def choice(self, n, p):
+        """Index drawn with probabilities p (by inverse CDF)."""
+        cdf = np.cumsum(p)
+        return min(int(np.searchsorted(cdf, self.random() * cdf[-1], side="right")), n - 1)
+
+    def random_array(self, n):
+        """n uniforms in [0, 1) as an array, drawn straight from the generator."""
+        return self.rng.random(n)
+
+
+def make_noise(seed=None, block_size=NOISE_BLOCK_SIZE):
+    """
+    GlobalNoise when seed is None, else a NoiseStream over default_rng(seed);
+    seed may be an int, a SeedSequence or a Generator.
+    """
+    if seed is None:
+        return GlobalNoise()
+    rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+    return NoiseStream(rng, block_size)
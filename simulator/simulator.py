@@ -1,45 +1,128 @@
 import numpy as np
-import random
 from profiling.profile import ProfilingData
+from profiling.action_catalog import ActionCatalog, get_action_catalog
+from simulator.transfer import get_transfer_model
+from simulator.noise import make_noise
+
+
+class SimState:
+    """
+    State of one environment, with the previous placement stored as its action id
+    (-1 = no previous action, as in BatchState) instead of an action array.
+    Positional access follows the legacy tuple
+    (bandwidth, cloud_time, layer, prev_action, surplus, negative_surplus_count),
+    with the action id at index 3.
+    """
+    __slots__ = ("bandwidth", "cloud_time", "layer", "prev_mask", "surplus", "negative_surplus_count")
+
+    def __init__(self, bandwidth, cloud_time, layer, prev_mask, surplus, negative_surplus_count):
+        self.bandwidth = bandwidth
+        self.cloud_time = cloud_time
+        self.layer = layer
+        self.prev_mask = prev_mask
+        self.surplus = surplus
+        self.negative_surplus_count = negative_surplus_count
+
+    @classmethod
+    def initial(cls, bandwidth, cloud_time=0):
+        """First layer, no previous action."""
+        return cls(bandwidth, cloud_time, 0, -1, 0, 0)
+
+    def __getitem__(self, i):
+        return getattr(self, self.__slots__[i])
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __repr__(self):
+        return "SimState(" + ", ".join(f"{f}={getattr(self, f)!r}" for f in self.__slots__) + ")"
+
+    # ----- Legacy tuple adapter -----
+    @classmethod
+    def from_tuple(cls, state, actions: ActionCatalog = None):
+        """SimState of a legacy tuple; actions encodes the previous action array, None = single edge device."""
+        bw, ctime, layer, prev_action, surplus, negative_surplus_count = state
+        if prev_action is None:
+            prev_mask = -1
+        else:
+            prev_mask = ActionCatalog.mask_of(prev_action) if actions is None else actions.id_of(prev_action)
+        return cls(bw, ctime, int(layer), prev_mask, surplus, negative_surplus_count)
+
+    def to_tuple(self, actions: ActionCatalog):
+        """Legacy tuple; the previous action array is rebuilt for layer - 1."""
+        prev_action = None if self.prev_mask < 0 else actions.get(max(self.layer - 1, 0), self.prev_mask)
+        return (self.bandwidth, self.cloud_time, self.layer, prev_action, self.surplus, self.negative_surplus_count)
+
 
 class CloudEdgeSimulator:
-    def __init__(self, profiling_data: ProfilingData):
+    def __init__(self, profiling_data: ProfilingData, noise=None):
         """
         Simulator for predicting next state given current state and action.
+        States are SimState objects or legacy tuples carrying the previous action
+        array; the next state has the same type as the current one. Actions are
+        action arrays or action ids (see ActionCatalog). Nodes on the same edge
+        device run one after the other, the edge devices run in parallel.
         Args:
             profiling_data: ProfilingData object
+            noise: NoiseStream (see simulator.noise) the transitions draw from,
+                None = the global random state
         """
         self.profiling = profiling_data
+        self.noise = noise if noise is not None else make_noise()
+        self.actions = get_action_catalog(profiling_data)
+        self.transfer = get_transfer_model(profiling_data)
+
+    def _action_mask(self, action):
+        if isinstance(action, (int, np.integer)):
+            return int(action)
+        return self.actions.id_of(action)
 
     def get_next_state(self, current_state, action, surplus, negative_surplus_count):
         """
         Compute next state given current state and action.
         State = (bandwidth [Mbps], cloud_time [ms], layer, prev_action_array)
         """
-        bandwidth, cloud_time, layer, previous_action, _, negative_surplus_count = current_state
-        layer = int(layer)
+        if not isinstance(current_state, SimState):
+            # Legacy tuple: the next state carries the current action array as prev_action
+            next_state, terminal, cloud_time = self.get_next_state(
+                SimState.from_tuple(current_state, self.actions), action, surplus, negative_surplus_count
+            )
+            if isinstance(action, (int, np.integer)):
+                prev_action = self.actions.get(int(current_state[2]), int(action))
+            else:
+                # Catalog actions are shared read-only arrays, only caller-owned arrays need a copy
+                prev_action = action.copy() if action.flags.writeable else action
+            return (next_state.bandwidth, next_state.cloud_time, next_state.layer, prev_action,
+                    next_state.surplus, next_state.negative_surplus_count), terminal, cloud_time
+
+        bandwidth = current_state.bandwidth
+        cloud_time = current_state.cloud_time
+        layer = int(current_state.layer)
+        previous_mask = current_state.prev_mask
+        negative_surplus_count = current_state.negative_surplus_count  # the state's count is carried over
+        mask = self._action_mask(action)
 
         # --- Cloud processing update ---
-        cloud_nodes = np.where(action[:, 1] == 1)[0]
-        previous_cloud_nodes = np.where(previous_action[:, 1] == 1)[0] if previous_action is not None else []
         # If some tasks were on cloud previously and now new tasks are added to cloud,
-        if len(cloud_nodes) > 0:
+        if self.actions.has_cloud(layer, mask):
+            cloud_digit = self.actions.cloud_digit
             cloud_proc = max(
-                self.profiling.get_node_cloud_time(layer, i) for i in cloud_nodes
+                self.profiling.get_node_cloud_time(layer, i)
+                for i, location in enumerate(self.actions.location_digits(layer, mask)) if location == cloud_digit
             )  # ms
 
-            congestion = random.uniform(0, 100)  # ms
+            congestion = self.noise.uniform(0, 100)  # ms
             cloud_time =  cloud_proc + congestion
-        elif (previous_action is not None) and (len(previous_cloud_nodes) > 0):
+        elif self.actions.has_cloud(layer - 1, previous_mask):
             # SOME OF THE PREVIOUS OPERATIONS IN CLOUD IS ASSUMED TO BE DONE IN THIS FRAME
-            cloud_time -= random.uniform(10, 20)
+            cloud_time -= self.noise.uniform(10, 20)
 
         else:
             # no new tasks → cloud_time decreases
-            cloud_time = max(0.0, (cloud_time - random.uniform(0, 10)))
+            cloud_time = max(0.0, (cloud_time - self.noise.uniform(0, 10)))
 
         # --- Bandwidth update (stochastic change) ---
-        bw_change = random.uniform(-5, 5)  # Mbps fluctuation
+        bw_change = self.noise.uniform(-5, 5)  # Mbps fluctuation
         new_bandwidth = max(1.0, bandwidth + bw_change)
         new_bandwidth = min(new_bandwidth, 30.0)  # cap max bandwidth
 
@@ -51,8 +134,8 @@ class CloudEdgeSimulator:
             terminal = True
             next_layer = layer
 
-        # --- Next state carries current action as prev_action ---
-        next_state = (new_bandwidth, cloud_time, next_layer, action.copy(), surplus, negative_surplus_count)
+        # --- Next state carries current action as prev_mask ---
+        next_state = SimState(new_bandwidth, cloud_time, next_layer, mask, surplus, negative_surplus_count)
         return next_state, terminal, cloud_time
 
 
@@ -64,51 +147,69 @@ class CloudEdgeSimulator:
             total_energy (float): total energy (Joules)
             completion_time_s (float): completion time (seconds)
         """
-        bandwidth, _, layer, prev_action, _, negative_surplus_count = current_state
-        layer = int(layer)
+        if not isinstance(current_state, SimState):
+            current_state = SimState.from_tuple(current_state, self.actions)
+        bandwidth = current_state.bandwidth
+        layer = int(current_state.layer)
+        prev_mask = current_state.prev_mask
+        mask = self._action_mask(current_action)
 
         total_energy = 0.0
-        transmission_time_s = []
+        transmission_time_s = 0.0
 
         # --- Transmission time calculation ---
-        if prev_action is not None:  # not the first layer
-            prev_assignments = prev_action[:, 1]
-            curr_assignments = current_action[:, 1]
-            for i in range(len(prev_assignments)):
-                for j in range(len(curr_assignments)):
-                    if prev_assignments[i] != curr_assignments[j]:
-                        # convert KB → bits, Mbps → bits/s
-                        transmission_time = (
-                            (self.profiling.output_size * 8 * 1024)
-                            / (max(bandwidth, 1e-6) * 10**6)
-                        )
-                        transmission_time_s.append(transmission_time)
-
-        if len(transmission_time_s) > 0:
-            transmission_time = max(transmission_time_s)
-            total_energy += self.profiling.edge_communication_power * transmission_time  # J
+        # Largest output of the previous layer that crosses the edge/cloud link
+        crossing_kb = self.transfer.crossing_kb(layer, prev_mask, mask)
+        if crossing_kb > 0:
+            # convert KB → bits, Mbps → bits/s
+            transmission_time_s = (crossing_kb * 8 * 1024) / (max(bandwidth, 1e-6) * 10**6)
+            total_energy += self.profiling.edge_communication_power * transmission_time_s  # J
 
         # --- Edge tasks energy ---
-        edge_total_time_s = 0.0
-        for i in range(len(current_action)):
-            if current_action[i, 1] == 0:  # edge
+        # nodes queue up on their device, the devices compute in parallel
+        num_devices = self.actions.num_devices
+        device_busy_s = [0.0] * num_devices
+        has_cloud = False
+        for i, location in enumerate(self.actions.location_digits(layer, mask)):
+            if location < num_devices:  # edge device
                 node_p = self.profiling.get_node_edge_power(layer, i)  # W
                 node_t_s = self.profiling.get_node_edge_time(layer, i) / 1000.0  # ms → s
-                edge_total_time_s += node_t_s
+                device_busy_s[location] += node_t_s
                 total_energy += (node_p * node_t_s)  # J
+            else:
+                has_cloud = True
+        edge_total_time_s = max(device_busy_s)
+        slack_s = sum(edge_total_time_s - busy for busy in device_busy_s)  # other devices idle meanwhile
 
         # --- Cloud energy ---
         cloud_pending_s = cloud_pending_ms / 1000.0
         actual_idle_time_s = 0.0
-        if np.any(current_action[:, 1] == 1):  # some tasks on cloud
+        if has_cloud:  # some tasks on cloud
             actual_idle_time_s = max(0.0, cloud_pending_s - edge_total_time_s)
-            total_energy += self.profiling.edge_idle_power * actual_idle_time_s  # J
+        if has_cloud or slack_s:
+            total_energy += self.profiling.edge_idle_power * (actual_idle_time_s * num_devices + slack_s)  # J
 
         # --- Completion time (s) ---
-        completion_time_s = actual_idle_time_s + edge_total_time_s + max(transmission_time_s, default=0.0)
+        completion_time_s = actual_idle_time_s + edge_total_time_s + transmission_time_s
 
         return total_energy, completion_time_s
 
+    def device_loads(self, layer, action):
+        """
+        Per edge device compute time (s), energy (J) and average power (W) of
+        the nodes a placement queues on it; the cloud's nodes are left out.
+        """
+        mask = self._action_mask(action)
+        busy_s = [0.0] * self.actions.num_devices
+        energy = [0.0] * self.actions.num_devices
+        for i, location in enumerate(self.actions.location_digits(layer, mask)):
+            if location < self.actions.num_devices:
+                node_t_s = self.profiling.get_node_edge_time(layer, i) / 1000.0  # ms → s
+                busy_s[location] += node_t_s
+                energy[location] += self.profiling.get_node_edge_power(layer, i) * node_t_s
+        power = [e / t if t > 0 else 0.0 for e, t in zip(energy, busy_s)]
+        return busy_s, energy, power
+
 
     def calculate_reward(self, layer, total_energy, completion_time_s, previous_surplus, negative_surplus_count):
         """
@@ -118,9 +219,7 @@ class CloudEdgeSimulator:
             reward (float)
         """
         # fractional deadline scaling
-        fractional_deadline_s = (
-            self.profiling.get_edge_time_for_layer(layer)/self.profiling.get_total_edge_time()
-        ) * (self.profiling.deadline / 1000.0)  # ms → s
+        fractional_deadline_s = self.profiling.get_fractional_deadline(layer)  # s
 
         constrained_completion_time_s = completion_time_s + previous_surplus
         surplus = constrained_completion_time_s - fractional_deadline_s
@@ -0,0 +1,88 @@
+import numpy as np
+from profiling.profile import ProfilingData, CompiledProfilingData
+from profiling.action_catalog import get_action_catalog
+
+
+class TransferModel:
+    """
+    Data moved between consecutive layers, from the placement ids alone.
+
+    Every node of layer l - 1 sends its output (KB) to the nodes of layer l.
+    An output moves when some consumer sits at another location than its
+    producer (another edge device or the cloud); all transfers share the
+    edge/cloud link and run in parallel, so a step pays for the largest
+    moving output. With equal output sizes this is the usual rule: data
+    moves unless both layers sit entirely at the same location.
+    """
+
+    def __init__(self, profiling_data: ProfilingData):
+        p = CompiledProfilingData.from_profiling(profiling_data)
+        self.actions = get_action_catalog(p)
+        self.num_nodes = p.num_nodes.tolist()
+        self.full_mask = np.array([self.actions.full_id(l) for l in range(len(self.num_nodes))], dtype=np.int64)  # all nodes on cloud
+        self.full_mask.flags.writeable = False
+        self.output_kb = p.output_sizes
+        self._output_rows = [row[:n] for row, n in zip(p.output_sizes.tolist(), self.num_nodes)]
+        self._node_mask = p.node_mask
+
+        # Output size of layers whose nodes all send the same amount, None otherwise
+        self.uniform_kb = [row[0] if len(set(row)) == 1 else None for row in self._output_rows]
+        self.all_uniform = all(kb is not None for kb in self.uniform_kb)
+        self._layer_kb = np.array([kb if kb is not None else 0.0 for kb in self.uniform_kb])
+
+        # Bitmask of the locations every (layer, action id) uses, when all layers are enumerated
+        self._location_table = None
+        if self.actions.all_enumerated:
+            self._location_table = np.zeros((self.actions.num_layers, self.actions.max_actions), dtype=np.int64)
+            for layer_idx, locations in enumerate(self.actions.used_locations):
+                self._location_table[layer_idx, :len(locations)] = locations
+
+    def crossing_kb(self, layer, prev_mask, mask):
+        """Largest output of layer - 1 that moves when layer is placed as mask (0.0 = none)."""
+        if prev_mask < 0:
+            return 0.0
+        prev_layer = max(layer - 1, 0)
+        used = self.actions.locations(layer, mask)  # locations of the consumers
+
+        kb = self.uniform_kb[prev_layer]
+        if kb is not None:
+            both = used | self.actions.locations(prev_layer, prev_mask)
+            return kb if both & (both - 1) else 0.0  # more than one location
+
+        kb = 0.0
+        for location, size in zip(self.actions.location_digits(prev_layer, prev_mask), self._output_rows[prev_layer]):
+            sends = used & ~(1 << location)
+            if sends and size > kb:
+                kb = size
+        return kb
+
+    def _locations(self, layers, masks):
+        if self._location_table is not None:
+            return self._location_table[layers, masks]
+        digits = self.actions.digits_of(masks)
+        return np.bitwise_or.reduce(np.where(self._node_mask[layers], 1 << digits, 0), axis=1)
+
+    def crossing_kb_batch(self, layers, prev_masks, masks):
+        """Vectorized crossing_kb over arrays of layers, previous masks (-1 = none) and masks."""
+        prev_layers = np.maximum(layers - 1, 0)
+        prev_ids = np.maximum(prev_masks, 0)
+        used = self._locations(layers, masks)
+
+        if self.all_uniform:
+            both = used | self._locations(prev_layers, prev_ids)
+            kb = np.where((both & (both - 1)) != 0, self._layer_kb[prev_layers], 0.0)
+        else:
+            prev_digits = self.actions.digits_of(prev_ids)
+            sends = ((used[:, None] & ~(1 << prev_digits)) != 0) & self._node_mask[prev_layers]
+            kb = np.where(sends, self.output_kb[prev_layers], 0.0).max(axis=1)
+        return np.where(prev_masks >= 0, kb, 0.0)
+
+    @staticmethod
+    def transfer_time_s(kb, bandwidth):
+        """Seconds to send kb over bandwidth Mbps, elementwise (KB → bits, Mbps → bits/s)."""
+        return (kb * 8 * 1024) / (np.maximum(bandwidth, 1e-6) * 10**6)
+
+
+def get_transfer_model(profiling_data: ProfilingData) -> TransferModel:
+    """Return the transfer model of a profile, shared by all its with_deadline copies."""
+    return CompiledProfilingData.from_profiling(profiling_data).derived("transfer_model", TransferModel)
@@ -0,0 +1,58 @@
+"""
+Headless sweep runner: trains and evaluates the schedulers over a range of
+deadlines and writes the results CSV, without importing any plotting code.
+
+    python -m sweep.cli --deadlines 50:800:4 --episodes 2000 --results sweep_results.csv
+    python -m sweep.cli --deadlines 100 300 500 --schedulers double_q random --seeds 0 1 --workers 8
+"""
+import argparse
+import sys
+
+from sweep.runner import SCHEDULERS, iter_sweep
+
+
+def parse_deadlines(values):
+    """Deadlines (ms) from a list of values and start:stop[:step] ranges."""
+    deadlines = []
+    for value in values:
+        if ":" in value:
+            deadlines += list(range(*(int(part) for part in value.split(":"))))
+        else:
+            deadlines.append(int(value))
+    return deadlines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deadlines", nargs="+", default=["50:800:4"], help="deadlines (ms) or start:stop[:step] ranges")
+    parser.add_argument("--schedulers", nargs="+", default=list(SCHEDULERS), choices=SCHEDULERS)
+    parser.add_argument("--seeds", nargs="+", type=int, default=[0])
+    parser.add_argument("--episodes", type=int, default=2000)
+    parser.add_argument("--max-steps", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=None, help="pool size, default all cores, 1 = in process")
+    parser.add_argument("--results", default="sweep_results.csv", help="results CSV, written as results arrive")
+    parser.add_argument("--tables-dir", help="keep each job's tables there")
+    parser.add_argument("--stats-dir", help="write Double Q training instrumentation there")
+    parser.add_argument("--store-dir", help="per-deadline-bucket Double Q tables with warm starts")
+    parser.add_argument("--warm-episodes", type=int, help="episodes of warm-started buckets, default episodes // 4")
+    parser.add_argument("--bucket-ms", type=int, default=20)
+    parser.add_argument("--anchor-stride", type=int, default=4)
+    parser.add_argument("--converge", action="store_true", help="stop learned schedulers once converged")
+    parser.add_argument("--a2c-envs", type=int, help="train A2C on this many batched environments")
+    args = parser.parse_args(argv)
+
+    results = iter_sweep(
+        parse_deadlines(args.deadlines), args.schedulers, args.seeds, args.episodes, args.max_steps,
+        args.workers, args.results, args.tables_dir, args.stats_dir,
+        store_dir=args.store_dir, warm_episodes=args.warm_episodes, bucket_ms=args.bucket_ms,
+        anchor_stride=args.anchor_stride, converge=args.converge, a2c_envs=args.a2c_envs,
+    )
+    for r in results:
+        print(f"{r['scheduler']:<10} deadline={r['deadline']:<5} seed={r['seed']:<3} "
+              f"energy={r['energy']:.4f} J  time={r['time']:.1f} ms  p99={r['time_p99']:.1f} ms  "
+              f"miss={r['miss_rate']:.3f}  episodes={r['episodes']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
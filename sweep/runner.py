@@ -0,0 +1,264 @@
+import csv
+import os
+
+import numpy as np
+from model.convergence import ConvergenceMonitor
+from model.table_store import DeadlineTableStore
+from profiling.initialize_profiling import get_profiling_data
+from reference_schedulers.oracle_scheduler import run_oracle_scheduler
+from reference_schedulers.random_scheduler import run_random_scheduler
+from simulator.a2c_simulator import run__a2c_simulation, run_batch_a2c_simulation
+from simulator.doubleQ_simulator import run_simulation
+from simulator.metrics import MetricsSink
+
+SCHEDULERS = ("double_q", "a2c", "random", "all_edge", "all_cloud", "oracle")
+RESULT_FIELDS = ("deadline", "scheduler", "seed", "energy", "time", "episodes",
+                 "time_p50", "time_p95", "time_p99", "miss_rate")
+
+
+def make_jobs(deadlines, schedulers=SCHEDULERS, seeds=(0,)):
+    """
+    One job per (deadline, scheduler, seed).
+    The learned schedulers go first: they dominate the run time, so the
+    pool doesn't end on a long tail of training jobs.
+    """
+    jobs = [(d, s, seed) for seed in seeds for d in deadlines for s in schedulers]
+    learned = ("double_q", "a2c")
+    return sorted(jobs, key=lambda job: job[1] not in learned)
+
+
+def job_seed(deadline, scheduler, seed):
+    """Seed of a job, fixed by the job itself so results don't depend on the worker layout."""
+    entropy = [int(seed), int(deadline), SCHEDULERS.index(scheduler)]
+    return int(np.random.SeedSequence(entropy).generate_state(1)[0])
+
+
+_base_profile = None
+
+
+def profiling_for_deadline(deadline):
+    """
+    Profile of a deadline, sharing the deadline-independent data (compiled node
+    arrays, action catalog, cost tables) with every other job of this process.
+    """
+    global _base_profile
+    if _base_profile is None:
+        _base_profile = get_profiling_data(deadline)
+    return _base_profile.with_deadline(deadline)
+
+
+def _table_files(tables_dir, deadline, scheduler, seed):
+    if tables_dir is None:
+        return None
+    return os.path.join(tables_dir, f"{scheduler}_d{deadline}_s{seed}")
+
+
+def _stats_file(stats_dir, scheduler, deadline, seed):
+    if stats_dir is None:
+        return None
+    return os.path.join(stats_dir, f"{scheduler}_d{deadline}_s{seed}_stats.json")
+
+
+def _monitor(converge):
+    return ConvergenceMonitor() if converge else None
+
+
+def _episodes_run(monitor, episodes):
+    return episodes if monitor is None else monitor.episodes
+
+
+def _tail_fields(sink):
+    """Completion-time percentiles and deadline-miss rate of a job's MetricsSink."""
+    summary = sink.summary()
+    return {"time_p50": summary["time_ms"]["p50"], "time_p95": summary["time_ms"]["p95"],
+            "time_p99": summary["time_ms"]["p99"], "miss_rate": summary["deadline_miss_rate"]}
+
+
+def run_job(job, episodes, max_steps, tables_dir=None, stats_dir=None, converge=False, a2c_envs=None):
+    """
+    Run a single sweep job in isolation: its own RNG seed and its own tables
+    (in memory, or under tables_dir if given).
+    stats_dir: write the Double Q training instrumentation of the job there as JSON.
+    converge: stop the learned schedulers once a ConvergenceMonitor reports
+    convergence; the result's "episodes" is the number actually run.
+    a2c_envs: run A2C on the array-backed BatchA2CAgent with that many
+    environments per step, None = the per-step A2CAgent.
+    """
+    deadline, scheduler, seed = job
+    rng_seed = job_seed(deadline, scheduler, seed)
+    monitor = _monitor(converge and scheduler in ("double_q", "a2c"))
+    sink = MetricsSink(deadline_ms=deadline)
+
+    profiling_data = profiling_for_deadline(deadline)
+    prefix = _table_files(tables_dir, deadline, scheduler, seed)
+
+    if scheduler == "double_q":
+        qtable_file = None if prefix is None else prefix + "_q_tables.ckpt"
+        energy, time = run_simulation(profiling_data, episodes, max_steps, qtable_file=qtable_file, seed=rng_seed,
+                                      stats_file=_stats_file(stats_dir, scheduler, deadline, seed), convergence=monitor,
+                                      metrics=sink)
+    elif scheduler == "a2c" and a2c_envs is not None:
+        table_file = None if prefix is None else prefix + "_a2c_batch_tables.ckpt"
+        energy, time = run_batch_a2c_simulation(profiling_data, episodes, max_steps, n_envs=a2c_envs,
+                                                table_file=table_file, seed=rng_seed, convergence=monitor,
+                                                metrics=sink)
+    elif scheduler == "a2c":
+        table_file = None if prefix is None else prefix + "_a2c_tables.ckpt"
+        energy, time = run__a2c_simulation(profiling_data, episodes, max_steps, table_file=table_file, legacy_files=None,
+                                           seed=rng_seed, convergence=monitor, metrics=sink)
+    elif scheduler == "random":
+        energy, time = run_random_scheduler(profiling_data, episodes, max_steps, is_random=True, is_all_cloud=False, seed=rng_seed,
+                                             metrics=sink)
+    elif scheduler == "all_edge":
+        energy, time = run_random_scheduler(profiling_data, episodes, max_steps, is_random=False, is_all_cloud=False, seed=rng_seed,
+                                             metrics=sink)
+    elif scheduler == "all_cloud":
+        energy, time = run_random_scheduler(profiling_data, episodes, max_steps, is_random=False, is_all_cloud=True, seed=rng_seed,
+                                             metrics=sink)
+    elif scheduler == "oracle":
+        energy, time = run_oracle_scheduler(profiling_data, episodes, max_steps, seed=rng_seed, metrics=sink)
+    else:
+        raise ValueError(f"Unknown scheduler: {scheduler}")
+
+    return {"deadline": deadline, "scheduler": scheduler, "seed": seed, "energy": float(energy), "time": float(time),
+            "episodes": _episodes_run(monitor, episodes), **_tail_fields(sink)}
+
+
+def plan_buckets(deadlines, store, anchor_stride=4):
+    """
+    Group the deadlines by bucket of a DeadlineTableStore and return (anchors, rest),
+    two lists of per-bucket deadline lists. Anchors are the buckets trained
+    already plus every anchor_stride-th untrained bucket; they run first and
+    the rest warm-start from the nearest anchor.
+    """
+    buckets = {}
+    for deadline in sorted(deadlines):
+        buckets.setdefault(store.bucket(deadline), []).append(deadline)
+    trained = set(store.trained())
+    untrained = [b for b in sorted(buckets) if b not in trained]
+    anchor_buckets = (trained & set(buckets)) | set(untrained[::anchor_stride])
+    anchors = [buckets[b] for b in sorted(buckets) if b in anchor_buckets]
+    rest = [buckets[b] for b in sorted(buckets) if b not in anchor_buckets]
+    return anchors, rest
+
+
+def run_bucket_job(deadlines, seed, episodes, warm_episodes, max_steps, store_dir, bucket_ms=20, stats_dir=None,
+                   sources=None, converge=False):
+    """
+    Train the Double Q agent for the deadlines of one bucket, in order, on the
+    bucket's table of a DeadlineTableStore. A deadline starting from trained
+    tables (its bucket's or the nearest of the sources buckets) runs warm_episodes.
+    """
+    store = DeadlineTableStore(os.path.join(store_dir, f"s{seed}"), bucket_ms)
+    results = []
+    for deadline in deadlines:
+        own = store.path(store.bucket(deadline))
+        source = store.source(deadline, sources)
+        budget = episodes if source is None else warm_episodes
+        monitor = _monitor(converge)
+        sink = MetricsSink(deadline_ms=deadline)
+        energy, time = run_simulation(
+            profiling_for_deadline(deadline),
+            budget,
+            max_steps,
+            qtable_file=own,
+            warm_start_file=source if source != own else None,
+            seed=job_seed(deadline, "double_q", seed),
+            stats_file=_stats_file(stats_dir, "double_q", deadline, seed),
+            convergence=monitor,
+            metrics=sink,
+        )
+        results.append({"deadline": deadline, "scheduler": "double_q", "seed": seed,
+                         "energy": float(energy), "time": float(time), "episodes": _episodes_run(monitor, budget), **_tail_fields(sink)})
+    return results
+
+
+def iter_sweep(deadlines, schedulers=SCHEDULERS, seeds=(0,), episodes=2000, max_steps=20,
+               workers=None, results_file="sweep_results.csv", tables_dir=None, stats_dir=None,
+               store_dir=None, warm_episodes=None, bucket_ms=20, anchor_stride=4, converge=False, a2c_envs=None):
+    """
+    Fan the sweep out over a process pool and yield each result as it finishes.
+    Results are appended to results_file (CSV) as they arrive.
+    workers: pool size, None = all cores, 1 = run in this process.
+    stats_dir: directory for per-job training instrumentation, None = off.
+    store_dir: keep the Double Q tables in a DeadlineTableStore there (one
+    table per bucket_ms bucket and seed, kept across sweeps). Anchor buckets
+    train first with the full episodes, every other bucket then warm-starts
+    from its nearest trained neighbour and runs warm_episodes (default episodes // 4).
+    converge: stop training a deadline once it has converged, episodes
+    (warm_episodes) being the upper bound; see ConvergenceMonitor.
+    a2c_envs: train A2C on the batched simulator with that many environments, see run_job.
+    """
+    jobs = make_jobs(deadlines, schedulers, seeds)
+    for directory in (tables_dir, stats_dir):
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    # (function, args) tasks; the warm tasks are submitted once every anchor is done
+    anchor_tasks, warm_tasks = [], []
+    if store_dir is not None and "double_q" in schedulers:
+        jobs = [job for job in jobs if job[1] != "double_q"]
+        warm_episodes = warm_episodes if warm_episodes is not None else max(1, episodes // 4)
+        for seed in seeds:
+            store = DeadlineTableStore(os.path.join(store_dir, f"s{seed}"), bucket_ms)
+            anchors, rest = plan_buckets(deadlines, store, anchor_stride)
+            # anchors start from their own table only and warm buckets from anchors only,
+            # so the results don't depend on the order jobs finish in
+            sources = {store.bucket(group[0]) for group in anchors}
+            for group, tasks, among in ((anchors, anchor_tasks, ()), (rest, warm_tasks, sources)):
+                tasks += [(run_bucket_job, (bucket, seed, episodes, warm_episodes, max_steps, store_dir, bucket_ms,
+                                            stats_dir, among, converge)) for bucket in group]
+    job_tasks = [(run_job, (job, episodes, max_steps, tables_dir, stats_dir, converge, a2c_envs)) for job in jobs]
+
+    out = None
+    writer = None
+    if results_file is not None:
+        out = open(results_file, "w", newline="")
+        writer = csv.DictWriter(out, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+
+    def record(result):
+        if writer is not None:
+            writer.writerow(result)
+            out.flush()
+        return result
+
+    try:
+        if workers == 1:
+            for fn, args in anchor_tasks + warm_tasks + job_tasks:
+                result = fn(*args)
+                for r in (result if isinstance(result, list) else [result]):
+                    yield record(r)
+        else:
+            # imported here: spawned workers import this module and only need run_job
+            from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                anchors = {pool.submit(fn, *args) for fn, args in anchor_tasks}
+                pending = anchors | {pool.submit(fn, *args) for fn, args in job_tasks}
+                if not anchors:
+                    pending |= {pool.submit(fn, *args) for fn, args in warm_tasks}
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        result = future.result()
+                        for r in (result if isinstance(result, list) else [result]):
+                            yield record(r)
+                        if future in anchors:
+                            anchors.discard(future)
+                            if not anchors:
+                                pending |= {pool.submit(fn, *args) for fn, args in warm_tasks}
+    finally:
+        if out is not None:
+            out.close()
+
+
+def run_sweep(deadlines, schedulers=SCHEDULERS, seeds=(0,), episodes=2000, max_steps=20,
+              workers=None, results_file="sweep_results.csv", tables_dir=None, stats_dir=None,
+              store_dir=None, warm_episodes=None, bucket_ms=20, anchor_stride=4, converge=False, a2c_envs=None):
+    """Run the whole sweep and return the results sorted by (scheduler, seed, deadline)."""
+    results = list(iter_sweep(
+        deadlines, schedulers, seeds, episodes, max_steps, workers, results_file, tables_dir, stats_dir,
+        store_dir=store_dir, warm_episodes=warm_episodes, bucket_ms=bucket_ms, anchor_stride=anchor_stride,
+        converge=converge, a2c_envs=a2c_envs,
+    ))
+    return sorted(results, key=lambda r: (SCHEDULERS.index(r["scheduler"]), r["seed"], r["deadline"]))
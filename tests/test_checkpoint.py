@@ -0,0 +1,138 @@
+import numpy as np
+
+from model.checkpoint import (
+    append_segment, is_checkpoint, read_checkpoint, read_checkpoint_with_deltas, read_segments, write_checkpoint,
+)
+from model.doubleQ import DoubleQLearningAgent
+from profiling.initialize_profiling import get_profiling_data
+
+
+def _arrays():
+    return {
+        "q": np.arange(12, dtype=np.float64).reshape(3, 4),
+        "keys": np.array([3, 1, 7], dtype=np.int64),
+        "empty": np.zeros((0, 4), dtype=np.float32),
+    }
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "tables.ckpt")
+    arrays = _arrays()
+    write_checkpoint(path, arrays, {"epsilon": 0.25})
+
+    assert is_checkpoint(path)
+    for mmap in (True, False):
+        meta, loaded = read_checkpoint(path, mmap=mmap)
+        assert meta == {"epsilon": 0.25}
+        assert set(loaded) == set(arrays)
+        for name, arr in arrays.items():
+            assert loaded[name].dtype == arr.dtype
+            np.testing.assert_array_equal(loaded[name], arr)
+
+
+def test_memory_map_is_copy_on_write(tmp_path):
+    path = str(tmp_path / "tables.ckpt")
+    write_checkpoint(path, _arrays(), {})
+
+    _, loaded = read_checkpoint(path)
+    loaded["q"][0, 0] = -1.0
+    _, again = read_checkpoint(path)
+    assert again["q"][0, 0] == 0.0
+
+
+def test_truncated_segment_is_ignored(tmp_path):
+    path = str(tmp_path / "tables.ckpt")
+    write_checkpoint(path, _arrays(), {"n": 1})
+    with open(path, "ab") as f:
+        f.write(b"CKPTSEG1\x40")
+
+    assert len(read_segments(path)) == 1
+    meta, _ = read_checkpoint(path)
+    assert meta == {"n": 1}
+
+
+def test_legacy_file_is_not_a_checkpoint(tmp_path):
+    path = tmp_path / "tables.pkl"
+    path.write_bytes(b"\x80\x04legacy")
+    assert not is_checkpoint(str(path))
+    assert not is_checkpoint(str(tmp_path / "missing.ckpt"))
+
+
+def test_deltas_replay_after_last_full_segment(tmp_path):
+    path = str(tmp_path / "tables.ckpt")
+    write_checkpoint(path, _arrays(), {"n": 1})
+    append_segment(path, {"keys": np.array([9], dtype=np.int64)}, {"rows": 1})
+    append_segment(path, {"keys": np.array([4, 5], dtype=np.int64)}, {"rows": 2})
+
+    meta, arrays, deltas = read_checkpoint_with_deltas(path)
+    assert meta == {"n": 1}
+    np.testing.assert_array_equal(arrays["keys"], [3, 1, 7])
+    assert [d["keys"].tolist() for d in deltas] == [[9], [4, 5]]
+
+    # An interrupted append leaves a truncated tail, the next append cuts it off
+    with open(path, "ab") as f:
+        f.write(b"CKPTSEG1\x40")
+    append_segment(path, {"keys": np.array([6], dtype=np.int64)}, {"rows": 1})
+    _, _, deltas = read_checkpoint_with_deltas(path)
+    assert [d["keys"].tolist() for d in deltas] == [[9], [4, 5], [6]]
+
+
+def _write_rows(agent, state_ids, value):
+    for state_id in state_ids:
+        row = agent.tables.row(state_id)
+        agent.tables.q1[row, 0] = value
+        agent.tables.q2[row, 0] = -value
+        agent.tables.dirty.add(row)
+
+
+def test_agent_incremental_save_and_reload(tmp_path):
+    path = str(tmp_path / "q_tables.ckpt")
+    agent = DoubleQLearningAgent(get_profiling_data(200))
+    _write_rows(agent, [10, 11, 12], 1.0)
+    agent.save_qtables(path, verbose=False)
+
+    _write_rows(agent, [11, 13], 2.0)
+    agent.save_qtables(path, incremental=True, verbose=False)
+    assert [h["kind"] for h, _ in read_segments(path)] == ["full", "delta"]
+
+    loaded = DoubleQLearningAgent(get_profiling_data(200))
+    assert loaded.load_qtables(path)
+    expected = {10: 1.0, 11: 2.0, 12: 1.0, 13: 2.0}
+    assert len(loaded.tables) == len(expected)
+    for state_id, value in expected.items():
+        row = loaded.tables.lookup(state_id)
+        assert loaded.tables.q1[row, 0] == value
+        assert loaded.tables.q2[row, 0] == -value
+
+
+def test_incremental_save_after_eviction_rewrites_in_full(tmp_path):
+    path = str(tmp_path / "q_tables.ckpt")
+    profiling = get_profiling_data(200)
+    row_bytes = DoubleQLearningAgent(profiling).tables.row_bytes
+    max_table_mb = 3.5 * row_bytes / 2**20  # room for 3 states
+
+    agent = DoubleQLearningAgent(profiling, max_table_mb=max_table_mb)
+    _write_rows(agent, [10, 11, 12], 1.0)
+    agent.save_qtables(path, verbose=False)
+
+    agent.tables.tick()
+    _write_rows(agent, [13], 2.0)
+    assert agent.tables.evictions == 1
+    agent.save_qtables(path, incremental=True, verbose=False)
+    # A delta cannot drop the evicted state, so the file is rewritten in full
+    assert [h["kind"] for h, _ in read_segments(path)] == ["full"]
+
+    loaded = DoubleQLearningAgent(profiling, max_table_mb=max_table_mb)
+    assert loaded.load_qtables(path)
+    kept = set(loaded.tables.state_ids[:loaded.tables.size].tolist())
+    assert kept == set(agent.tables.state_ids[:agent.tables.size].tolist())
+    assert len(kept) == 3 and 13 in kept
+
+
+def test_replayed_access_does_not_count_a_visit():
+    agent = DoubleQLearningAgent(get_profiling_data(200))
+    row = agent.tables.row(10)
+    agent.tables.tick()
+    assert agent.tables.row(10, visit=False) == row
+    assert agent.tables.visits[row] == 1
+    assert agent.tables.last_used[row] == agent.tables.clock
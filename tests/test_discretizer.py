@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from model.discretizer import StateDiscretizer, UniformBins
+from profiling.action_catalog import get_action_catalog
+from profiling.initialize_profiling import get_synthetic_profiling_data
+
+BINS = [
+    np.linspace(1, 100, 5),
+    np.linspace(0, 500, 5),
+    np.linspace(-10, 10, int((10 - (-10)) / 0.1) + 1),
+    np.array([0.0, 1.0, 2.5, 7.0]),  # uneven, bisection path
+]
+
+
+def _probe_values(bins):
+    edges = bins.tolist()
+    values = edges + [np.nextafter(e, -np.inf) for e in edges] + [np.nextafter(e, np.inf) for e in edges]
+    values += [(a + b) / 2 for a, b in zip(edges, edges[1:])]
+    values += [edges[0] - 1e6, edges[-1] + 1e6, -np.inf, np.inf, np.nan]
+    return np.array(values)
+
+
+@pytest.mark.parametrize("bins", BINS, ids=["bandwidth", "cloudtime", "surplus", "uneven"])
+def test_uniform_bins_match_digitize(bins):
+    binner = UniformBins(bins)
+    values = _probe_values(bins)
+    expected = np.clip(np.digitize(values, bins) - 1, 0, len(bins) - 1)
+
+    np.testing.assert_array_equal(binner.indices(values), expected)
+    assert [binner.index(float(v)) for v in values] == expected.tolist()
+
+
+def _discretizer(profiling):
+    actions = get_action_catalog(profiling)
+    return StateDiscretizer(BINS[0], BINS[1], BINS[2], actions.num_layers, actions)
+
+
+def test_places_at_max_size():
+    # Widen the hidden layers until the state ids no longer fit in int64
+    nodes, largest = 1, None
+    while True:
+        try:
+            largest = _discretizer(get_synthetic_profiling_data(10, nodes))
+        except ValueError:
+            break
+        nodes += 1
+    assert largest is not None and nodes > 2
+
+    places = largest._place
+    assert all(a > b for a, b in zip(places, places[1:]))
+    assert places[-1] == 1
+    assert places[0] * largest.radix[0] - 1 <= np.iinfo(np.int64).max
@@ -0,0 +1,17 @@
+import json
+
+from profiling.initialize_profiling import get_profiling_data
+from simulator.doubleQ_simulator import run_simulation
+
+
+def test_stats_with_experience_replay(tmp_path):
+    stats_file = str(tmp_path / "stats.json")
+    run_simulation(get_profiling_data(200), 50, 20, qtable_file=None, seed=1,
+                   stats_file=stats_file, replay_capacity=500, replay_batch=8)
+
+    with open(stats_file) as f:
+        summary = json.load(f)
+    states = summary["states"]
+    # Replayed samples touch rows too, but only environment steps count as visits
+    assert states["new"] + states["seen"] == summary["steps"]
+    assert states["new"] == summary["table"]["rows"]
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from profiling.action_catalog import get_action_catalog
+from profiling.initialize_profiling import get_profiling_data, get_synthetic_profiling_data
+from reference_schedulers.random_scheduler import get_all_edge_action_id, get_all_edge_action_ids
+
+
+def _profile(num_devices):
+    profiling = get_synthetic_profiling_data(6, 5, seed=3)
+    profiling.numberOfEdgeDevice = num_devices
+    return profiling
+
+
+@pytest.mark.parametrize("make_profile", [lambda: get_profiling_data(200), lambda: _profile(1), lambda: _profile(3)],
+                         ids=["reference", "one device", "three devices"])
+def test_all_edge_spreads_nodes_over_the_edge_devices(make_profile):
+    profiling = make_profile()
+    actions = get_action_catalog(profiling)
+    layers = np.arange(actions.num_layers)
+
+    ids = get_all_edge_action_ids(profiling, np.repeat(layers, 2))
+    assert ids.tolist() == [get_all_edge_action_id(profiling, int(l)) for l in np.repeat(layers, 2)]
+
+    for layer in layers[1:-1]:
+        digits = actions.location_digits(layer, int(ids[2 * layer]))
+        assert max(digits) < actions.num_devices  # nothing on the cloud
+        used = len(set(digits))
+        assert used == min(actions.num_devices, actions.num_nodes[layer])
+    assert ids[0] == ids[-1] == 0
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from profiling.initialize_profiling import get_profiling_data, get_synthetic_profiling_data
+from simulator.batch_simulator import BatchCloudEdgeSimulator, BatchState
+from simulator.simulator import CloudEdgeSimulator, SimState
+
+LAYOUTS = [
+    ("reference", lambda: get_profiling_data(200)),
+    ("synthetic 5x3", lambda: get_synthetic_profiling_data(5, 3, seed=1)),
+    ("synthetic 7x4", lambda: get_synthetic_profiling_data(7, 4, seed=2)),
+]
+
+
+@pytest.mark.parametrize("name,make_profile", LAYOUTS, ids=[name for name, _ in LAYOUTS])
+def test_scalar_and_batch_energy_and_time_agree(name, make_profile):
+    profiling = make_profile()
+    scalar = CloudEdgeSimulator(profiling)
+    batch = BatchCloudEdgeSimulator(profiling)
+    actions = batch.actions
+    rng = np.random.default_rng(0)
+
+    states, action_ids, pending = [], [], []
+    for layer in range(actions.num_layers):
+        prev_ids = [-1] if layer == 0 else range(actions.num_actions(layer - 1))
+        for prev in prev_ids:
+            for action_id in range(actions.num_actions(layer)):
+                bandwidth = rng.uniform(1.0, 30.0)
+                cloud_time = rng.choice([0.0, rng.uniform(0.0, 200.0)])
+                states.append(SimState(bandwidth, cloud_time, layer, prev, 0.0, 0))
+                action_ids.append(action_id)
+                pending.append(cloud_time)
+
+    energy, time_s = batch.energy_and_time(BatchState.from_states(states), action_ids, np.array(pending))
+    expected = np.array([
+        scalar.compute_energy_and_time(state, action_id, cloud_time)
+        for state, action_id, cloud_time in zip(states, action_ids, pending)
+    ])
+    np.testing.assert_allclose(energy, expected[:, 0], rtol=1e-12, atol=1e-12)
+    np.testing.assert_allclose(time_s, expected[:, 1], rtol=1e-12, atol=1e-12)